@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""asyncio fetch engine for fanning out many independent LEAP API lookups."""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Hashable, Iterable, Optional, Tuple
+
+from throttle import TokenBucket
+
+# A job is a key identifying the lookup plus a zero-argument callable performing it
+FetchJob = Tuple[Hashable, Callable[[], Any]]
+ResultCallback = Callable[[Hashable, Any, Optional[BaseException]], None]
+
+
+class AsyncFetchEngine:
+    """Run blocking fetch callables with a bounded number of requests in flight.
+
+    Requests are paced by a shared token bucket before they are dispatched, so the
+    in-flight limit controls latency hiding while the bucket controls API load.
+    ``on_result`` is invoked on the event loop thread as each job finishes, which
+    lets callers stream results into single-threaded bookkeeping and DB writes.
+    """
+
+    def __init__(self, max_in_flight: int, rate_limiter: Optional[TokenBucket] = None):
+        self.max_in_flight = max(1, max_in_flight)
+        self.rate_limiter = rate_limiter
+
+    def run(self, jobs: Iterable[FetchJob], on_result: ResultCallback) -> None:
+        """Execute all jobs and block until every result has been delivered."""
+        asyncio.run(self._run(jobs, on_result))
+
+    async def _run(self, jobs: Iterable[FetchJob], on_result: ResultCallback) -> None:
+        loop = asyncio.get_running_loop()
+        jobs_iter = iter(jobs)
+        with ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="fetch") as executor:
+            async def worker():
+                # Each worker pulls the next job lazily, so huge job lists are never materialised
+                for key, fetch in jobs_iter:
+                    if self.rate_limiter:
+                        await self.rate_limiter.acquire_async()
+                    try:
+                        result, error = await loop.run_in_executor(executor, fetch), None
+                    except Exception as e:
+                        result, error = None, e
+                    on_result(key, result, error)
+
+            await asyncio.gather(*(worker() for _ in range(self.max_in_flight)))
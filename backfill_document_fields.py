@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Fill the extracted subject/description/status columns for existing documents.
+
+Rows stored before the columns existed (fields_version NULL), or by an older
+DOCUMENT_FIELDS_VERSION, are decoded once and updated in chunks. Each chunk
+is committed on its own, so the job can be interrupted and re-run safely.
+Rows that are already current are not read at all.
+
+    python backfill_document_fields.py --db epa_ireland.db --chunk-size 2000
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sqlite3
+import sys
+import zlib
+from typing import Optional
+
+from tqdm import tqdm
+
+import db
+import migrations
+from blob_codec import BlobCodec
+from document_fields import DOCUMENT_FIELDS_VERSION, NO_FIELDS, extract_document_fields
+
+DB_PATH = "epa_ireland.db"
+DEFAULT_CHUNK_SIZE = 2000
+PENDING = "(fields_version IS NULL OR fields_version < ?)"
+
+
+def backfill(conn: sqlite3.Connection, chunk_size: int = DEFAULT_CHUNK_SIZE,
+             codec: Optional[BlobCodec] = None, show_progress: bool = True) -> int:
+    """Extract fields for every pending row, committing per chunk; returns rows updated."""
+    codec = codec or BlobCodec(conn)
+    total = conn.execute(f"SELECT COUNT(*) FROM compliance_documents WHERE {PENDING}",
+                         (DOCUMENT_FIELDS_VERSION,)).fetchone()[0]
+    updated = 0
+    last_rowid = -1
+    with tqdm(total=total, desc="Extracting document fields", disable=not show_progress) as progress:
+        while True:
+            rows = conn.execute(
+                f"SELECT rowid, metadata_json FROM compliance_documents WHERE rowid > ? AND {PENDING} "
+                "ORDER BY rowid LIMIT ?", (last_rowid, DOCUMENT_FIELDS_VERSION, chunk_size)).fetchall()
+            if not rows:
+                break
+            last_rowid = rows[-1][0]
+            updates = []
+            for rowid, value in rows:
+                try:
+                    fields = extract_document_fields(codec.loads(value))
+                except (ValueError, zlib.error):
+                    # Bad JSON or text, an unknown compression dictionary or a corrupt blob
+                    fields = NO_FIELDS
+                updates.append((*fields, DOCUMENT_FIELDS_VERSION, rowid))
+            conn.executemany(
+                "UPDATE compliance_documents SET subject = ?, description = ?, status = ?, fields_version = ? "
+                "WHERE rowid = ?", updates)
+            conn.commit()
+            updated += len(updates)
+            progress.update(len(rows))
+    return updated
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Extract subject/description/status columns for existing documents.")
+    parser.add_argument("--db", default=DB_PATH, help="Path to SQLite database (default: %(default)s)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Rows per transaction")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"Database {args.db} not found.")
+        sys.exit(1)
+    conn = db.connect(args.db, 'ingest')
+    try:
+        for step in migrations.migrate(conn):
+            print(f"Applied schema migration {step}")
+        updated = backfill(conn, args.chunk_size)
+        print(f"Rows updated: {updated}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""Micro-benchmark for the scraper's date parsing.
+
+Compares the dateutil-only parser used before the ISO fast path with the
+current parse_date_string/parse_api_date, on a corpus of synthetic LEAP
+payloads shaped like the documents Phase 3 builds and the record dates Phase 2
+compares. Both implementations are checked to agree on every value first.
+It also times the generic date scan against the typed per-endpoint
+extractors in payload_extractors.py. Those read only the record's own date,
+so they ignore the extra date fields the corpus adds.
+
+    python benchmark_dates.py --payloads 20000
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+from unittest import mock
+
+from dateutil import parser
+
+import scraper
+from payload_extractors import extract_payload_fields
+from leap_simulator import SyntheticLeapData
+
+
+def parse_date_string_dateutil_only(date_str: Any) -> Optional[datetime]:
+    """parse_date_string as it was before the fast path, without any caching."""
+    if not date_str or not isinstance(date_str, str):
+        return None
+    try:
+        dt = parser.isoparse(date_str)
+    except ValueError:
+        try:
+            dt = parser.parse(date_str)
+        except (ValueError, TypeError, OverflowError):
+            return None
+    except Exception:
+        return None
+    if dt.tzinfo is None or dt.tzinfo.utcoffset(dt) is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+def parse_api_date_fromisoformat(date_str: Optional[str]) -> Optional[datetime]:
+    """parse_api_date as it was before the fast path."""
+    if not date_str:
+        return None
+    try:
+        dt = datetime.fromisoformat(date_str)
+    except ValueError:
+        return None
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt
+
+
+def build_corpus(payloads: int, seed: int) -> List[Dict[str, Any]]:
+    """Document dicts as fetch_document_metadata builds them, with a few extra date fields in the payload."""
+    data = SyntheticLeapData(profiles=max(1, payloads // 20), records_per_profile=20, seed=seed)
+    corpus = []
+    for record in list(data.records_by_id.values())[:payloads]:
+        payload = data.record_payload(record)
+        day = record['date'][:10]
+        payload.update({
+            'date_received': day,
+            'created_date': f"{day}T09:15:00",
+            'modified_date': f"{day} 16:42:10.250",
+            'closed_date': None,
+            'due_date': '',
+        })
+        corpus.append({
+            'compliance_id': record['compliancerecord_id'],
+            'document_type': record['type'],
+            'title': payload['title'],
+            'submission_date': payload['date'],
+            'status': payload['status'],
+            'metadata': json.dumps(payload),
+        })
+    return corpus
+
+
+def best_of(repeats: int, func: Callable[[], Any], before_each: Callable[[], None] = lambda: None) -> float:
+    timings = []
+    for _ in range(repeats):
+        before_each()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def clear_caches() -> None:
+    scraper._parse_iso_fast.cache_clear()
+    scraper._parse_date_string_dateutil.cache_clear()
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description='Benchmark the scraper\'s date parsing fast path.')
+    arg_parser.add_argument('--payloads', type=int, default=20000, help='Synthetic document payloads (default: %(default)s)')
+    arg_parser.add_argument('--repeats', type=int, default=3, help='Timed repetitions; the best is reported')
+    arg_parser.add_argument('--seed', type=int, default=0)
+    args = arg_parser.parse_args()
+
+    corpus = build_corpus(args.payloads, args.seed)
+    record_dates = [doc['submission_date'] for doc in corpus]
+    distinct = len(set(record_dates))
+    print(f"Corpus: {len(corpus)} payloads, {distinct} distinct record dates.")
+
+    def newest_dates(parse: Callable) -> List[Optional[str]]:
+        with mock.patch.object(scraper, 'parse_date_string', parse):
+            return [scraper.find_newest_date_in_api_response(doc) for doc in corpus]
+
+    # Same answers before comparing speed
+    assert newest_dates(parse_date_string_dateutil_only) == newest_dates(scraper.parse_date_string)
+    assert [parse_api_date_fromisoformat(d) for d in record_dates] == [scraper.parse_api_date(d) for d in record_dates]
+
+    endpoints = [scraper.EPAScraper.type_to_endpoint[doc['document_type']]['endpoint'] for doc in corpus]
+
+    def typed_dates() -> List[Optional[datetime]]:
+        return [scraper.parse_date_string(extract_payload_fields(endpoint, doc).date)
+                for endpoint, doc in zip(endpoints, corpus)]
+
+    date_values = [value for doc in corpus for value in
+                   [doc['submission_date']] + [v for k, v in json.loads(doc['metadata']).items() if 'date' in k.lower()]]
+
+    rows = [
+        ('parse_date_string on every date value, dateutil only',
+         best_of(args.repeats, lambda: [parse_date_string_dateutil_only(v) for v in date_values])),
+        ('parse_date_string on every date value, fast path (cold cache)',
+         best_of(args.repeats, lambda: [scraper.parse_date_string(v) for v in date_values], clear_caches)),
+        ('parse_date_string on every date value, fast path (warm cache)',
+         best_of(args.repeats, lambda: [scraper.parse_date_string(v) for v in date_values])),
+        ('find_newest_date_in_api_response, dateutil only',
+         best_of(args.repeats, lambda: newest_dates(parse_date_string_dateutil_only))),
+        ('find_newest_date_in_api_response, fast path (cold cache)',
+         best_of(args.repeats, lambda: newest_dates(scraper.parse_date_string), clear_caches)),
+        ('find_newest_date_in_api_response, fast path (warm cache)',
+         best_of(args.repeats, lambda: newest_dates(scraper.parse_date_string))),
+        ('typed payload extractor, fast path (cold cache)',
+         best_of(args.repeats, typed_dates, clear_caches)),
+        ('typed payload extractor, fast path (warm cache)',
+         best_of(args.repeats, typed_dates)),
+        ('parse_api_date, fromisoformat',
+         best_of(args.repeats, lambda: [parse_api_date_fromisoformat(d) for d in record_dates])),
+        ('parse_api_date, fast path (cold cache)',
+         best_of(args.repeats, lambda: [scraper.parse_api_date(d) for d in record_dates], clear_caches)),
+        ('parse_api_date, fast path (warm cache)',
+         best_of(args.repeats, lambda: [scraper.parse_api_date(d) for d in record_dates])),
+    ]
+    print(f"\n{'':<66} {'total (ms)':>11}")
+    for label, seconds in rows:
+        print(f"{label:<66} {seconds * 1000:>11.1f}")
+    print(f"\nparse_date_string speedup: {rows[0][1] / rows[1][1]:.1f}x cold, {rows[0][1] / rows[2][1]:.1f}x warm")
+    print(f"find_newest_date_in_api_response speedup: {rows[3][1] / rows[4][1]:.1f}x cold, {rows[3][1] / rows[5][1]:.1f}x warm")
+    print(f"typed payload extractor vs generic scan: {rows[4][1] / rows[6][1]:.1f}x cold, {rows[5][1] / rows[7][1]:.1f}x warm")
+    info = scraper._parse_iso_fast.cache_info()
+    print(f"Fast-path cache: {info.currsize}/{info.maxsize} entries, {info.hits} hits, {info.misses} misses")
+
+
+if __name__ == '__main__':
+    main()
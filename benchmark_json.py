@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""Benchmark the JSON backends in json_codec.py on LEAP-shaped payloads.
+
+The corpus comes from the simulator's synthetic data. It is run through the
+four JSON jobs a scrape and its readers do:
+
+- decode: compliance list pages as they arrive from the API (250 per page);
+- encode: compliance records, as Phase 2 stores them;
+- encode: Phase 3 documents, whose ``metadata`` member is itself the
+  encoded detail response;
+- decode: stored document payloads plus their nested ``metadata``, as the
+  export and backfills read them.
+
+For each installed backend it reports the best wall time over --repeats and
+the peak memory Python allocated during one pass (tracemalloc). Every backend
+is first checked to decode the corpus to the same values as the standard
+library.
+
+    python benchmark_json.py --profiles 400 --records-per-profile 30
+"""
+import argparse
+import json
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+
+import json_codec
+from leap_simulator import SyntheticLeapData
+from scraper import EPAScraper
+
+PAGE_SIZE = 250
+
+
+def build_corpus(profiles: int, records_per_profile: int, seed: int) -> Dict[str, List[Any]]:
+    data = SyntheticLeapData(profiles=profiles, records_per_profile=records_per_profile, seed=seed)
+    pages, records, details = [], [], []
+    for profile_records in data.records_by_profile.values():
+        for start in range(0, len(profile_records), PAGE_SIZE):
+            page = {'count': len(profile_records), 'list': profile_records[start:start + PAGE_SIZE]}
+            pages.append(json.dumps(page).encode('utf-8'))
+        records.extend(profile_records)
+    for record in records:
+        endpoint = EPAScraper.type_to_endpoint[record['type']]
+        url = f"https://data.epa.ie/leap/api/v1/{endpoint['endpoint']}?{endpoint['param']}={record['compliancerecord_id']}"
+        details.append((record, url, data.record_payload(record)))
+    stored = [json.dumps(document(record, url, payload, json.dumps)) for record, url, payload in details]
+    return {'pages': pages, 'records': records, 'details': details, 'stored': stored}
+
+
+def document(record: Dict[str, Any], url: str, payload: Dict[str, Any], dumps: Callable[[Any], str]) -> Dict[str, Any]:
+    """The dict EPAScraper.fetch_document_metadata builds around one detail response."""
+    return {
+        'compliance_id': record['compliancerecord_id'],
+        'document_type': record['type'],
+        'document_url': url,
+        'title': payload.get('title', ''),
+        'description': payload.get('description', ''),
+        'submission_date': payload.get('date', ''),
+        'status': payload.get('status', ''),
+        'metadata': dumps(payload),
+    }
+
+
+def workloads(backend: json_codec.JsonBackend, corpus: Dict[str, List[Any]]) -> List[Tuple[str, Callable[[], Any]]]:
+    dumps, loads = backend.dumps, backend.loads
+    return [
+        ('decode list pages', lambda: [loads(page) for page in corpus['pages']]),
+        ('encode compliance records', lambda: [dumps(record) for record in corpus['records']]),
+        ('encode documents', lambda: [dumps(document(record, url, payload, dumps))
+                                      for record, url, payload in corpus['details']]),
+        ('decode stored documents', lambda: [loads(loads(text)['metadata']) for text in corpus['stored']]),
+    ]
+
+
+def best_time(func: Callable[[], Any], repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def peak_allocated(func: Callable[[], Any]) -> int:
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def check_round_trip(backend: json_codec.JsonBackend, corpus: Dict[str, List[Any]]) -> None:
+    for page in corpus['pages']:
+        assert backend.loads(page) == json.loads(page), f"{backend.name} decodes a list page differently"
+    for text in corpus['stored']:
+        assert backend.loads(text) == json.loads(text), f"{backend.name} decodes a stored document differently"
+        assert json.loads(backend.dumps(json.loads(text))) == json.loads(text), f"{backend.name} round trip differs"
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description='Benchmark JSON backends on LEAP payloads.')
+    arg_parser.add_argument('--profiles', type=int, default=400)
+    arg_parser.add_argument('--records-per-profile', type=int, default=30)
+    arg_parser.add_argument('--repeats', type=int, default=5, help='Timed repetitions; the best is reported')
+    arg_parser.add_argument('--seed', type=int, default=0)
+    args = arg_parser.parse_args()
+
+    corpus = build_corpus(args.profiles, args.records_per_profile, args.seed)
+    page_bytes = sum(len(page) for page in corpus['pages'])
+    print(f"Corpus: {len(corpus['pages'])} list pages ({page_bytes / 1e6:.1f} MB), "
+          f"{len(corpus['records'])} records and documents")
+
+    available = json_codec.available_backends()
+    missing = [name for name in json_codec.BACKENDS if name not in available]
+    print(f"Backends: {', '.join(available)} (active: {json_codec.backend_name()})"
+          + (f"; not installed: {', '.join(missing)}" if missing else ''))
+
+    results: Dict[str, Dict[str, Tuple[float, int]]] = {}
+    for name in available:
+        backend = json_codec.load_backend(name)
+        check_round_trip(backend, corpus)
+        results[name] = {label: (best_time(func, args.repeats), peak_allocated(func))
+                         for label, func in workloads(backend, corpus)}
+
+    print(f"\n{'':<28}" + ''.join(f"{name + ' ms':>14}{'peak MB':>10}" for name in available))
+    for label in results[available[0]]:
+        row = ''.join(f"{results[name][label][0] * 1000:>14.1f}{results[name][label][1] / 1e6:>10.1f}"
+                      for name in available)
+        print(f"{label:<28}{row}")
+    baseline = results['json']
+    for name in available:
+        if name == 'json':
+            continue
+        speedups = ', '.join(f"{label} {baseline[label][0] / seconds:.1f}x"
+                             for label, (seconds, _) in results[name].items())
+        print(f"{name} vs json: {speedups}")
+
+
+if __name__ == '__main__':
+    main()
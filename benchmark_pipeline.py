@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""End-to-end pipeline benchmark against the local LEAP simulator.
+
+Runs Phase 1-3 of the scraper, the CSV export and the RSS feeds in a scratch
+directory at several data scales, and records for each stage the wall time,
+API requests per second, rows written per second and peak Python memory
+(tracemalloc, which also slows the pipeline down, so timings are only
+comparable with other benchmark runs). Results are checked against the budgets in
+benchmark_baseline.json; the exit status is 1 if any stage regressed.
+
+    python benchmark_pipeline.py                      # all scales, check budgets
+    python benchmark_pipeline.py --scales small       # quick run
+    python benchmark_pipeline.py --update-baseline    # re-record budgets
+"""
+import argparse
+import contextlib
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import namedtuple
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List
+
+import requests
+
+import export_to_csv
+from rss_generator import RSSGenerator
+from scraper import EPAScraper
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE_PATH = os.path.join(HERE, 'benchmark_baseline.json')
+
+# Budgets are recorded with this much slack so normal run-to-run noise doesn't fail the check
+DEFAULT_HEADROOM = 1.5
+# Rates over fewer requests/rows than this are mostly noise and get no budget
+MIN_COUNT_FOR_RATE_BUDGET = 50
+
+Scale = namedtuple('Scale', ['profiles', 'records_per_profile', 'documents_per_record'])
+SCALES = {
+    'small': Scale(50, 10, 2),
+    'medium': Scale(200, 20, 2),
+    'large': Scale(1000, 20, 2),
+}
+
+StageResult = namedtuple('StageResult', ['wall_seconds', 'requests', 'rows', 'peak_mb'])
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silence the pipeline's progress output (prints and tqdm bars) while a stage runs."""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull), contextlib.redirect_stderr(devnull):
+        yield
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+@contextlib.contextmanager
+def simulator_process(scale: Scale, latency_ms: float, seed: int):
+    """Run leap_simulator.py in a child process so its allocations stay out of tracemalloc."""
+    port = _free_port()
+    # Documents dated within the last month, so the export stage has a realistic amount to write
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(HERE, 'leap_simulator.py'), '--port', str(port),
+         '--profiles', str(scale.profiles), '--records-per-profile', str(scale.records_per_profile),
+         '--documents-per-record', str(scale.documents_per_record), '--recent-days', '30',
+         '--latency-ms', str(latency_ms), '--seed', str(seed)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}/leap/api/v1"
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                requests.get(f"{base_url}/LicenceProfile/list/", timeout=1)
+                break
+            except requests.exceptions.ConnectionError:
+                if proc.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError("LEAP simulator did not start")
+                time.sleep(0.1)
+        yield base_url
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def measure(stage: Callable[[], int], request_count: Callable[[], int]) -> StageResult:
+    """Run one stage, returning its measurements; the stage returns the number of rows it wrote."""
+    tracemalloc.reset_peak()
+    requests_before = request_count()
+    start = time.perf_counter()
+    with quiet():
+        rows = stage()
+    wall = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    return StageResult(wall, request_count() - requests_before, rows, peak / (1024 * 1024))
+
+
+def run_pipeline(scale: Scale, workers: int, doc_concurrency: int, latency_ms: float, seed: int) -> Dict[str, StageResult]:
+    """Run scrape -> export -> RSS once in a scratch directory and measure each stage."""
+    results: Dict[str, StageResult] = {}
+    original_cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='epa_bench_') as workdir, \
+            simulator_process(scale, latency_ms, seed) as base_url:
+        os.chdir(workdir)
+        tracemalloc.start()
+        try:
+            with quiet():
+                scraper = EPAScraper(workers=workers, document_concurrency=doc_concurrency,
+                                     max_requests_per_second=10000, base_url=base_url)
+            conn = scraper.conn
+
+            def rows_written(stage: Callable[[], Any]) -> Callable[[], int]:
+                def wrapped():
+                    before = conn.total_changes
+                    stage()
+                    return conn.total_changes - before
+                return wrapped
+
+            request_count = lambda: scraper.client.stats['requests']
+            try:
+                results['phase1'] = measure(rows_written(scraper.process_licence_profiles), request_count)
+                pending: List[str] = []
+                results['phase2'] = measure(rows_written(lambda: pending.extend(scraper.process_compliance_records())),
+                                            request_count)
+                results['phase3'] = measure(rows_written(lambda: scraper.process_compliance_documents(pending)),
+                                            request_count)
+            finally:
+                scraper.close()
+
+            def export() -> int:
+                today = datetime.now(timezone.utc).strftime('%Y-%m-%d')
+                csv_path = export_to_csv.generate_recent_documents_csv(today)
+                if not csv_path:
+                    return 0
+                with open(csv_path, encoding='utf-8') as f:
+                    return sum(1 for _ in f) - 1
+
+            def rss() -> int:
+                with RSSGenerator() as generator:
+                    feeds = [generator.generate_daily_documents_rss(output_dir='output'),
+                             generator.generate_csv_listing_rss(csv_dir=os.path.join('output', 'csv', 'daily'),
+                                                                output_dir='output', days=30)]
+                return sum(1 for feed in feeds if feed)
+
+            results['export'] = measure(export, lambda: 0)
+            results['rss'] = measure(rss, lambda: 0)
+        finally:
+            tracemalloc.stop()
+            os.chdir(original_cwd)
+    return results
+
+
+def _per_second(count: int, seconds: float) -> float:
+    return count / seconds if seconds > 0 else 0.0
+
+
+def check_budgets(scale_name: str, results: Dict[str, StageResult], budgets: Dict[str, Any]) -> List[str]:
+    """Return a description of every measurement that is outside its budget."""
+    failures = []
+    for stage, result in results.items():
+        budget = budgets.get(scale_name, {}).get(stage)
+        if not budget:
+            continue
+        label = f"{scale_name}/{stage}"
+        if 'max_wall_seconds' in budget and result.wall_seconds > budget['max_wall_seconds']:
+            failures.append(f"{label}: wall time {result.wall_seconds:.2f}s > {budget['max_wall_seconds']:.2f}s")
+        if 'max_peak_mb' in budget and result.peak_mb > budget['max_peak_mb']:
+            failures.append(f"{label}: peak memory {result.peak_mb:.1f} MB > {budget['max_peak_mb']:.1f} MB")
+        rps = _per_second(result.requests, result.wall_seconds)
+        if 'min_requests_per_second' in budget and rps < budget['min_requests_per_second']:
+            failures.append(f"{label}: {rps:.0f} requests/s < {budget['min_requests_per_second']:.0f}")
+        rows_per_second = _per_second(result.rows, result.wall_seconds)
+        if 'min_rows_per_second' in budget and rows_per_second < budget['min_rows_per_second']:
+            failures.append(f"{label}: {rows_per_second:.0f} rows/s < {budget['min_rows_per_second']:.0f}")
+    return failures
+
+
+def budgets_from(results: Dict[str, StageResult], headroom: float) -> Dict[str, Dict[str, float]]:
+    """Budgets for one scale. Stages too small to time reliably only get generous floors."""
+    budgets = {}
+    for stage, result in results.items():
+        budget = {
+            'max_wall_seconds': round(max(result.wall_seconds, 0.25) * headroom, 3),
+            'max_peak_mb': round(max(result.peak_mb, 1.0) * headroom, 1),
+        }
+        if result.requests >= MIN_COUNT_FOR_RATE_BUDGET:
+            budget['min_requests_per_second'] = round(_per_second(result.requests, result.wall_seconds) / headroom, 1)
+        if result.rows >= MIN_COUNT_FOR_RATE_BUDGET:
+            budget['min_rows_per_second'] = round(_per_second(result.rows, result.wall_seconds) / headroom, 1)
+        budgets[stage] = budget
+    return budgets
+
+
+def print_results(scale_name: str, results: Dict[str, StageResult]) -> None:
+    print(f"\n{scale_name}:")
+    print(f"  {'stage':<8} {'wall (s)':>9} {'requests':>9} {'req/s':>8} {'rows':>8} {'rows/s':>9} {'peak MB':>8}")
+    for stage, r in results.items():
+        print(f"  {stage:<8} {r.wall_seconds:>9.2f} {r.requests:>9} {_per_second(r.requests, r.wall_seconds):>8.0f} "
+              f"{r.rows:>8} {_per_second(r.rows, r.wall_seconds):>9.0f} {r.peak_mb:>8.1f}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Benchmark the scrape -> export -> RSS pipeline against the LEAP simulator.')
+    parser.add_argument('--scales', nargs='+', choices=sorted(SCALES), default=['small', 'medium', 'large'])
+    parser.add_argument('--workers', type=int, default=4, help='Phase 2 workers (default: %(default)s)')
+    parser.add_argument('--doc-concurrency', type=int, default=8, help='Phase 3 requests in flight (default: %(default)s)')
+    parser.add_argument('--latency-ms', type=float, default=5.0, help='Simulated API latency (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE_PATH, help='Budget file (default: %(default)s)')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='Record these results as the new budgets instead of checking against them')
+    parser.add_argument('--headroom', type=float, default=DEFAULT_HEADROOM,
+                        help='Slack applied when recording budgets (default: %(default)s)')
+    parser.add_argument('--json', dest='json_path', help='Also write raw results to this file')
+    args = parser.parse_args()
+
+    budgets: Dict[str, Any] = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            budgets = json.load(f)
+
+    all_results = {}
+    failures = []
+    for scale_name in args.scales:
+        results = run_pipeline(SCALES[scale_name], args.workers, args.doc_concurrency, args.latency_ms, args.seed)
+        all_results[scale_name] = results
+        print_results(scale_name, results)
+        if args.update_baseline:
+            budgets[scale_name] = budgets_from(results, args.headroom)
+        else:
+            failures.extend(check_budgets(scale_name, results, budgets))
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump({scale: {stage: r._asdict() for stage, r in results.items()}
+                       for scale, results in all_results.items()}, f, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(budgets, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"\nBaseline budgets written to {args.baseline}")
+        return 0
+
+    if not budgets:
+        print(f"\nNo baseline at {args.baseline}; run with --update-baseline to record one.")
+        return 0
+    if failures:
+        print("\nBudget regressions:")
+        for failure in failures:
+            print(f"  {failure}")
+        return 1
+    print("\nAll stages within budget.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
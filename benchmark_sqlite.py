@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""Benchmark the SQLite connection profiles in db.py, one setting at a time.
+
+Two workloads run on a scratch database with the scraper's schema:
+
+- ingest: Phase 2/3-shaped writes. Compliance record and document upserts
+  plus last_checked touches are committed in small checkpoint transactions,
+  as the scraper does.
+- query: the reads that reporting does. These are the CSV export's
+  date-range join, Phase 3's document URL scan and the profile cache load,
+  each repeated on one connection.
+
+Each PRAGMA from the profile is measured alone on top of SQLite's defaults,
+and then the whole profile is measured:
+
+    python benchmark_sqlite.py --records 50000
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Tuple
+
+import db
+import migrations
+import scraper
+
+CHECKPOINT_RECORDS = 50
+DOCUMENTS_PER_RECORD = 1
+
+
+def build_rows(records: int, profiles: int, seed: int) -> Tuple[List[Tuple], List[Tuple], List[Tuple]]:
+    """Synthetic licence_profiles, compliance_records and compliance_documents rows."""
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc).isoformat()
+    start = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    profile_rows = [(str(uuid.UUID(int=rng.getrandbits(128))), f"Facility {i}", f"P{i:04d}-01", 'Industrial Emissions',
+                     f"W{i:04d}-01", 'Cork', 'Cork Town', f"Operator {i} Ltd", '', now, now, None)
+                    for i in range(profiles)]
+    record_rows, document_rows = [], []
+    for i in range(records):
+        record_id = str(uuid.UUID(int=rng.getrandbits(128)))
+        profile_id = profile_rows[i % profiles][0]
+        date = (start + timedelta(days=rng.randrange(6 * 365))).isoformat()
+        payload = {'compliancerecord_id': record_id, 'type': 'Monitoring Returns', 'title': f"Return {i}",
+                   'status': 'Open', 'date': date, 'notes': 'x' * rng.randrange(200, 2000)}
+        record_rows.append((record_id, profile_id, 'Monitoring Returns', payload['title'], 'Open', date,
+                            now, now, json.dumps(payload)))
+        for _ in range(DOCUMENTS_PER_RECORD):
+            url = f"https://data.epa.ie/leap/api/v1/LicenseeReturn/lrbyid?lr_id={uuid.UUID(int=rng.getrandbits(128))}"
+            document_rows.append((date, url, record_id, None, 'Monitoring Returns', payload['title'], None,
+                                  now, now, json.dumps(payload), None, None, 'Open', 1))
+    return profile_rows, record_rows, document_rows
+
+
+def create_database(path: str, profile_rows: List[Tuple]) -> None:
+    conn = sqlite3.connect(path)
+    migrations.migrate(conn)
+    conn.executemany("INSERT INTO licence_profiles VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", profile_rows)
+    conn.commit()
+    conn.close()
+
+
+def open_with(path: str, pragmas: Dict[str, Any]) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=30)
+    db.apply_pragmas(conn, pragmas)
+    return conn
+
+
+def ingest(conn: sqlite3.Connection, record_rows: List[Tuple], document_rows: List[Tuple]) -> None:
+    """Insert everything in checkpoint-sized transactions, then touch it all once more, as a re-run would."""
+    now = datetime.now(timezone.utc).isoformat()
+    for start in range(0, len(record_rows), CHECKPOINT_RECORDS):
+        records = record_rows[start:start + CHECKPOINT_RECORDS]
+        documents = document_rows[start * DOCUMENTS_PER_RECORD:(start + len(records)) * DOCUMENTS_PER_RECORD]
+        conn.executemany(scraper.WRITE_SQL['record_upsert'], records)
+        conn.executemany(scraper.WRITE_SQL['document_upsert'], documents)
+        conn.commit()
+    for start in range(0, len(document_rows), CHECKPOINT_RECORDS):
+        conn.executemany(scraper.WRITE_SQL['document_touch'],
+                         [(now, row[1]) for row in document_rows[start:start + CHECKPOINT_RECORDS]])
+        conn.commit()
+
+
+def query(conn: sqlite3.Connection, repeats: int) -> None:
+    for _ in range(repeats):
+        conn.execute("""
+            SELECT d.document_type, d.title, d.leap_url, d.document_date, cr.status, cr.date, d.document_url,
+                   d.metadata_json, cr.licenceprofileid
+            FROM compliance_documents d
+            JOIN compliance_records cr ON d.compliance_id = cr.compliancerecord_id
+            WHERE d.document_date_ts >= 1672531200 AND d.document_date_ts < 1688169600  -- 2023-01-01 to 2023-07-01
+            ORDER BY d.document_date_ts DESC, d.document_url
+        """).fetchall()
+        conn.execute("SELECT document_url FROM compliance_documents").fetchall()
+        conn.execute("SELECT * FROM licence_profiles").fetchall()
+
+
+def timed(func: Callable[[], None]) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description='Benchmark SQLite connection profile settings.')
+    arg_parser.add_argument('--records', type=int, default=30000, help='Compliance records (and documents) to ingest')
+    arg_parser.add_argument('--profiles', type=int, default=1500)
+    arg_parser.add_argument('--query-repeats', type=int, default=5)
+    arg_parser.add_argument('--repeats', type=int, default=3, help='Runs per variant; the best is reported')
+    arg_parser.add_argument('--seed', type=int, default=0)
+    args = arg_parser.parse_args()
+
+    profile_rows, record_rows, document_rows = build_rows(args.records, args.profiles, args.seed)
+    workdir = tempfile.mkdtemp(prefix='epa-sqlite-bench-')
+    template = os.path.join(workdir, 'template.db')
+    create_database(template, profile_rows)
+
+    def variants(profile: str) -> List[Tuple[str, Dict[str, Any]]]:
+        settings = {k: v for k, v in db.PROFILES[profile].items() if k not in ('busy_timeout', 'query_only')}
+        return ([('defaults', {})] + [(f"{name}={value}", {name: value}) for name, value in settings.items()]
+                + [(f"'{profile}' profile", db.PROFILES[profile])])
+
+    try:
+        print(f"Ingest: {len(record_rows)} records + {len(document_rows)} documents, "
+              f"{CHECKPOINT_RECORDS}-record transactions")
+        loaded = None
+        ingest_rows = []
+        path = os.path.join(workdir, 'ingest.db')
+        for label, pragmas in variants('ingest'):
+            timings = []
+            for _ in range(args.repeats):
+                for suffix in ('', '-wal', '-shm'):
+                    if os.path.exists(path + suffix):
+                        os.remove(path + suffix)
+                shutil.copy(template, path)
+                conn = open_with(path, pragmas)
+                timings.append(timed(lambda: ingest(conn, record_rows, document_rows)))
+                conn.close()
+                if loaded is None:
+                    # Query workload runs on the defaults-built copy (rollback journal)
+                    loaded = os.path.join(workdir, 'loaded.db')
+                    shutil.copy(path, loaded)
+            ingest_rows.append((label, min(timings)))
+        baseline = ingest_rows[0][1]
+        for label, seconds in ingest_rows:
+            print(f"  {label:<32} {seconds:8.2f}s  {baseline / seconds:5.1f}x")
+
+        print(f"\nQuery: export join + document URL scan + profile load, x{args.query_repeats} per connection")
+        query_rows = []
+        for label, pragmas in variants('reporting'):
+            timings = []
+            for _ in range(args.repeats):
+                conn = open_with(loaded, pragmas)
+                timings.append(timed(lambda: query(conn, args.query_repeats)))
+                conn.close()
+            query_rows.append((label, min(timings)))
+        baseline = query_rows[0][1]
+        for label, seconds in query_rows:
+            print(f"  {label:<32} {seconds:8.2f}s  {baseline / seconds:5.1f}x")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
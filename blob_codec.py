@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""Compressed storage for the metadata_json columns.
+
+Payloads are stored either as plain JSON text (rows written before
+compression, or payloads too small to gain anything) or as a BLOB:
+
+    b'ZJ' + dictionary id (2 bytes, big-endian) + raw deflate stream
+
+The deflate stream is primed with a preset dictionary trained on existing
+payloads and kept in the ``blob_dictionaries`` table. LEAP payloads repeat the
+same keys, document types and escaped inner-JSON structure, so the
+dictionary matters most for the many small payloads that plain zlib cannot
+shrink. Dictionary id 0 means no dictionary. Only the standard library's zlib
+is used, so no new dependency is needed.
+
+Readers call BlobCodec.decode() on whatever the column holds, or wrap it in a
+LazyPayload so the decompression and JSON parsing only happen if the payload
+is actually used.
+"""
+import re
+import sqlite3
+import struct
+import zlib
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional, Union
+
+import json_codec
+
+MAGIC = b'ZJ'
+HEADER = struct.Struct('>2sH')
+COMPRESSION_LEVEL = 9
+DICTIONARY_SIZE = 32 * 1024  # zlib only looks back 32 KiB
+TRAIN_SAMPLE_ROWS = 2000
+
+# JSON members, plain or escaped inside a nested JSON string, with short scalar values
+_FRAGMENT_RE = re.compile(
+    r'\\?"(?:[^"\\]|\\.){1,64}?\\?"\s*:\s*'
+    r'(?:\\?"(?:[^"\\]|\\.){0,64}?\\?"|-?\d[\d.]*|true|false|null)?\s*,?\s*'
+)
+
+StoredPayload = Union[str, bytes, None]
+
+
+def train_dictionary(samples: Iterable[str], size: int = DICTIONARY_SIZE) -> bytes:
+    """Build a zlib preset dictionary from JSON fragments that recur across samples.
+
+    Fragments are ranked by the bytes they would save across the sample. The
+    best ones go at the end, where deflate can reach them with the shortest
+    distances.
+    """
+    counts: Counter = Counter()
+    for sample in samples:
+        if sample:
+            counts.update(set(_FRAGMENT_RE.findall(sample)))
+    ranked = sorted((frag for frag, count in counts.items() if count > 1),
+                    key=lambda frag: counts[frag] * len(frag), reverse=True)
+    chosen, total = [], 0
+    for fragment in ranked:
+        encoded = fragment.encode('utf-8')
+        if total + len(encoded) > size:
+            continue
+        chosen.append(encoded)
+        total += len(encoded)
+    return b''.join(reversed(chosen))
+
+
+class BlobCodec:
+    """Encode/decode metadata_json values with the dictionaries stored in one database."""
+
+    def __init__(self, conn: Optional[sqlite3.Connection] = None):
+        self.conn = conn
+        self._dictionaries: Dict[int, bytes] = {0: b''}
+        self.dict_id = 0
+        if conn is not None:
+            self._load()
+
+    def _load(self) -> None:
+        try:
+            rows = self.conn.execute("SELECT dict_id, dictionary FROM blob_dictionaries ORDER BY dict_id").fetchall()
+        except sqlite3.OperationalError:
+            # Schema older than the compression migration: plain zlib only
+            return
+        for dict_id, dictionary in rows:
+            self._dictionaries[dict_id] = bytes(dictionary)
+            self.dict_id = dict_id
+
+    def add_dictionary(self, dictionary: bytes, sample_rows: int) -> int:
+        """Store a newly trained dictionary and use it for subsequent encodes (caller commits)."""
+        cursor = self.conn.execute(
+            "INSERT INTO blob_dictionaries (created_at, sample_rows, dictionary) VALUES (?, ?, ?)",
+            (datetime.now(timezone.utc).isoformat(), sample_rows, dictionary))
+        self.dict_id = cursor.lastrowid
+        self._dictionaries[self.dict_id] = dictionary
+        return self.dict_id
+
+    def encode(self, text: Optional[str]) -> StoredPayload:
+        """Compressed form of ``text``, or ``text`` itself when compression would not make it smaller."""
+        if text is None:
+            return None
+        raw = text.encode('utf-8')
+        zdict = self._dictionaries[self.dict_id]
+        compressor = zlib.compressobj(COMPRESSION_LEVEL, zlib.DEFLATED, -15, zdict=zdict) if zdict \
+            else zlib.compressobj(COMPRESSION_LEVEL, zlib.DEFLATED, -15)
+        packed = HEADER.pack(MAGIC, self.dict_id) + compressor.compress(raw) + compressor.flush()
+        return packed if len(packed) < len(raw) else text
+
+    def decode(self, value: StoredPayload) -> Optional[str]:
+        """JSON text of a stored value, whichever form it was stored in."""
+        if value is None or isinstance(value, str):
+            return value
+        value = bytes(value)
+        if value[:2] != MAGIC:
+            return value.decode('utf-8')
+        _, dict_id = HEADER.unpack_from(value)
+        zdict = self._dictionary(dict_id)
+        decompressor = zlib.decompressobj(-15, zdict=zdict) if zdict else zlib.decompressobj(-15)
+        return (decompressor.decompress(value[HEADER.size:]) + decompressor.flush()).decode('utf-8')
+
+    def loads(self, value: StoredPayload) -> Any:
+        text = self.decode(value)
+        return json_codec.loads(text) if text else None
+
+    def _dictionary(self, dict_id: int) -> bytes:
+        if dict_id not in self._dictionaries and self.conn is not None:
+            # Trained by another process after this codec was loaded
+            self._load()
+        try:
+            return self._dictionaries[dict_id]
+        except KeyError:
+            raise ValueError(f"Unknown compression dictionary {dict_id}") from None
+
+
+class LazyPayload:
+    """A stored metadata_json value that is only decompressed and parsed when first used."""
+
+    __slots__ = ('_value', '_codec', '_text', '_json')
+    _UNSET = object()
+
+    def __init__(self, value: StoredPayload, codec: BlobCodec):
+        self._value = value
+        self._codec = codec
+        self._text = self._UNSET
+        self._json = self._UNSET
+
+    @property
+    def text(self) -> Optional[str]:
+        if self._text is self._UNSET:
+            self._text = self._codec.decode(self._value)
+        return self._text
+
+    def json(self) -> Any:
+        if self._json is self._UNSET:
+            self._json = json_codec.loads(self.text) if self.text else None
+        return self._json
+
+    def __bool__(self) -> bool:
+        return bool(self._value)
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""Convert existing metadata_json values to compressed storage (see blob_codec.py).
+
+Trains a preset dictionary from a sample of current payloads, if the database
+has none yet or --retrain is given. It then rewrites the plain-text
+metadata_json values of compliance_records and compliance_documents in
+chunks, committing after each chunk, so the job can be interrupted and
+re-run safely. It reports the database size and the time to scan and decode
+every payload, before and after.
+
+    python compress_metadata.py --db epa_ireland.db --chunk-size 2000 --vacuum
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from typing import Tuple
+
+from tqdm import tqdm
+
+import db
+import migrations
+from blob_codec import TRAIN_SAMPLE_ROWS, BlobCodec, train_dictionary
+
+DB_PATH = "epa_ireland.db"
+DEFAULT_CHUNK_SIZE = 2000
+TABLES = ("compliance_records", "compliance_documents")
+
+
+def database_bytes(conn: sqlite3.Connection) -> Tuple[int, int]:
+    """(file size, bytes in use): the file only shrinks after VACUUM, the in-use size shrinks straight away."""
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+    free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    return page_count * page_size, (page_count - free_pages) * page_size
+
+
+def scan_seconds(conn: sqlite3.Connection, codec: BlobCodec) -> Tuple[float, float]:
+    """(seconds to read every payload, seconds to read and decode every payload)."""
+    start = time.perf_counter()
+    for table in TABLES:
+        for _ in conn.execute(f"SELECT metadata_json FROM {table}"):
+            pass
+    read = time.perf_counter() - start
+    start = time.perf_counter()
+    for table in TABLES:
+        for (value,) in conn.execute(f"SELECT metadata_json FROM {table}"):
+            codec.decode(value)
+    return read, time.perf_counter() - start
+
+
+def train(conn: sqlite3.Connection, codec: BlobCodec, sample_rows: int) -> int:
+    samples = []
+    for table in TABLES:
+        samples += [codec.decode(row[0]) for row in conn.execute(
+            f"SELECT metadata_json FROM {table} WHERE metadata_json IS NOT NULL ORDER BY random() LIMIT ?",
+            (sample_rows // len(TABLES),))]
+    dictionary = train_dictionary(samples)
+    dict_id = codec.add_dictionary(dictionary, len(samples))
+    conn.commit()
+    print(f"Trained dictionary {dict_id}: {len(dictionary)} bytes from {len(samples)} payloads.")
+    return dict_id
+
+
+def convert_table(conn: sqlite3.Connection, codec: BlobCodec, table: str, chunk_size: int, recompress: bool) -> int:
+    """Rewrite plain (or, with recompress, older-dictionary) payloads chunk by chunk; returns rows changed."""
+    if recompress:
+        condition = "metadata_json IS NOT NULL"
+    else:
+        condition = "typeof(metadata_json) = 'text'"
+    total = conn.execute(f"SELECT COUNT(*) FROM {table} WHERE {condition}").fetchone()[0]
+    changed = 0
+    last_rowid = -1
+    with tqdm(total=total, desc=f"Compressing {table}") as progress:
+        while True:
+            rows = conn.execute(
+                f"SELECT rowid, metadata_json FROM {table} WHERE rowid > ? AND {condition} ORDER BY rowid LIMIT ?",
+                (last_rowid, chunk_size)).fetchall()
+            if not rows:
+                break
+            last_rowid = rows[-1][0]
+            updates = []
+            for rowid, value in rows:
+                encoded = codec.encode(codec.decode(value))
+                if encoded != value:
+                    updates.append((encoded, rowid))
+            conn.executemany(f"UPDATE {table} SET metadata_json = ? WHERE rowid = ?", updates)
+            conn.commit()
+            changed += len(updates)
+            progress.update(len(rows))
+    return changed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compress metadata_json payloads in place.")
+    parser.add_argument("--db", default=DB_PATH, help="Path to SQLite database (default: %(default)s)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Rows per transaction")
+    parser.add_argument("--sample-rows", type=int, default=TRAIN_SAMPLE_ROWS, help="Payloads used to train the dictionary")
+    parser.add_argument("--retrain", action="store_true",
+                        help="Train a new dictionary even if one exists, and recompress every row with it")
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM afterwards so the file itself shrinks")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"Database {args.db} not found.")
+        sys.exit(1)
+    conn = db.connect(args.db, 'ingest')
+    try:
+        for step in migrations.migrate(conn):
+            print(f"Applied schema migration {step}")
+        codec = BlobCodec(conn)
+        file_before, used_before = database_bytes(conn)
+        read_before, decode_before = scan_seconds(conn, codec)
+
+        retrained = False
+        if codec.dict_id == 0 or args.retrain:
+            train(conn, codec, args.sample_rows)
+            retrained = args.retrain
+        changed = sum(convert_table(conn, codec, table, args.chunk_size, retrained) for table in TABLES)
+        if args.vacuum:
+            print("Vacuuming…")
+            conn.execute("VACUUM")
+
+        file_after, used_after = database_bytes(conn)
+        read_after, decode_after = scan_seconds(conn, codec)
+        print(f"\nRows rewritten: {changed}")
+        print(f"Database in use: {used_before / 1e6:.1f} MB -> {used_after / 1e6:.1f} MB "
+              f"({used_after / used_before if used_before else 1:.0%}); file {file_before / 1e6:.1f} MB -> {file_after / 1e6:.1f} MB")
+        print(f"Full payload scan: {read_before:.2f}s -> {read_after:.2f}s read only, "
+              f"{decode_before:.2f}s -> {decode_after:.2f}s including decode")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Shared SQLite connection factory.
+
+Every entry point opens ``epa_ireland.db`` through connect() with a named
+profile instead of calling bare ``sqlite3.connect``:
+
+- ``ingest``: for the scraper and other writers. It switches the database to
+  WAL, so readers never block the writer and the writer never blocks readers.
+  It uses ``synchronous=NORMAL``, which is durable at checkpoints and still
+  crash-safe under WAL. It also sets a large page cache, memory-mapped reads
+  and in-memory temp tables.
+- ``reporting``: for the RSS feeds and other readers. It opens read-only
+  (``mode=ro`` plus ``query_only``) with the same cache and mmap settings.
+  Under WAL each query sees a consistent snapshot even while a scrape is
+  writing.
+
+``benchmark_sqlite.py`` measures what each setting contributes.
+"""
+import calendar
+import sqlite3
+from datetime import date, datetime
+from typing import Any, Dict, Union
+
+DB_PATH = "epa_ireland.db"
+
+# Negative cache_size is in KiB
+PROFILES: Dict[str, Dict[str, Any]] = {
+    'ingest': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -64 * 1024,
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 30000,
+    },
+    'reporting': {
+        'query_only': 1,
+        'cache_size': -32 * 1024,
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 30000,
+    },
+}
+
+READ_ONLY_PROFILES = {'reporting'}
+
+
+def apply_pragmas(conn: sqlite3.Connection, pragmas: Dict[str, Any]) -> None:
+    for name, value in pragmas.items():
+        conn.execute(f"PRAGMA {name} = {value}")
+
+
+def epoch_seconds(value: Union[date, datetime]) -> int:
+    """Value for comparing with the *_ts columns: a date means its 00:00 UTC, a naive datetime is taken as UTC."""
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return int(value.timestamp())
+    return calendar.timegm(value.timetuple())
+
+
+def connect(path: str = DB_PATH, profile: str = 'ingest', **kwargs) -> sqlite3.Connection:
+    """Open ``path`` with the named profile's PRAGMAs.
+
+    Extra keyword arguments go to sqlite3.connect (e.g. ``factory=TimedConnection``).
+    Read-only profiles fail with sqlite3.OperationalError if the database does not exist.
+    """
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown connection profile {profile!r}; expected one of {sorted(PROFILES)}")
+    kwargs.setdefault('timeout', PROFILES[profile].get('busy_timeout', 5000) / 1000)
+    if profile in READ_ONLY_PROFILES:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, **kwargs)
+    else:
+        conn = sqlite3.connect(path, **kwargs)
+    apply_pragmas(conn, PROFILES[profile])
+    return conn
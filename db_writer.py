@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""Background SQLite writer with group commit.
+
+DBWriter owns a connection of its own on a dedicated thread. Callers submit
+write units (lists of ``(sql, rows)`` statements run with executemany) to a
+bounded queue and carry on fetching while earlier units are written. Units
+are applied in submission order and each is atomic. Several units share one
+transaction, which is committed once it holds ``group_size`` units, once
+``group_seconds`` have passed since the first uncommitted unit, or on
+flush().
+
+Reads stay on the caller's connection, so callers flush() before reading
+anything the writer may still hold.
+
+A unit that fails with an SQLite error is rolled back on its own and the
+rest of the group still commits. flush() and close() then raise
+DroppedWritesError, so the caller learns that some of its writes never
+landed. This holds for every later call too, not just the first.
+"""
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+DEFAULT_QUEUE_SIZE = 64
+DEFAULT_GROUP_SIZE = 32
+DEFAULT_GROUP_SECONDS = 0.5
+
+WriteUnit = List[Tuple[str, Sequence[Sequence[Any]]]]
+
+logger = logging.getLogger(__name__)
+
+_CLOSE = object()
+
+
+class DroppedWritesError(sqlite3.DatabaseError):
+    """One or more submitted units were rolled back after an error and are not in the database."""
+
+
+class DBWriter:
+    """Single writer thread for one SQLite database."""
+
+    def __init__(self, db_path: str, connect: Callable[[str], sqlite3.Connection] = sqlite3.connect,
+                 queue_size: int = DEFAULT_QUEUE_SIZE, group_size: int = DEFAULT_GROUP_SIZE,
+                 group_seconds: float = DEFAULT_GROUP_SECONDS):
+        self.db_path = db_path
+        self.group_size = max(1, group_size)
+        self.group_seconds = group_seconds
+        self.conn: Optional[sqlite3.Connection] = None
+        self.units_written = 0
+        self.units_failed = 0
+        self.commits = 0
+        self._connect = connect
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, queue_size))
+        self._error: Optional[BaseException] = None
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='db-writer', daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        self._raise_if_failed()
+
+    def submit(self, unit: WriteUnit) -> None:
+        """Queue one atomic unit of writes; blocks while the queue is full."""
+        self._raise_if_failed()
+        unit = [(sql, rows) for sql, rows in unit if rows]
+        if unit:
+            self._queue.put(unit)
+
+    def flush(self) -> None:
+        """Block until everything submitted so far is committed; raises DroppedWritesError if any unit was not."""
+        self._raise_if_failed()
+        done = threading.Event()
+        self._queue.put(done)
+        while not done.wait(0.1):
+            if not self._thread.is_alive():
+                break
+        self._raise_if_failed()
+        self._raise_if_dropped()
+
+    def close(self) -> None:
+        """Commit outstanding writes, stop the thread and close its connection."""
+        if self._thread.is_alive():
+            self._queue.put(_CLOSE)
+            self._thread.join()
+        self._raise_if_failed()
+        self._raise_if_dropped()
+
+    def _raise_if_failed(self) -> None:
+        if self._error is not None:
+            raise sqlite3.OperationalError(f"DB writer thread stopped: {self._error}") from self._error
+
+    def _raise_if_dropped(self) -> None:
+        if self.units_failed:
+            raise DroppedWritesError(f"{self.units_failed} write unit(s) were rolled back after errors (see log)")
+
+    # ---- Writer thread ----
+
+    def _run(self) -> None:
+        try:
+            self.conn = self._connect(self.db_path)
+        except BaseException as e:
+            self._error = e
+            self._ready.set()
+            return
+        self._ready.set()
+        pending: List[WriteUnit] = []
+        group_started = 0.0
+        try:
+            while True:
+                timeout = None
+                if pending:
+                    timeout = max(0.0, group_started + self.group_seconds - time.monotonic())
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    self._commit(pending)
+                    continue
+                if isinstance(item, list):
+                    if not pending:
+                        group_started = time.monotonic()
+                    self._apply(item, pending)
+                    if len(pending) >= self.group_size:
+                        self._commit(pending)
+                    continue
+                self._commit(pending)
+                if item is _CLOSE:
+                    return
+                item.set()  # flush() marker
+        except BaseException as e:
+            self._error = e
+            logger.exception("DB writer thread failed")
+            # Wake any flush() callers still waiting on markers
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if isinstance(item, threading.Event):
+                    item.set()
+        finally:
+            self.conn.close()
+
+    def _execute(self, unit: WriteUnit) -> None:
+        cursor = self.conn.cursor()
+        for sql, rows in unit:
+            cursor.executemany(sql, rows)
+
+    def _apply(self, unit: WriteUnit, pending: List[WriteUnit]) -> None:
+        """Run a unit inside the open group transaction, isolated by a savepoint."""
+        if not self.conn.in_transaction:
+            # Releasing a savepoint opened outside a transaction would commit it straight away
+            self.conn.execute("BEGIN")
+        self.conn.execute("SAVEPOINT unit")
+        try:
+            self._execute(unit)
+        except sqlite3.Error as e:
+            self.conn.execute("ROLLBACK TO unit")
+            self.conn.execute("RELEASE unit")
+            self.units_failed += 1
+            logger.error(f"Dropped write unit after error: {e}")
+            return
+        self.conn.execute("RELEASE unit")
+        pending.append(unit)
+
+    def _commit(self, pending: List[WriteUnit]) -> None:
+        if self.conn.in_transaction:
+            self.conn.commit()
+            self.commits += 1
+        self.units_written += len(pending)
+        pending.clear()
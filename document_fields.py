@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""Fields pulled out of LEAP document payloads into their own columns.
+
+A document payload carries a second JSON document as a string in its
+``metadata`` member. Complaints and Incidents often have a blank ``title`` and
+keep their headline in the nested ``subject``. Reading it used to mean
+decompressing metadata_json and parsing JSON twice for every such row. The
+scraper now extracts these fields once, when a document is first stored,
+with the endpoint's extractor from payload_extractors.py. The values go
+into the subject, description and status columns of
+compliance_documents, and readers select those columns instead.
+
+``fields_version`` records which version of the extraction filled a row. It
+is NULL for rows stored before these columns existed.
+backfill_document_fields.py fills in those rows, and re-extracts rows from an
+older version after DOCUMENT_FIELDS_VERSION is bumped.
+"""
+from collections import namedtuple
+from typing import Any, Dict, Optional
+
+from payload_extractors import PayloadFields, endpoint_for_url, extract_payload_fields
+
+DOCUMENT_FIELDS = ('subject', 'description', 'status')
+DOCUMENT_FIELDS_VERSION = 1
+
+DocumentFields = namedtuple('DocumentFields', DOCUMENT_FIELDS)
+NO_FIELDS = DocumentFields(None, None, None)
+
+
+def document_fields(fields: PayloadFields) -> DocumentFields:
+    return DocumentFields(*(getattr(fields, name) for name in DOCUMENT_FIELDS))
+
+
+def extract_document_fields(payload: Optional[Dict[str, Any]]) -> DocumentFields:
+    """Subject, description and status of one stored document payload (see payload_extractors.py)."""
+    if not isinstance(payload, dict):
+        return NO_FIELDS
+    return document_fields(extract_payload_fields(endpoint_for_url(payload.get('document_url')), payload))
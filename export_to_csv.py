@@ -2,81 +2,80 @@
 """
 Standalone CSV generator for EPA Ireland data.
 Exports documents created in the past N days to a single CSV file.
-Only includes documents not already present in previous CSVs.
+Only includes documents not already present in previous CSVs. The
+export_ledger table records which documents went into which file, and is
+written in the same transaction as the CSV.
 """
 import sqlite3
 import csv
 import os
 import sys
+import zlib
 from datetime import datetime, timezone, timedelta
 
+import db
+import migrations
+from blob_codec import BlobCodec
+from document_fields import extract_document_fields
+from profile_cache import ProfileCache, compute_leap_url
+
 # Configuration
 DB_PATH = 'epa_ireland.db'
 OUTPUT_DIR = os.path.join('output', 'csv', 'daily')
 DEFAULT_DAYS_BACK = 4
 
-# Mapping from document_type to URL segment for constructing LEAP URLs
-TYPE_SEGMENT_MAP = {
-    "Monitoring Returns": "return",
-    "Annual Environmental Report": "return",
-    "Requests for Approval and Site Reports": "return",
-    "Site Updates/Notifications": "return",
-    "Site Closure and Surrender": "return",
-    "Site Visit": "sitevisit",
-    "Non Compliance": "non-compliance",
-    "Incident": "incident",
-    "Complaint": "complaint",
-    "Compliance Investigation": "investigation",
-    "EPA Initiated Correspondence": "epa-correspondence",
-}
+def csv_path_for(day):
+    """output/csv/daily/YYYY/MM/YYYY-MM-DD.csv for a date."""
+    return os.path.join(OUTPUT_DIR, day.strftime("%Y"), day.strftime("%m"), f"{day.isoformat()}.csv")
 
 
-def get_previously_exported_documents(days_back):
-    """Get a set of document URLs that have been exported in recent CSVs.
-    
-    Args:
-        days_back: Number of days to look back for existing CSVs
-        
-    Returns:
-        set: Set of document URLs that have already been exported
+def read_csv_document_urls(csv_path):
+    """Document URLs listed in one exported CSV file."""
+    urls = []
+    with open(csv_path, 'r', encoding='utf-8') as f:
+        csv_reader = csv.reader(f)
+        # Read header to find document_url column index
+        header = next(csv_reader, None)
+        if header and 'document_url' in header:
+            doc_url_index = header.index('document_url')
+            for row in csv_reader:
+                if len(row) > doc_url_index:
+                    doc_url = row[doc_url_index].strip()
+                    if doc_url:
+                        urls.append(doc_url)
+    return urls
+
+
+def ledger_window_start(days_back):
+    """Oldest CSV date whose documents count as already exported (go back an extra day to be safe)."""
+    return datetime.now(timezone.utc).date() - timedelta(days=days_back + 1)
+
+
+def seed_ledger_from_csvs(conn, days_back):
+    """Record CSVs in the export window that the ledger does not know about yet.
+
+    Covers files written before the ledger existed, or by hand. Each file is
+    read once; after that its documents are in export_ledger.
     """
-    exported_docs = set()
     today = datetime.now(timezone.utc).date()
-    
-    # Calculate date range to check (go back extra day to be safe)
-    start_date = today - timedelta(days=days_back + 1)
-    
-    # Walk through relevant date directories only
-    current_date = start_date
+    current_date = ledger_window_start(days_back)
     while current_date <= today:
-        year = current_date.strftime("%Y")
-        month = current_date.strftime("%m")
-        date_str = current_date.strftime("%Y-%m-%d")
-        
-        # Build the expected CSV path
-        csv_path = os.path.join(OUTPUT_DIR, year, month, f"{date_str}.csv")
-        
-        if os.path.exists(csv_path):
+        csv_path = csv_path_for(current_date)
+        if os.path.exists(csv_path) and not conn.execute(
+                "SELECT 1 FROM export_ledger WHERE file = ? LIMIT 1", (csv_path,)).fetchone():
             try:
-                with open(csv_path, 'r', encoding='utf-8') as f:
-                    csv_reader = csv.reader(f)
-                    # Read header to find document_url column index
-                    header = next(csv_reader, None)
-                    if header and 'document_url' in header:
-                        doc_url_index = header.index('document_url')
-                        # Read document URLs from the correct column
-                        for row in csv_reader:
-                            if len(row) > doc_url_index:
-                                doc_url = row[doc_url_index].strip()
-                                if doc_url:
-                                    exported_docs.add(doc_url)
+                urls = read_csv_document_urls(csv_path)
             except Exception as e:
                 print(f"Warning: Could not read {csv_path}: {e}")
-        
-        # Move to next day
+                urls = []
+            exported_at = datetime.fromtimestamp(os.path.getmtime(csv_path), timezone.utc).isoformat()
+            with conn:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO export_ledger (document_url, file, export_date, exported_at) VALUES (?, ?, ?, ?)",
+                    [(url, csv_path, current_date.isoformat(), exported_at) for url in urls])
+            print(f"Recorded {len(urls)} previously exported documents from {csv_path}")
         current_date += timedelta(days=1)
-    
-    return exported_docs
+
 
 def generate_recent_documents_csv(target_date, days_back=DEFAULT_DAYS_BACK):
     """Generate a CSV file containing documents from the past N days.
@@ -101,13 +100,12 @@ def generate_recent_documents_csv(target_date, days_back=DEFAULT_DAYS_BACK):
         # Output filename
         filename = os.path.join(output_dir, f"{target_date}.csv")
         
-        # Connect to the database
-        conn = sqlite3.connect(DB_PATH)
+        # Writable (WAL) connection: the export ledger is updated together with the CSV
+        conn = db.connect(DB_PATH, 'ingest')
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
-        
-        # Get documents that were already exported in recent CSVs
-        exported_docs = get_previously_exported_documents(days_back)
+        migrations.migrate(conn)
+        seed_ledger_from_csvs(conn, days_back)
         
         # Calculate date range for the query
         end_date = date_obj + timedelta(days=1)  # Include the target date
@@ -116,7 +114,6 @@ def generate_recent_documents_csv(target_date, days_back=DEFAULT_DAYS_BACK):
         # Get documents created in the date range that haven't been exported
         cursor.execute("""
             SELECT 
-                lp.name as licence_profile_name,
                 d.document_type,
                 d.title,
                 d.leap_url,
@@ -124,21 +121,34 @@ def generate_recent_documents_csv(target_date, days_back=DEFAULT_DAYS_BACK):
                 cr.status as compliance_status,
                 cr.date as compliance_date,
                 d.document_url,
-                d.metadata_json,
-                lp.profilenumber,
+                d.subject,
+                -- Payload only for rows stored before subject was extracted (see backfill_document_fields.py)
+                CASE WHEN d.fields_version IS NULL THEN d.metadata_json END AS metadata_json,
                 cr.licenceprofileid
             FROM compliance_documents d
             JOIN compliance_records cr ON d.compliance_id = cr.compliancerecord_id
-            LEFT JOIN licence_profiles lp ON cr.licenceprofileid = lp.licenceprofileid
-            WHERE d.document_date >= ? 
-              AND d.document_date < ?
-              AND d.document_url NOT IN (""" + 
-              ",".join(["?"] * len(exported_docs)) + """)
-            ORDER BY d.document_date DESC, d.document_url
-        """, [str(start_date), str(end_date)] + list(exported_docs))
+            WHERE d.document_date_ts >= ?
+              AND d.document_date_ts < ?
+              -- Not already in another recent CSV; this file's own rows are rewritten below
+              AND NOT EXISTS (
+                  SELECT 1 FROM export_ledger l
+                  WHERE l.document_url = d.document_url
+                    AND l.export_date >= ?
+                    AND l.file != ?
+              )
+            ORDER BY d.document_date_ts DESC, d.document_url
+        """, (db.epoch_seconds(start_date), db.epoch_seconds(end_date),
+              ledger_window_start(days_back).isoformat(), filename))
         
         documents = [dict(row) for row in cursor.fetchall()]
 
+        # Profile name/number come from one licence_profiles load instead of a join per document
+        profiles = ProfileCache(conn)
+        for doc in documents:
+            info = profiles.get(doc["licenceprofileid"])
+            doc["licence_profile_name"] = info.name if info else None
+            doc["profilenumber"] = info.profilenumber if info else None
+
         # Function to sanitize text fields for CSV output
         def sanitize_csv_text(text):
             """Remove line breaks, carriage returns, and other problematic characters from text."""
@@ -157,53 +167,34 @@ def generate_recent_documents_csv(target_date, days_back=DEFAULT_DAYS_BACK):
             
             return text.strip()
 
-        # Fix blank titles for Complaint and Incident documents using subject from metadata_json
-        import json
+        # Fix blank titles for Complaint and Incident documents using the subject extracted at insert time
+        codec = BlobCodec(conn)
         for doc in documents:
             if (
                 doc.get("document_type") in ("Complaint", "Incident") and
                 (doc.get("title") is None or str(doc.get("title")).strip() == "")
             ):
-                meta_raw = doc.get("metadata_json")
-                subject = None
-                if meta_raw:
+                subject = doc.get("subject")
+                if doc.get("metadata_json"):
+                    # Not yet backfilled: decode this one payload
                     try:
-                        outer = json.loads(meta_raw)
-                        # The LEAP API stores another JSON string in the "metadata" field for Complaints
-                        if isinstance(outer, dict):
-                            inner_raw = outer.get("metadata")
-                            if inner_raw:
-                                try:
-                                    inner = json.loads(inner_raw)
-                                    subject = inner.get("subject")
-                                except json.JSONDecodeError:
-                                    # If inner is not valid JSON, treat it as plain string
-                                    subject = None
-                            # Fallback – some older records may store subject at top level
-                            subject = subject or outer.get("subject")
-                    except json.JSONDecodeError:
-                        pass
+                        subject = extract_document_fields(codec.loads(doc["metadata_json"])).subject
+                    except (ValueError, zlib.error):
+                        # Bad JSON, an unknown compression dictionary or a corrupt blob: skip this row's subject
+                        subject = None
                 if subject:
                     doc["title"] = sanitize_csv_text(subject)
 
         # Remove metadata_json from output.  Ensure leap_url present; compute only if still missing.
-        from urllib.parse import urlparse, parse_qs
         for doc in documents:
             doc.pop("metadata_json", None)
+            doc.pop("subject", None)
             if doc.get("leap_url"):
                 continue  # already populated by DB
             # Fallback computation for legacy rows (should not normally occur)
-            seg = TYPE_SEGMENT_MAP.get(doc.get("document_type"), "return")
-            raw_url = (doc.get("document_url") or "").rstrip("/")
-            parsed = urlparse(raw_url)
-            if parsed.query:
-                qs = parse_qs(parsed.query)
-                guid = next(iter(qs.values()), [""])[0]
-            else:
-                guid = parsed.path.rstrip("/").split("/")[-1] if parsed.path else ""
-            profilenumber = doc.get("profilenumber") or ""
-            if guid and profilenumber:
-                doc["leap_url"] = f"https://leap.epa.ie/licence-profile/{profilenumber}/compliance/{seg}/{guid}"
+            leap_url = compute_leap_url(doc.get("profilenumber"), doc.get("document_type"), doc.get("document_url") or "")
+            if leap_url:
+                doc["leap_url"] = leap_url
         
         # Sanitize all text fields that might contain line breaks or other problematic characters
         for doc in documents:
@@ -235,12 +226,25 @@ def generate_recent_documents_csv(target_date, days_back=DEFAULT_DAYS_BACK):
         ]
         headers = [k for k in desired_order if k in all_keys] + [k for k in all_keys if k not in desired_order]
         
-        # Write to CSV
-        with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.writer(csvfile, quoting=csv.QUOTE_MINIMAL)
-            writer.writerow(headers)
-            writer.writerows([[doc[col] for col in headers] for doc in documents])
-        
+        # Write to CSV and the ledger together: the file is moved into place just before the commit,
+        # so a failure leaves neither (or, at worst, a CSV whose documents get exported again)
+        exported_at = datetime.now(timezone.utc).isoformat()
+        temp_filename = filename + '.tmp'
+        try:
+            with conn:
+                conn.execute("DELETE FROM export_ledger WHERE file = ?", (filename,))
+                conn.executemany(
+                    "INSERT OR IGNORE INTO export_ledger (document_url, file, export_date, exported_at) VALUES (?, ?, ?, ?)",
+                    [(doc["document_url"], filename, target_date, exported_at) for doc in documents])
+                with open(temp_filename, 'w', newline='', encoding='utf-8') as csvfile:
+                    writer = csv.writer(csvfile, quoting=csv.QUOTE_MINIMAL)
+                    writer.writerow(headers)
+                    writer.writerows([[doc[col] for col in headers] for doc in documents])
+                os.replace(temp_filename, filename)
+        finally:
+            if os.path.exists(temp_filename):
+                os.remove(temp_filename)
+
         print(f"Exported {len(documents)} new documents to {filename}")
         return filename
         
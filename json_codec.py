@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""JSON encode/decode for API responses and stored payloads.
+
+The scraper decodes every API response and encodes every compliance record
+and document it stores. Readers decode those payloads again. All of that
+goes through dumps() and loads() here. They use the fastest backend that is
+installed:
+
+- orjson (``pip install orjson``);
+- msgspec (``pip install msgspec``);
+- the standard library's json, which is always available.
+
+Set EPA_JSON_BACKEND=json|orjson|msgspec to force one, or call use(). The
+choice is made once, at import. Whatever the backend, dumps() returns str
+and loads() accepts str or bytes. A malformed document raises
+json.JSONDecodeError, so callers keep catching the standard library's error.
+
+The fast backends write compact JSON, without spaces after separators and
+with non-ASCII text left unescaped. The standard library keeps its usual
+output. Either way the data decodes to the same values, and stored payloads
+from different backends can be mixed freely.
+"""
+import json
+import os
+from collections import namedtuple
+from typing import Any, Callable, Dict, List, Optional, Union
+
+import requests
+
+BACKEND_ENV = 'EPA_JSON_BACKEND'
+PREFERENCE = ('orjson', 'msgspec', 'json')
+
+JsonBackend = namedtuple('JsonBackend', ('name', 'dumps', 'loads'))
+
+
+def _stdlib_backend() -> JsonBackend:
+    return JsonBackend('json', json.dumps, json.loads)
+
+
+def _orjson_backend() -> JsonBackend:
+    import orjson  # orjson.JSONDecodeError already subclasses json.JSONDecodeError
+
+    def dumps(obj: Any) -> str:
+        return orjson.dumps(obj).decode('utf-8')
+
+    return JsonBackend('orjson', dumps, orjson.loads)
+
+
+def _msgspec_backend() -> JsonBackend:
+    import msgspec
+
+    encoder = msgspec.json.Encoder()
+    decoder = msgspec.json.Decoder()
+
+    def dumps(obj: Any) -> str:
+        return encoder.encode(obj).decode('utf-8')
+
+    def loads(data: Union[str, bytes]) -> Any:
+        try:
+            return decoder.decode(data)
+        except msgspec.DecodeError as e:
+            doc = data if isinstance(data, str) else bytes(data).decode('utf-8', 'replace')
+            raise json.JSONDecodeError(str(e), doc, 0) from None
+
+    return JsonBackend('msgspec', dumps, loads)
+
+
+BACKENDS: Dict[str, Callable[[], JsonBackend]] = {
+    'orjson': _orjson_backend,
+    'msgspec': _msgspec_backend,
+    'json': _stdlib_backend,
+}
+
+
+def load_backend(name: str) -> JsonBackend:
+    """The named backend; raises ImportError if its library is not installed."""
+    try:
+        factory = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown JSON backend {name!r}; choose from {', '.join(BACKENDS)}") from None
+    return factory()
+
+
+def available_backends() -> List[str]:
+    available = []
+    for name in BACKENDS:
+        try:
+            load_backend(name)
+        except ImportError:
+            continue
+        available.append(name)
+    return available
+
+
+def use(name: Optional[str] = None) -> JsonBackend:
+    """Switch every dumps()/loads() call to ``name``, or to the preferred installed backend."""
+    global _backend
+    if name:
+        _backend = load_backend(name)
+        return _backend
+    for candidate in PREFERENCE:
+        try:
+            _backend = load_backend(candidate)
+            return _backend
+        except ImportError:
+            continue
+    raise RuntimeError("No JSON backend available")  # unreachable: json is always importable
+
+
+def backend_name() -> str:
+    return _backend.name
+
+
+def dumps(obj: Any) -> str:
+    return _backend.dumps(obj)
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    return _backend.loads(data)
+
+
+def response_json(response: requests.Response) -> Any:
+    """response.json() through the active backend; keeps requests' JSONDecodeError so RequestException handlers still apply."""
+    try:
+        return _backend.loads(response.content)
+    except json.JSONDecodeError as e:
+        raise requests.exceptions.JSONDecodeError(e.msg, e.doc, e.pos) from None
+
+
+_backend: JsonBackend = use(os.environ.get(BACKEND_ENV))
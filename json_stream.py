@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""Incremental parsing of large JSON list responses.
+
+The LEAP list endpoints return one object shaped like ``{"count": N, "list":
+[...]}``. iter_json_list_items() walks that object as the bytes arrive and
+yields the elements of the named array one at a time, so memory use depends on
+the size of one element rather than the whole response. Only the standard
+library's ``json.JSONDecoder.raw_decode`` is used.
+"""
+import codecs
+import json
+from typing import Any, Iterable, Iterator
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+
+# Consumed text is dropped from the buffer once this much has piled up
+_COMPACT_THRESHOLD = 1 << 16
+
+
+class _TextBuffer:
+    """Sliding text window over an iterable of byte chunks."""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+        self.text = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """Append the next chunk; returns False once the input is exhausted."""
+        if self.eof:
+            return False
+        if self.pos > _COMPACT_THRESHOLD:
+            self.text = self.text[self.pos:]
+            self.pos = 0
+        for chunk in self._chunks:
+            if chunk:
+                self.text += self._utf8.decode(chunk)
+                return True
+        self.text += self._utf8.decode(b'', final=True)
+        self.eof = True
+        return False
+
+    def peek(self) -> str:
+        """Next non-whitespace character (without consuming it), or '' at end of input."""
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.fill():
+                return ''
+
+    def expect(self, chars: str) -> str:
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError(f"Expected one of {chars!r} at offset {self.pos}, found {char or 'end of input'!r}")
+        self.pos += 1
+        return char
+
+    def value(self) -> Any:
+        """Decode one complete JSON value, reading more input until it is whole."""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                if self.fill():
+                    continue
+                raise
+            # A number at the very end of the buffer may continue in the next chunk
+            if end == len(self.text) and not self.eof and self.fill():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_json_list_items(chunks: Iterable[bytes], key: str = 'list') -> Iterator[Any]:
+    """Yield the elements of the top-level ``key`` array of a JSON object, one at a time.
+
+    Other top-level members are parsed and discarded. Raises ValueError (or
+    json.JSONDecodeError) on malformed input, after yielding whatever came first.
+    """
+    buf = _TextBuffer(chunks)
+    buf.expect('{')
+    if buf.peek() == '}':
+        return
+    while True:
+        member = buf.value()
+        buf.expect(':')
+        if member == key and buf.peek() == '[':
+            buf.expect('[')
+            if buf.peek() == ']':
+                buf.expect(']')
+            else:
+                while True:
+                    yield buf.value()
+                    if buf.expect(',]') == ']':
+                        break
+        else:
+            buf.value()
+        if buf.expect(',}') == '}':
+            return
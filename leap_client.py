@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""Pooled, retrying HTTP client for the EPA LEAP API.
+
+All scraper fetch paths go through a single LeapClient so they share one
+keep-alive connection pool, one retry policy and one set of latency stats.
+"""
+import random
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from response_cache import CachedResponse, ResponseCache
+from throttle import TokenBucket
+
+# Status codes worth retrying: throttling and transient server-side failures
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Responses larger than this should have come back compressed if gzip was negotiated
+UNCOMPRESSED_WARNING_BYTES = 4096
+
+# Latency samples kept per endpoint for the percentiles in latency_summary()
+LATENCY_SAMPLE_SIZE = 2048
+
+# Called once per HTTP attempt with (endpoint, elapsed seconds, body bytes, status code or None on a network error)
+RequestObserver = Callable[[str, float, int, Optional[int]], None]
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised without touching the network while an endpoint's circuit is open."""
+
+
+class CircuitBreaker:
+    """Per-endpoint circuit breaker.
+
+    After ``failure_threshold`` consecutive failures the endpoint is marked open and
+    calls fail fast for ``reset_timeout`` seconds. A single trial call is then let
+    through (half-open); success closes the circuit, failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 60.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures: Dict[str, int] = defaultdict(int)
+        self._opened_at: Dict[str, float] = {}
+        # endpoint -> id of the thread whose half-open trial call is in flight
+        self._trial_in_progress: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def allow(self, endpoint: str) -> bool:
+        with self._lock:
+            opened_at = self._opened_at.get(endpoint)
+            if opened_at is None:
+                return True
+            if time.monotonic() - opened_at < self.reset_timeout or self._trial_in_progress.get(endpoint):
+                return False
+            self._trial_in_progress[endpoint] = threading.get_ident()
+            return True
+
+    def release_trial(self, endpoint: str) -> None:
+        """Give up this thread's trial call if it ended without a recorded success or failure."""
+        with self._lock:
+            if self._trial_in_progress.get(endpoint) == threading.get_ident():
+                del self._trial_in_progress[endpoint]
+
+    def record_success(self, endpoint: str) -> None:
+        with self._lock:
+            self._failures[endpoint] = 0
+            self._opened_at.pop(endpoint, None)
+            self._trial_in_progress.pop(endpoint, None)
+
+    def record_failure(self, endpoint: str) -> bool:
+        """Count a failure; returns True if this failure opened (or re-opened) the circuit."""
+        with self._lock:
+            self._failures[endpoint] += 1
+            was_trial = self._trial_in_progress.pop(endpoint, False)
+            if was_trial or self._failures[endpoint] >= self.failure_threshold:
+                self._opened_at[endpoint] = time.monotonic()
+                return True
+            return False
+
+    def open_endpoints(self) -> List[str]:
+        with self._lock:
+            return sorted(self._opened_at)
+
+
+class LatencySamples:
+    """Request count and maximum for a whole run, plus a fixed-size uniform sample for percentiles.
+
+    Reservoir sampling keeps memory and the sort in latency_summary() bounded
+    however many requests an endpoint sees.
+    """
+
+    def __init__(self, size: int = LATENCY_SAMPLE_SIZE):
+        self.size = size
+        self.count = 0
+        self.max = 0.0
+        self.sample: List[float] = []
+        self._random = random.Random(0)
+
+    def add(self, elapsed: float) -> None:
+        self.count += 1
+        self.max = max(self.max, elapsed)
+        if len(self.sample) < self.size:
+            self.sample.append(elapsed)
+        else:
+            slot = self._random.randrange(self.count)
+            if slot < self.size:
+                self.sample[slot] = elapsed
+
+    def summary(self) -> Dict[str, float]:
+        """Request count, p50/p95/p99 (estimated from the sample) and maximum, in seconds."""
+        values = sorted(self.sample)
+        return {
+            'count': self.count,
+            'p50': percentile(values, 50),
+            'p95': percentile(values, 95),
+            'p99': percentile(values, 99),
+            'max': self.max,
+        }
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class LeapClient:
+    """Shared HTTP client for the LEAP API with pooling, retries and a circuit breaker."""
+
+    def __init__(self, base_url: str, timeout: float = 15, max_retries: int = 3,
+                 backoff_base: float = 0.5, backoff_max: float = 30.0, pool_size: int = 10,
+                 rate_limiter: Optional[TokenBucket] = None,
+                 circuit_breaker: Optional[CircuitBreaker] = None, verify: bool = False,
+                 cache: Optional[ResponseCache] = None, on_request: Optional[RequestObserver] = None):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.rate_limiter = rate_limiter
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        self.cache = cache
+        self.on_request = on_request
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({'Accept': 'application/json', 'Accept-Encoding': 'gzip, deflate'})
+        # Disable SSL verification to handle certificate issues on data.epa.ie
+        self.session.verify = verify
+
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, LatencySamples] = defaultdict(LatencySamples)
+        self._warned_uncompressed = set()
+        self.stats = {
+            'requests': 0,
+            'retries': 0,
+            'failures': 0,
+            'circuit_rejections': 0,
+            'bytes': 0,
+            'uncompressed_responses': 0,
+        }
+
+    def endpoint_for(self, url: str) -> str:
+        """Return the API path used as the stats/circuit key, e.g. 'Incident/byid'."""
+        path = urlparse(url).path.rstrip('/')
+        base_path = urlparse(self.base_url).path.rstrip('/')
+        if base_path and path.startswith(base_path):
+            path = path[len(base_path):]
+        return path.strip('/') or '/'
+
+    def _count(self, key: str, amount: int = 1) -> None:
+        with self._lock:
+            self.stats[key] += amount
+
+    def _backoff_delay(self, attempt: int, response: Optional[requests.Response]) -> float:
+        """Exponential backoff with full jitter, never shorter than a server Retry-After."""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        if response is not None:
+            retry_after = response.headers.get('Retry-After')
+            if retry_after and retry_after.isdigit():
+                delay = max(delay, min(self.backoff_max, float(retry_after)))
+        return delay
+
+    def _record_response(self, endpoint: str, elapsed: float, response: requests.Response, streamed: bool = False) -> None:
+        if streamed:
+            # The body hasn't been read yet; count the on-the-wire size when the server states it
+            length = response.headers.get('Content-Length', '')
+            size = int(length) if length.isdigit() else 0
+        else:
+            size = len(response.content)
+        compressed = 'gzip' in response.headers.get('Content-Encoding', '') or 'deflate' in response.headers.get('Content-Encoding', '')
+        with self._lock:
+            self._latencies[endpoint].add(elapsed)
+            self.stats['requests'] += 1
+            self.stats['bytes'] += size
+            if size >= UNCOMPRESSED_WARNING_BYTES and not compressed and not streamed:
+                self.stats['uncompressed_responses'] += 1
+                warn = endpoint not in self._warned_uncompressed
+                self._warned_uncompressed.add(endpoint)
+            else:
+                warn = False
+        if warn:
+            print(f"\nWarning: {endpoint} returned {size} bytes without gzip despite Accept-Encoding.")
+        if self.on_request:
+            self.on_request(endpoint, elapsed, size, response.status_code)
+
+    @staticmethod
+    def _response_from_cache(url: str, entry: CachedResponse) -> requests.Response:
+        """Rebuild a requests.Response around a cached body so callers can't tell the difference."""
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response.encoding = 'utf-8'
+        response._content = bytes(entry.body)
+        response.headers = CaseInsensitiveDict({'ETag': entry.etag or '', 'Last-Modified': entry.last_modified or ''})
+        return response
+
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None,
+            paced: bool = True, stream: bool = False) -> requests.Response:
+        """GET a LEAP URL, retrying transient failures. Raises requests exceptions on final failure.
+
+        With a cache configured, entries with validators are revalidated by conditional GET
+        and entries without them are served from disk while younger than the cache TTL.
+        Pass paced=False when the caller already took a rate-limiter token for this call.
+        Retries always take their own token, so a burst of 429/5xx responses cannot push
+        the request rate over the budget.
+
+        With stream=True the body is left unread for the caller to consume (and close)
+        incrementally. Streamed requests bypass the cache, and only failures before the
+        body starts are retried; latency is measured to the response headers.
+        """
+        endpoint = self.endpoint_for(url)
+        timeout = timeout or self.timeout
+        last_error: Optional[Exception] = None
+
+        cache_key, cache_entry, request_headers = None, None, None
+        if self.cache is not None and not stream:
+            cache_key = self.cache.key_for(url, params)
+            cache_entry = self.cache.lookup(cache_key)
+            if cache_entry is not None:
+                if cache_entry.etag or cache_entry.last_modified:
+                    request_headers = self.cache.conditional_headers(cache_entry)
+                elif self.cache.is_fresh(cache_entry):
+                    self.cache.record_hit(cache_key, cache_entry)
+                    return self._response_from_cache(url, cache_entry)
+
+        for attempt in range(self.max_retries + 1):
+            if not self.circuit_breaker.allow(endpoint):
+                self._count('circuit_rejections')
+                raise CircuitOpenError(f"Circuit open for {endpoint}; skipping {url}")
+            try:
+                if (paced or attempt > 0) and self.rate_limiter:
+                    self.rate_limiter.acquire()
+
+                response = None
+                start = time.perf_counter()
+                try:
+                    response = self.session.get(url, params=params, timeout=timeout, headers=request_headers, stream=stream)
+                    self._record_response(endpoint, time.perf_counter() - start, response, streamed=stream)
+                except requests.exceptions.RequestException as e:
+                    # Timeouts, dropped connections and truncated bodies are all worth another try
+                    last_error = e
+                    if self.on_request:
+                        self.on_request(endpoint, time.perf_counter() - start, 0, None)
+                else:
+                    if response.status_code == 304 and cache_entry is not None:
+                        self.circuit_breaker.record_success(endpoint)
+                        self.cache.record_hit(cache_key, cache_entry, revalidated=True)
+                        return self._response_from_cache(url, cache_entry)
+                    if response.status_code not in RETRYABLE_STATUS_CODES:
+                        # 4xx responses are the caller's problem, not a sign the endpoint is down
+                        self.circuit_breaker.record_success(endpoint)
+                        response.raise_for_status()
+                        if self.cache is not None and response.status_code == 200 and not stream:
+                            self.cache.record_miss()
+                            self.cache.store(cache_key, url, response.content,
+                                             response.headers.get('ETag'), response.headers.get('Last-Modified'))
+                        return response
+                    last_error = requests.exceptions.HTTPError(
+                        f"{response.status_code} Server Error for url: {response.url}", response=response)
+                    if stream:
+                        # Release the pooled connection before retrying
+                        response.close()
+
+                self._count('failures')
+                if self.circuit_breaker.record_failure(endpoint):
+                    print(f"\nCircuit opened for {endpoint} after repeated failures.")
+            finally:
+                # An attempt that ends any other way (an observer or cache error, KeyboardInterrupt)
+                # must not leave a half-open trial held, or the endpoint stays blocked for good
+                self.circuit_breaker.release_trial(endpoint)
+            if attempt == self.max_retries:
+                break
+            self._count('retries')
+            time.sleep(self._backoff_delay(attempt, response))
+
+        raise last_error
+
+    def latency_summary(self) -> Dict[str, Dict[str, float]]:
+        """Per-endpoint request count and latency percentiles in seconds."""
+        with self._lock:
+            return {endpoint: samples.summary() for endpoint, samples in self._latencies.items()}
+
+    def close(self) -> None:
+        self.session.close()
+        if self.cache is not None:
+            self.cache.close()
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""Local stand-in for the EPA LEAP API, for benchmarking and failure testing.
+
+Serves the endpoints the scraper uses (``LicenceProfile/list/``,
+``ComplianceList/compliancelist/`` and every ``*/byid`` endpoint in
+``EPAScraper.type_to_endpoint``) from deterministic synthetic data, with
+optional latency, injected errors and the pagination quirks seen on the real
+API: missing or wrong ``count`` values, records repeated across page
+boundaries and records belonging to other profiles leaking into a profile's
+compliance list.
+
+    python leap_simulator.py --profiles 500 --latency-ms 40 --error-rate 0.02
+    python scraper.py --base-url http://127.0.0.1:8765/leap/api/v1
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import random
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from scraper import EPAScraper
+
+API_PREFIX = "/leap/api/v1"
+DEFAULT_PORT = 8765
+
+# How the compliance list's 'count' field misbehaves
+COUNT_MODES = ('exact', 'missing', 'low', 'high')
+
+COUNTIES = ['Cork', 'Dublin', 'Galway', 'Kildare', 'Limerick', 'Mayo', 'Meath', 'Tipperary', 'Waterford', 'Wexford']
+LICENCE_TYPES = ['Industrial Emissions', 'Integrated Pollution Control', 'Waste', 'Waste Water Discharge']
+STATUSES = ['Open', 'Closed', 'Submitted', 'Acknowledged']
+
+
+class SyntheticLeapData:
+    """Deterministic synthetic profiles, compliance records and per-record payloads."""
+
+    def __init__(self, profiles: int = 100, records_per_profile: int = 20, documents_per_record: int = 2,
+                 seed: int = 0, start_date: date = date(2015, 1, 1), end_date: Optional[date] = None):
+        rng = random.Random(seed)
+        end_date = end_date or date.today()
+        span_days = max(1, (end_date - start_date).days)
+        record_types = sorted(EPAScraper.type_to_endpoint)
+
+        def new_id() -> str:
+            return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+        self.profiles: List[Dict[str, Any]] = []
+        self.records_by_profile: Dict[str, List[Dict[str, Any]]] = {}
+        self.records_by_id: Dict[str, Dict[str, Any]] = {}
+        self.documents_per_record = documents_per_record
+
+        for i in range(profiles):
+            profile_id = new_id()
+            county = rng.choice(COUNTIES)
+            self.profiles.append({
+                'licenceprofileid': profile_id,
+                'name': f"Synthetic Facility {i + 1}",
+                'profilenumber': f"P{i + 1:04d}-01",
+                'activelicencetype': rng.choice(LICENCE_TYPES),
+                'activelicenceregno': f"W{i + 1:04d}-01",
+                'county': county,
+                'town': f"{county} Town",
+                'organisationname': f"Synthetic Operator {i + 1} Ltd",
+                'url': f"https://leap.epa.ie/licence-profile/P{i + 1:04d}-01",
+            })
+            # Skewed sizes: most profiles are quiet, a few are busy enough to need several pages
+            count = int(rng.expovariate(1.0 / records_per_profile)) if records_per_profile > 0 else 0
+            records = []
+            for _ in range(count):
+                record_date = start_date + timedelta(days=rng.randrange(span_days))
+                record_type = rng.choice(record_types)
+                record = {
+                    'compliancerecord_id': new_id(),
+                    'profile_id': profile_id,
+                    'type': record_type,
+                    'title': f"{record_type} {record_date.isoformat()}",
+                    'status': rng.choice(STATUSES),
+                    'date': f"{record_date.isoformat()}T00:00:00",
+                }
+                records.append(record)
+                self.records_by_id[record['compliancerecord_id']] = record
+            records.sort(key=lambda r: r['date'], reverse=True)
+            self.records_by_profile[profile_id] = records
+
+    def record_payload(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Detail payload for a */byid lookup, shaped like the LEAP responses."""
+        seed = int(record['compliancerecord_id'].replace('-', ''), 16)
+        rng = random.Random(seed)
+        documents = [{
+            'document_id': str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            'filename': f"document-{n + 1}.pdf",
+            'date_uploaded': record['date'],
+        } for n in range(self.documents_per_record)]
+        return {
+            'id': record['compliancerecord_id'],
+            'profile_id': record['profile_id'],
+            'title': record['title'],
+            'description': f"Synthetic {record['type'].lower()} record.",
+            'date': record['date'],
+            'status': record['status'],
+            'documents': documents,
+        }
+
+
+class LeapSimulator:
+    """Threaded HTTP server serving SyntheticLeapData with injectable faults.
+
+    Use as a context manager, or call start()/stop(); ``base_url`` is what the
+    scraper should be pointed at.
+    """
+
+    def __init__(self, data: Optional[SyntheticLeapData] = None, host: str = "127.0.0.1", port: int = 0,
+                 latency_ms: float = 0.0, latency_jitter_ms: float = 0.0, error_rate: float = 0.0,
+                 throttle_rate: float = 0.0, count_mode: str = 'exact', duplicate_rate: float = 0.0,
+                 leak_rate: float = 0.0, etags: bool = True, compress: bool = True, seed: int = 0):
+        if count_mode not in COUNT_MODES:
+            raise ValueError(f"count_mode must be one of {COUNT_MODES}")
+        self.data = data or SyntheticLeapData(seed=seed)
+        self.latency = latency_ms / 1000.0
+        self.latency_jitter = latency_jitter_ms / 1000.0
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.count_mode = count_mode
+        self.duplicate_rate = duplicate_rate
+        self.leak_rate = leak_rate
+        self.etags = etags
+        self.compress = compress
+
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = defaultdict(int)
+        self._byid_params = {info['endpoint']: info['param'] for info in EPAScraper.type_to_endpoint.values()}
+
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}{API_PREFIX}"
+
+    def start(self) -> 'LeapSimulator':
+        self._thread = threading.Thread(target=self._server.serve_forever, name="leap-simulator", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self) -> 'LeapSimulator':
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def _chance(self, rate: float) -> bool:
+        if rate <= 0:
+            return False
+        with self._lock:
+            return self._rng.random() < rate
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    # ---- Endpoints ----
+    def _profile_list(self, query: Dict[str, str]) -> Tuple[int, Any]:
+        return 200, {'count': len(self.data.profiles), 'list': self.data.profiles}
+
+    def _compliance_list(self, query: Dict[str, str]) -> Tuple[int, Any]:
+        profile_id = query.get('licence_profile_id', '')
+        records = self.data.records_by_profile.get(profile_id, [])
+        if query.get('date_from'):
+            records = [r for r in records if r['date'][:10] >= query['date_from'][:10]]
+        if query.get('date_to'):
+            records = [r for r in records if r['date'][:10] <= query['date_to'][:10]]
+        try:
+            page = max(1, int(query.get('page', 1)))
+            per_page = max(1, int(query.get('per_page', 250)))
+        except ValueError:
+            return 400, {'error': 'page and per_page must be integers'}
+
+        start = (page - 1) * per_page
+        page_records = list(records[start:start + per_page])
+        # Boundary duplicates: the previous page's last record shows up again
+        if page_records and start > 0 and self._chance(self.duplicate_rate):
+            page_records.insert(0, records[start - 1])
+            self._count('duplicates_injected')
+        # Cross-profile leakage: another profile's record in this profile's list
+        if page_records and self._chance(self.leak_rate):
+            with self._lock:
+                other = self._rng.choice(self.data.profiles)['licenceprofileid']
+            other_records = self.data.records_by_profile.get(other)
+            if other != profile_id and other_records:
+                page_records.append(other_records[0])
+                self._count('leaks_injected')
+
+        body: Dict[str, Any] = {'list': page_records}
+        if self.count_mode == 'exact':
+            body['count'] = len(records)
+        elif self.count_mode == 'low':
+            body['count'] = len(records) // 2
+        elif self.count_mode == 'high':
+            body['count'] = len(records) * 2 + per_page
+        return 200, body
+
+    def _byid(self, endpoint: str, query: Dict[str, str]) -> Tuple[int, Any]:
+        record = self.data.records_by_id.get(query.get(self._byid_params[endpoint], ''))
+        if record is None:
+            return 404, {'error': 'not found'}
+        return 200, self.data.record_payload(record)
+
+    def _route(self, path: str, query: Dict[str, str]) -> Tuple[int, Any]:
+        if not path.startswith(API_PREFIX):
+            return 404, {'error': 'not found'}
+        endpoint = path[len(API_PREFIX):].strip('/')
+        if endpoint == 'LicenceProfile/list':
+            return self._profile_list(query)
+        if endpoint == 'ComplianceList/compliancelist':
+            return self._compliance_list(query)
+        if endpoint in self._byid_params:
+            return self._byid(endpoint, query)
+        return 404, {'error': 'not found'}
+
+    def _handler_class(self):
+        simulator = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes; without this, delayed ACKs add ~40 ms per request
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status: int, body: bytes = b'', headers: Optional[Dict[str, str]] = None) -> None:
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+                simulator._count('requests')
+                simulator._count(f"GET {parsed.path[len(API_PREFIX):].strip('/')}")
+
+                if simulator.latency or simulator.latency_jitter:
+                    with simulator._lock:
+                        jitter = simulator._rng.uniform(0, simulator.latency_jitter)
+                    time.sleep(simulator.latency + jitter)
+
+                if simulator._chance(simulator.throttle_rate):
+                    simulator._count('throttled')
+                    self._send(429, b'{"error": "rate limited"}', {'Retry-After': '0', 'Content-Type': 'application/json'})
+                    return
+                if simulator._chance(simulator.error_rate):
+                    simulator._count('errors_injected')
+                    with simulator._lock:
+                        status = simulator._rng.choice((500, 502, 503))
+                    self._send(status, b'{"error": "injected failure"}', {'Content-Type': 'application/json'})
+                    return
+
+                status, payload = simulator._route(parsed.path, query)
+                body = json.dumps(payload).encode('utf-8')
+                headers = {'Content-Type': 'application/json'}
+                if status == 200 and simulator.etags:
+                    etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+                    headers['ETag'] = etag
+                    if self.headers.get('If-None-Match') == etag:
+                        simulator._count('not_modified')
+                        self._send(304, b'', {'ETag': etag})
+                        return
+                if simulator.compress and 'gzip' in self.headers.get('Accept-Encoding', ''):
+                    body = gzip.compress(body, compresslevel=1)
+                    headers['Content-Encoding'] = 'gzip'
+                self._send(status, body, headers)
+
+        return Handler
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve a synthetic LEAP API for benchmarking and failure testing.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--profiles', type=int, default=100, help='Number of licence profiles (default: %(default)s)')
+    parser.add_argument('--records-per-profile', type=int, default=20,
+                        help='Mean compliance records per profile; sizes are exponentially skewed (default: %(default)s)')
+    parser.add_argument('--documents-per-record', type=int, default=2,
+                        help='Documents listed in each */byid payload (default: %(default)s)')
+    parser.add_argument('--recent-days', type=int, default=None,
+                        help='Date all records within the last N days (default: spread from 2015 to today)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for data generation and fault injection')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Fixed delay added to every response')
+    parser.add_argument('--latency-jitter-ms', type=float, default=0.0, help='Extra random delay of up to this many ms')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with a 5xx')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='Fraction of requests answered with a 429')
+    parser.add_argument('--count-mode', choices=COUNT_MODES, default='exact',
+                        help="How the compliance list reports 'count' (default: %(default)s)")
+    parser.add_argument('--duplicate-rate', type=float, default=0.0,
+                        help='Fraction of pages that repeat the previous page\'s last record')
+    parser.add_argument('--leak-rate', type=float, default=0.0,
+                        help='Fraction of pages that include a record from another profile')
+    parser.add_argument('--no-etags', action='store_true', help='Do not send ETags or answer conditional GETs')
+    args = parser.parse_args()
+
+    data = SyntheticLeapData(profiles=args.profiles, records_per_profile=args.records_per_profile,
+                             documents_per_record=args.documents_per_record, seed=args.seed,
+                             **({'start_date': date.today() - timedelta(days=args.recent_days)} if args.recent_days else {}))
+    simulator = LeapSimulator(data, host=args.host, port=args.port, latency_ms=args.latency_ms,
+                              latency_jitter_ms=args.latency_jitter_ms, error_rate=args.error_rate,
+                              throttle_rate=args.throttle_rate, count_mode=args.count_mode,
+                              duplicate_rate=args.duplicate_rate, leak_rate=args.leak_rate,
+                              etags=not args.no_etags, seed=args.seed)
+    total_records = sum(len(r) for r in data.records_by_profile.values())
+    print(f"Serving {len(data.profiles)} profiles and {total_records} compliance records at {simulator.base_url}")
+    simulator.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        print("\nStopping simulator.")
+    finally:
+        simulator.stop()
+        for key, value in sorted(simulator.stats.items()):
+            print(f"  {key}: {value}")
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""Versioned schema migrations for epa_ireland.db.
+
+The schema version is stored in ``PRAGMA user_version``. MIGRATIONS is an
+ordered list of steps. migrate() applies the steps above the stored version,
+each in its own transaction together with its version bump, so an
+interrupted upgrade resumes at the step that failed. A database already at
+SCHEMA_VERSION costs one PRAGMA read and no DDL.
+
+Version 1 is the schema as it was before versioning. It is written to be safe
+on databases created by older releases, which all report user_version 0.
+"""
+import sqlite3
+from typing import Callable, List, Tuple
+
+
+def _columns(cursor: sqlite3.Cursor, table: str) -> set:
+    # table_xinfo also lists generated columns, which table_info hides
+    cursor.execute(f"PRAGMA table_xinfo({table})")
+    return {row[1] for row in cursor.fetchall()}
+
+
+def _v1_baseline(cursor: sqlite3.Cursor) -> None:
+    """Core tables, columns added before versioning existed, and run checkpoint tables."""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS licence_profiles (
+        licenceprofileid TEXT PRIMARY KEY,
+        name TEXT,
+        profilenumber TEXT,
+        activelicencetype TEXT,
+        activelicenceregno TEXT,
+        county TEXT,
+        town TEXT,
+        organisationname TEXT,
+        url TEXT,
+        last_updated TEXT,
+        last_checked TEXT,
+        last_full_sweep TEXT
+    )
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS compliance_records (
+        compliancerecord_id TEXT PRIMARY KEY,
+        licenceprofileid TEXT,
+        type TEXT,
+        title TEXT,
+        status TEXT,
+        date TEXT,
+        last_updated TEXT,
+        last_checked TEXT,
+        metadata_json TEXT,
+        FOREIGN KEY (licenceprofileid) REFERENCES licence_profiles (licenceprofileid)
+    )
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS compliance_documents (
+        document_date TEXT,
+        document_url TEXT PRIMARY KEY,
+        compliance_id TEXT,
+        document_id TEXT,
+        document_type TEXT,
+        title TEXT,
+        leap_url TEXT,
+        last_updated TEXT,
+        last_checked TEXT,
+        metadata_json TEXT,
+        exported BOOLEAN DEFAULT 0,
+        export_date TEXT,
+        FOREIGN KEY (compliance_id) REFERENCES compliance_records (compliancerecord_id)
+    )
+    """)
+    # Columns older databases were created without
+    if 'leap_url' not in _columns(cursor, 'compliance_documents'):
+        cursor.execute("ALTER TABLE compliance_documents ADD COLUMN leap_url TEXT")
+    if 'last_full_sweep' not in _columns(cursor, 'licence_profiles'):
+        cursor.execute("ALTER TABLE licence_profiles ADD COLUMN last_full_sweep TEXT")
+
+    # Run checkpoints so an interrupted run can be resumed with --resume
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS scraper_runs (
+        run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        started_at TEXT,
+        updated_at TEXT,
+        phase INTEGER,
+        status TEXT
+    )
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS run_profiles_done (
+        run_id INTEGER,
+        licenceprofileid TEXT,
+        PRIMARY KEY (run_id, licenceprofileid)
+    )
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS run_pending_documents (
+        run_id INTEGER,
+        compliance_id TEXT,
+        PRIMARY KEY (run_id, compliance_id)
+    )
+    """)
+
+
+def _v2_hot_path_indexes(cursor: sqlite3.Cursor) -> None:
+    """Indexes for the export date filter, Phase 3 joins and the export flag."""
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_documents_document_date ON compliance_documents (document_date)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_documents_compliance_id ON compliance_documents (compliance_id)")
+    # Only rows still waiting to be exported; the WHERE must match the queries' wording for SQLite to use it
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_documents_unexported ON compliance_documents (document_date)
+        WHERE (exported = 0 OR exported IS NULL)
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_records_licenceprofileid ON compliance_records (licenceprofileid)")
+
+
+def _v3_blob_dictionaries(cursor: sqlite3.Cursor) -> None:
+    """Preset dictionaries for compressed metadata_json values (see blob_codec.py).
+
+    Existing rows are converted separately, in chunks, by compress_metadata.py.
+    """
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS blob_dictionaries (
+        dict_id INTEGER PRIMARY KEY,
+        created_at TEXT,
+        sample_rows INTEGER,
+        dictionary BLOB NOT NULL
+    )
+    """)
+
+
+def _v4_document_fields(cursor: sqlite3.Cursor) -> None:
+    """Columns for fields extracted from document payloads (see document_fields.py).
+
+    Existing rows are filled in separately, in chunks, by backfill_document_fields.py.
+    """
+    columns = _columns(cursor, 'compliance_documents')
+    for name in ('subject', 'description', 'status'):
+        if name not in columns:
+            cursor.execute(f"ALTER TABLE compliance_documents ADD COLUMN {name} TEXT")
+    if 'fields_version' not in columns:
+        cursor.execute("ALTER TABLE compliance_documents ADD COLUMN fields_version INTEGER")
+    # Blank titles that the export and the title-fix scripts fill in from subject
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_documents_blank_title ON compliance_documents (document_type)
+        WHERE (title IS NULL OR title = '')
+    """)
+
+
+# Text timestamp column -> its epoch-seconds twin (see _v5_epoch_columns)
+EPOCH_COLUMNS = {
+    'licence_profiles': {'last_updated': 'last_updated_ts', 'last_checked': 'last_checked_ts'},
+    'compliance_records': {'date': 'date_ts', 'last_updated': 'last_updated_ts', 'last_checked': 'last_checked_ts'},
+    'compliance_documents': {'document_date': 'document_date_ts', 'last_updated': 'last_updated_ts',
+                             'last_checked': 'last_checked_ts'},
+}
+
+
+def _v5_epoch_columns(cursor: sqlite3.Cursor) -> None:
+    """Epoch-second twins of the ISO-8601 text timestamps, and indexes for date-window queries.
+
+    The text values mix "+00:00" offsets with naive (UTC) times, so comparing
+    them as strings against bare dates is fragile, and wrapping them in date()
+    cannot use an index. Each twin is a VIRTUAL generated column: SQLite
+    computes it on every insert and update, so no writer has to remember to
+    set it. Creating the indexes fills them in for existing rows once.
+    Values SQLite cannot parse give NULL.
+    """
+    for table, columns in EPOCH_COLUMNS.items():
+        existing = _columns(cursor, table)
+        for source, target in columns.items():
+            if target not in existing:
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {target} INTEGER "
+                               f"GENERATED ALWAYS AS (CAST(strftime('%s', {source}) AS INTEGER)) VIRTUAL")
+    # Export date window
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_documents_document_date_ts ON compliance_documents (document_date_ts)")
+    # Documents added or changed since a run started
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_documents_last_updated_ts ON compliance_documents (last_updated_ts)")
+    # Per-profile record counts inside the scheduler's learning window
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_records_profile_date_ts ON compliance_records (licenceprofileid, date_ts)
+    """)
+
+
+def _v6_export_ledger(cursor: sqlite3.Cursor) -> None:
+    """Which documents went into which daily CSV, so the export can skip them without reading old files.
+
+    export_to_csv.py writes a file's rows in the same transaction that moves
+    the file into place. The primary key answers its per-document anti-join;
+    the file index serves the rewrite of one day's file.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS export_ledger (
+            document_url TEXT NOT NULL,
+            file TEXT NOT NULL,
+            export_date TEXT NOT NULL,
+            exported_at TEXT,
+            PRIMARY KEY (document_url, file)
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_export_ledger_file ON export_ledger (file)")
+
+
+def _v7_drop_unexported_index(cursor: sqlite3.Cursor) -> None:
+    """Drop idx_documents_unexported: the export skips documents through export_ledger, so no query filters on exported."""
+    cursor.execute("DROP INDEX IF EXISTS idx_documents_unexported")
+
+
+# (version, description, step); versions are consecutive from 1 and never reordered or edited once released
+MIGRATIONS: List[Tuple[int, str, Callable[[sqlite3.Cursor], None]]] = [
+    (1, 'baseline schema', _v1_baseline),
+    (2, 'hot-path indexes', _v2_hot_path_indexes),
+    (3, 'compressed metadata dictionaries', _v3_blob_dictionaries),
+    (4, 'extracted document fields', _v4_document_fields),
+    (5, 'epoch timestamp columns', _v5_epoch_columns),
+    (6, 'export ledger', _v6_export_ledger),
+    (7, 'drop unused export flag index', _v7_drop_unexported_index),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection) -> List[str]:
+    """Bring the database up to SCHEMA_VERSION; returns the descriptions of the steps applied."""
+    current = schema_version(conn)
+    if current > SCHEMA_VERSION:
+        raise RuntimeError(f"Database schema version {current} is newer than this code supports ({SCHEMA_VERSION})")
+    applied = []
+    for version, description, step in MIGRATIONS:
+        if version <= current:
+            continue
+        # Explicit BEGIN: the sqlite3 module does not open transactions for DDL on its own
+        conn.commit()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Another process may have applied it while we waited for the write lock
+            if schema_version(conn) >= version:
+                conn.rollback()
+                continue
+            cursor = conn.cursor()
+            step(cursor)
+            cursor.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        applied.append(f"v{version}: {description}")
+    return applied
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""Typed field extraction for LEAP document payloads, keyed by API endpoint.
+
+Phase 3 builds one document dict per compliance record from the record's
+detail endpoint (see EPAScraper.fetch_document_metadata). The dict copies
+``title``, ``description``, ``status`` and ``date`` (as ``submission_date``)
+from the response. It also keeps the full response as a JSON string in
+``metadata``. The extractors registered here read those known fields
+directly. Older shapes that only had them at the top level are also
+handled.
+
+An endpoint without an extractor, or a payload whose known date field is
+missing or unparseable, gets ``date=None``. The scraper then falls back to
+the generic scan, find_newest_date_in_api_response, and counts the
+fallback, so a change in the API's shapes shows up in the run metrics.
+"""
+import json
+from collections import namedtuple
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import urlsplit
+
+import json_codec
+
+PayloadFields = namedtuple('PayloadFields', ('date', 'title', 'subject', 'description', 'status'))
+
+Extractor = Callable[[Dict[str, Any], Dict[str, Any]], PayloadFields]
+
+
+def inner_metadata(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """The nested ``metadata`` member as a dict; the API sends it as a JSON string, occasionally as an object."""
+    inner = payload.get('metadata')
+    if isinstance(inner, str):
+        try:
+            inner = json_codec.loads(inner)
+        except json.JSONDecodeError:
+            return {}
+    return inner if isinstance(inner, dict) else {}
+
+
+def _text(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def detail_record(payload: Dict[str, Any], inner: Dict[str, Any]) -> PayloadFields:
+    """The shape every current ``.../byid`` detail endpoint returns.
+
+    ``date`` is the record's own date; ``submission_date`` is the copy
+    fetch_document_metadata makes of it. The title is returned as sent, the
+    other text fields stripped. Complaints and Incidents often have a blank
+    title and carry their headline in ``subject``.
+    """
+    return PayloadFields(
+        date=inner.get('date') or payload.get('submission_date') or payload.get('date'),
+        title=payload['title'] if 'title' in payload else inner.get('title'),
+        subject=_text(inner.get('subject')) or _text(payload.get('subject')),
+        description=_text(inner.get('description')) or _text(payload.get('description')),
+        status=_text(inner.get('status')) or _text(payload.get('status')),
+    )
+
+
+def unknown_shape(payload: Dict[str, Any], inner: Dict[str, Any]) -> PayloadFields:
+    """Text fields only; no date is trusted from a shape nobody has looked at."""
+    return detail_record(payload, inner)._replace(date=None)
+
+
+# One entry per endpoint in EPAScraper.type_to_endpoint. They share a shape today.
+# Give an endpoint its own extractor here when its responses diverge.
+EXTRACTORS: Dict[str, Extractor] = {
+    'LicenseeReturns/byid': detail_record,
+    'Incident/byid': detail_record,
+    'Complaint/byid': detail_record,
+    'SiteVisit/byid': detail_record,
+    'NonCompliance/byid': detail_record,
+    'Ci/byid': detail_record,
+    'MeetingCorrespondence/meetingbyid': detail_record,
+    'MeetingCorrespondence/epainiciatedcorrespondencebyid': detail_record,
+    'MeetingCorrespondence/thirdpartycorrespondencebyid': detail_record,
+}
+
+
+def register_extractor(endpoint: str, extractor: Extractor) -> None:
+    EXTRACTORS[endpoint] = extractor
+
+
+def endpoint_for_url(url: Optional[str]) -> Optional[str]:
+    """'https://.../leap/api/v1/Complaint/byid?complaint_id=…' -> 'Complaint/byid'."""
+    if not url:
+        return None
+    parts = urlsplit(url).path.rstrip('/').split('/')
+    return '/'.join(parts[-2:]) if len(parts) >= 2 else None
+
+
+def extract_payload_fields(endpoint: Optional[str], payload: Dict[str, Any]) -> PayloadFields:
+    """Known fields of one document payload; ``date`` is None when the caller should fall back to a generic scan."""
+    extractor = EXTRACTORS.get(endpoint, unknown_shape)
+    return extractor(payload, inner_metadata(payload))
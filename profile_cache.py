@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""Licence profile lookups shared by the scraper, exporters and backfills.
+
+ProfileCache loads every licence profile's attributes into a dict once, so
+code that needs a profile's number or name for each document resolves it in
+memory instead of querying licence_profiles per row. The LEAP URL helpers that
+depend on the profile number live here too, so every caller builds
+``leap_url`` the same way.
+"""
+import sqlite3
+from collections import namedtuple
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+# Mapping from document_type to URL segment for constructing LEAP URLs
+TYPE_SEGMENT_MAP: Dict[str, str] = {
+    "Monitoring Returns": "return",
+    "Annual Environmental Report": "return",
+    "Requests for Approval and Site Reports": "return",
+    "Site Updates/Notifications": "return",
+    "Site Closure and Surrender": "return",
+    "Site Visit": "sitevisit",
+    "Non Compliance": "non-compliance",
+    "Incident": "incident",
+    "Complaint": "complaint",
+    "Compliance Investigation": "investigation",
+    "EPA Initiated Correspondence": "epa-correspondence",
+}
+
+PROFILE_FIELDS = ['profilenumber', 'name', 'county', 'town', 'organisationname',
+                  'activelicencetype', 'activelicenceregno']
+ProfileInfo = namedtuple('ProfileInfo', PROFILE_FIELDS)
+
+
+def extract_guid(document_url: Optional[str]) -> Optional[str]:
+    """Return the LEAP GUID/id from a document_url (first query value, else last path segment)."""
+    if not document_url:
+        return None
+    parsed = urlparse(document_url.rstrip("/"))
+    if parsed.query:
+        qs = parse_qs(parsed.query)
+        # take first query parameter value (lr_id, incident_id, etc.)
+        val_list = next(iter(qs.values()), [""])
+        return val_list[0] if val_list else None
+    # Otherwise use last path segment
+    return parsed.path.rstrip("/").split("/")[-1] if parsed.path else None
+
+
+def compute_leap_url(profilenumber: Optional[str], document_type: Optional[str], document_url: str) -> Optional[str]:
+    """Public leap.epa.ie page for a document, or None without a profile number or GUID."""
+    if not profilenumber:
+        return None
+    seg = TYPE_SEGMENT_MAP.get(document_type or "", "return")
+    guid = extract_guid(document_url)
+    if guid:
+        return f"https://leap.epa.ie/licence-profile/{profilenumber}/compliance/{seg}/{guid}"
+    return None
+
+
+class ProfileCache:
+    """Lazily loaded licenceprofileid -> ProfileInfo map for one database connection."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self._profiles: Optional[Dict[str, ProfileInfo]] = None
+
+    def _load(self) -> Dict[str, ProfileInfo]:
+        cursor = self.conn.execute(f"SELECT licenceprofileid, {', '.join(PROFILE_FIELDS)} FROM licence_profiles")
+        self._profiles = {row[0]: ProfileInfo(*row[1:]) for row in cursor}
+        return self._profiles
+
+    def refresh(self) -> None:
+        """Forget the loaded map (e.g. after Phase 1 adds profiles); it is reloaded on next use."""
+        self._profiles = None
+
+    def get(self, profile_id: Optional[str]) -> Optional[ProfileInfo]:
+        if not profile_id:
+            return None
+        profiles = self._profiles if self._profiles is not None else self._load()
+        return profiles.get(profile_id)
+
+    def profilenumber(self, profile_id: Optional[str]) -> Optional[str]:
+        info = self.get(profile_id)
+        return info.profilenumber if info else None
+
+    def __len__(self) -> int:
+        return len(self._profiles if self._profiles is not None else self._load())
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Adaptive hot/cold polling schedule for Phase 2 licence profile checks.
+
+Each profile's arrival rate is learned from the dates of its stored compliance
+records. Profiles that receive records regularly (or changed recently) are
+"hot" and polled on every run. The rest are "cold" and are split into
+deterministic slices by a hash of their id, one slice per run, so every cold
+profile is polled at least once every ``max_staleness_days`` daily runs. A
+profile whose last successful check is older than that is always polled,
+which keeps the staleness guarantee even when runs are skipped.
+"""
+import sqlite3
+import zlib
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+import db
+
+DEFAULT_MAX_STALENESS_DAYS = 7
+DEFAULT_HOT_WINDOW_DAYS = 365
+DEFAULT_HOT_RECORDS_PER_MONTH = 1.0
+DEFAULT_RECENT_ACTIVITY_DAYS = 14
+
+ProfileActivity = namedtuple('ProfileActivity', ['records_in_window', 'newest_record_date'])
+
+
+def _parse_iso(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+class ProfileScheduler:
+    """Decide which licence profiles Phase 2 should poll on a given run."""
+
+    def __init__(self, conn: sqlite3.Connection, max_staleness_days: int = DEFAULT_MAX_STALENESS_DAYS,
+                 hot_window_days: int = DEFAULT_HOT_WINDOW_DAYS,
+                 hot_records_per_month: float = DEFAULT_HOT_RECORDS_PER_MONTH,
+                 recent_activity_days: int = DEFAULT_RECENT_ACTIVITY_DAYS):
+        self.conn = conn
+        self.max_staleness_days = max(1, max_staleness_days)
+        self.hot_window_days = hot_window_days
+        self.hot_records_per_month = hot_records_per_month
+        self.recent_activity_days = recent_activity_days
+
+    def load_activity(self, now: datetime) -> Dict[str, ProfileActivity]:
+        """Count each profile's compliance records dated inside the learning window."""
+        window_start = db.epoch_seconds((now - timedelta(days=self.hot_window_days)).date())
+        cursor = self.conn.execute("""
+            SELECT licenceprofileid,
+                   SUM(CASE WHEN date_ts >= ? THEN 1 ELSE 0 END),
+                   MAX(date)
+            FROM compliance_records
+            GROUP BY licenceprofileid
+        """, (window_start,))
+        return {row[0]: ProfileActivity(row[1] or 0, row[2]) for row in cursor.fetchall()}
+
+    def records_per_month(self, activity: Optional[ProfileActivity]) -> float:
+        if not activity:
+            return 0.0
+        return activity.records_in_window * 30.0 / self.hot_window_days
+
+    def is_hot(self, activity: Optional[ProfileActivity], last_updated: Optional[datetime], now: datetime) -> bool:
+        if self.records_per_month(activity) >= self.hot_records_per_month:
+            return True
+        # New records or documents bump last_updated, so recent changes keep a profile hot for a while
+        return bool(last_updated and now - last_updated < timedelta(days=self.recent_activity_days))
+
+    def slice_for(self, profile_id: str) -> int:
+        """Stable slice number for a profile (crc32 is deterministic across runs, unlike hash())."""
+        return zlib.crc32(profile_id.encode('utf-8')) % self.max_staleness_days
+
+    def select(self, profiles: Iterable[Tuple[str, Optional[str], Optional[str]]],
+               now: Optional[datetime] = None) -> Tuple[Set[str], Dict[str, int]]:
+        """Return the ids to poll from (profile_id, last_checked, last_updated) rows, plus counts by reason."""
+        now = now or datetime.now(timezone.utc)
+        activity = self.load_activity(now)
+        current_slice = now.date().toordinal() % self.max_staleness_days
+        max_staleness = timedelta(days=self.max_staleness_days)
+
+        to_poll: Set[str] = set()
+        counts = {'never_checked': 0, 'stale': 0, 'hot': 0, 'cold_slice': 0, 'skipped': 0}
+        for profile_id, last_checked_str, last_updated_str in profiles:
+            last_checked = _parse_iso(last_checked_str)
+            if not last_checked:
+                reason = 'never_checked'
+            elif now - last_checked >= max_staleness:
+                reason = 'stale'
+            elif self.is_hot(activity.get(profile_id), _parse_iso(last_updated_str), now):
+                reason = 'hot'
+            elif self.slice_for(profile_id) == current_slice:
+                reason = 'cold_slice'
+            else:
+                counts['skipped'] += 1
+                continue
+            counts[reason] += 1
+            to_poll.add(profile_id)
+        return to_poll, counts
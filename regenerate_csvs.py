@@ -9,6 +9,9 @@ import subprocess
 import sys
 from datetime import datetime, timedelta
 
+import db
+import migrations
+
 def regenerate_all_csvs():
     """Regenerate all CSV files from April 1st, 2025 to today."""
     
@@ -23,6 +26,17 @@ def regenerate_all_csvs():
     
     print(f"Regenerating CSV files from {start_date} to {today}")
     print(f"Output directory: {output_dir}")
+
+    # Forget what the files being regenerated contained, so their documents are exported afresh
+    conn = db.connect(db.DB_PATH, 'ingest')
+    try:
+        migrations.migrate(conn)
+        with conn:
+            cleared = conn.execute("DELETE FROM export_ledger WHERE export_date >= ?",
+                                   (start_date.isoformat(),)).rowcount
+    finally:
+        conn.close()
+    print(f"Cleared {cleared} export ledger entries")
     
     # Counter for tracking progress
     total_days = (today - start_date).days + 1
@@ -78,7 +92,7 @@ def regenerate_all_csvs():
 if __name__ == '__main__':
     # Confirm before running
     print("This script will:")
-    print("1. Delete all existing CSV files from April 1st, 2025 onwards")
+    print("1. Delete all existing CSV files (and their export ledger entries) from April 1st, 2025 onwards")
     print("2. Regenerate them using the fixed export_to_csv.py script")
     print("3. This may take several minutes depending on the date range")
     
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""Persistent on-disk cache for LEAP API responses.
+
+Entries are keyed by URL plus query parameters and stored in a small SQLite
+file next to the main database. Responses carrying an ETag or Last-Modified
+header are revalidated with conditional GETs; responses without validators
+are served from disk until they are older than the configured TTL. The cache
+is capped in size and evicts the least recently used entries first.
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from typing import Any, Dict, Optional
+from urllib.parse import urlencode
+
+DEFAULT_CACHE_PATH = "http_cache.db"
+DEFAULT_TTL_SECONDS = 6 * 60 * 60
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+CachedResponse = namedtuple('CachedResponse', ['body', 'etag', 'last_modified', 'stored_at'])
+
+
+class ResponseCache:
+    """SQLite-backed HTTP response cache with TTL fallback and LRU eviction."""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        # Shared by the Phase 2/3 worker threads; every access goes through self._lock
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    url TEXT,
+                    body BLOB,
+                    etag TEXT,
+                    last_modified TEXT,
+                    stored_at REAL,
+                    last_access REAL,
+                    size INTEGER
+                )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses (last_access)")
+            self.conn.commit()
+            self._total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        self.stats = {
+            'hits': 0,          # served from disk within the TTL, no request made
+            'revalidated': 0,   # conditional GET answered 304 Not Modified
+            'misses': 0,        # full download required
+            'evictions': 0,
+            'bytes_saved': 0,
+        }
+
+    @staticmethod
+    def key_for(url: str, params: Optional[Dict[str, Any]] = None) -> str:
+        """Stable cache key for a URL and its query parameters (order-insensitive)."""
+        query = urlencode(sorted((params or {}).items()), doseq=True)
+        return hashlib.sha256(f"{url}?{query}".encode('utf-8')).hexdigest()
+
+    def lookup(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT body, etag, last_modified, stored_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        return CachedResponse(*row) if row else None
+
+    def is_fresh(self, entry: CachedResponse) -> bool:
+        return time.time() - entry.stored_at < self.ttl_seconds
+
+    def conditional_headers(self, entry: CachedResponse) -> Dict[str, str]:
+        headers = {}
+        if entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def record_hit(self, key: str, entry: CachedResponse, revalidated: bool = False) -> None:
+        """Mark an entry as used; a successful revalidation also restarts its TTL."""
+        now = time.time()
+        with self._lock:
+            if revalidated:
+                self.conn.execute("UPDATE responses SET last_access = ?, stored_at = ? WHERE key = ?", (now, now, key))
+                self.stats['revalidated'] += 1
+            else:
+                self.conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+                self.stats['hits'] += 1
+            self.stats['bytes_saved'] += len(entry.body)
+            self.conn.commit()
+
+    def record_miss(self) -> None:
+        with self._lock:
+            self.stats['misses'] += 1
+
+    def store(self, key: str, url: str, body: bytes, etag: Optional[str], last_modified: Optional[str]) -> None:
+        size = len(body)
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            previous = self.conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self.conn.execute("""
+                INSERT OR REPLACE INTO responses (key, url, body, etag, last_modified, stored_at, last_access, size)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (key, url, sqlite3.Binary(body), etag, last_modified, now, now, size))
+            self._total_bytes += size - (previous[0] if previous else 0)
+            if self._total_bytes > self.max_bytes:
+                self._evict_locked()
+            self.conn.commit()
+
+    def _evict_locked(self) -> None:
+        """Drop least recently used entries until the cache is back under 90% of its cap."""
+        target = int(self.max_bytes * 0.9)
+        cursor = self.conn.execute("SELECT key, size FROM responses ORDER BY last_access")
+        victims = []
+        for key, size in cursor:
+            if self._total_bytes <= target:
+                break
+            victims.append((key,))
+            self._total_bytes -= size
+        self.conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+        self.stats['evictions'] += len(victims)
+
+    def summary(self) -> str:
+        s = self.stats
+        return (f"{s['hits']} hits, {s['revalidated']} revalidated (304), {s['misses']} misses, "
+                f"{s['evictions']} evictions, {s['bytes_saved'] / 1024:.0f} KB not re-downloaded")
+
+    def close(self) -> None:
+        with self._lock:
+            self.conn.close()
@@ -6,22 +6,8 @@ import csv
 from typing import List, Dict, Optional, Tuple
 from datetime import datetime, timezone, timedelta
 import argparse
-from urllib.parse import urlparse, parse_qs
 
-# Mapping from document_type to URL segment for constructing LEAP URLs
-TYPE_SEGMENT_MAP = {
-    "Monitoring Returns": "return",
-    "Annual Environmental Report": "return",
-    "Requests for Approval and Site Reports": "return",
-    "Site Updates/Notifications": "return",
-    "Site Closure and Surrender": "return",
-    "Site Visit": "sitevisit",
-    "Non Compliance": "non-compliance",
-    "Incident": "incident",
-    "Complaint": "complaint",
-    "Compliance Investigation": "investigation",
-    "EPA Initiated Correspondence": "epa-correspondence",
-}
+import db
 
 class RSSGenerator:
     def __init__(self, db_path: str = "epa_ireland.db"):
@@ -31,7 +17,8 @@ class RSSGenerator:
             db_path: Path to the SQLite database file
         """
         self.db_path = db_path
-        self.conn = sqlite3.connect(db_path)
+        # Read-only snapshot; safe to run while a scrape is writing
+        self.conn = db.connect(db_path, 'reporting')
         self.conn.row_factory = sqlite3.Row
         
     def close(self):
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""Per-phase metrics for scraper runs.
+
+RunMetrics collects, for each phase of a run, the API requests made (count,
+bytes and latency percentiles per endpoint, the percentiles estimated from a
+bounded sample), the rows inserted, updated and deleted, the time spent in
+SQLite versus waiting on the network, and the items processed per second
+(what the tqdm bars show), and named event counters such as fallback code
+paths being taken. It writes them as a JSON run report and as a Prometheus
+textfile-collector file.
+
+Network time is the sum of request latencies, so with concurrent workers it
+can exceed the phase's wall time. DB time covers every statement and commit
+issued through a TimedConnection.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Union
+
+from leap_client import LatencySamples
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor that charges its execute time and row counts to its TimedConnection."""
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self.connection._record(sql, time.perf_counter() - start, self.rowcount)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self.connection._record(sql, time.perf_counter() - start, self.rowcount)
+
+
+class TimedConnection(sqlite3.Connection):
+    """sqlite3 connection that accumulates DB time and rows written by statement kind.
+
+    Pass as ``sqlite3.connect(path, factory=TimedConnection)``.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.db_seconds = 0.0
+        self.rows = defaultdict(int)
+
+    def _record(self, sql: str, elapsed: float, rowcount: int) -> None:
+        self.db_seconds += elapsed
+        if rowcount and rowcount > 0:
+            verb = sql.lstrip().split(None, 1)[0].lower() if sql.strip() else ''
+            if verb in ('insert', 'replace', 'update', 'delete'):
+                # Upserts (INSERT ... ON CONFLICT / OR REPLACE) count as inserts
+                self.rows['inserted' if verb in ('insert', 'replace') else verb + 'd'] += rowcount
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        start = time.perf_counter()
+        try:
+            super().commit()
+        finally:
+            self.db_seconds += time.perf_counter() - start
+
+
+class PhaseMetrics:
+    """Measurements for one phase; filled in by RunMetrics."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started_at: Optional[datetime] = None
+        self.wall_seconds = 0.0
+        self.requests = 0
+        self.bytes = 0
+        self.errors = 0
+        self.network_seconds = 0.0
+        self.db_seconds = 0.0
+        self.rows = {'inserted': 0, 'updated': 0, 'deleted': 0}
+        self.items = 0
+        self.counters: Dict[str, int] = defaultdict(int)
+        # Bounded per-endpoint reservoirs, the same collector LeapClient uses for its run summary
+        self.latencies: Dict[str, LatencySamples] = defaultdict(LatencySamples)
+
+    def as_dict(self) -> Dict[str, Any]:
+        endpoints = {}
+        for endpoint, samples in sorted(self.latencies.items()):
+            summary = samples.summary()
+            endpoints[endpoint] = {'requests': summary.pop('count'), **summary}
+        return {
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'wall_seconds': self.wall_seconds,
+            'requests': self.requests,
+            'bytes': self.bytes,
+            'errors': self.errors,
+            'network_seconds': self.network_seconds,
+            'db_seconds': self.db_seconds,
+            'rows': dict(self.rows),
+            'items': self.items,
+            'items_per_second': self.items / self.wall_seconds if self.wall_seconds > 0 else 0.0,
+            'counters': dict(sorted(self.counters.items())),
+            'endpoints': endpoints,
+        }
+
+
+class RunMetrics:
+    """Collects PhaseMetrics for a run. Requests outside any phase are not attributed."""
+
+    def __init__(self):
+        self.phases: Dict[str, PhaseMetrics] = {}
+        self.started_at = datetime.now(timezone.utc)
+        self.finished_at: Optional[datetime] = None
+        self.success = False
+        self._current: Optional[PhaseMetrics] = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str, conn: Union[sqlite3.Connection, Sequence[sqlite3.Connection], None] = None) -> Iterator[PhaseMetrics]:
+        """Attribute requests, DB work and items to ``name`` while the block runs.
+
+        ``conn`` may be a list, e.g. the main connection plus a DBWriter's.
+        """
+        metrics = self.phases.setdefault(name, PhaseMetrics(name))
+        metrics.started_at = metrics.started_at or datetime.now(timezone.utc)
+        conns = [c for c in (conn if isinstance(conn, (list, tuple)) else [conn]) if isinstance(c, TimedConnection)]
+        before = [(c.db_seconds, dict(c.rows)) for c in conns]
+        with self._lock:
+            self._current = metrics
+        start = time.perf_counter()
+        try:
+            yield metrics
+        finally:
+            metrics.wall_seconds += time.perf_counter() - start
+            with self._lock:
+                self._current = None
+            for c, (db_seconds_before, rows_before) in zip(conns, before):
+                metrics.db_seconds += c.db_seconds - db_seconds_before
+                for kind in metrics.rows:
+                    metrics.rows[kind] += c.rows.get(kind, 0) - rows_before.get(kind, 0)
+
+    def on_request(self, endpoint: str, elapsed: float, size: int, status: Optional[int]) -> None:
+        """LeapClient observer: called from worker threads once per HTTP attempt."""
+        with self._lock:
+            metrics = self._current
+            if metrics is None:
+                return
+            metrics.requests += 1
+            metrics.bytes += size
+            metrics.network_seconds += elapsed
+            metrics.latencies[endpoint].add(elapsed)
+            if status is None or status >= 400:
+                metrics.errors += 1
+
+    def add_items(self, count: int) -> None:
+        with self._lock:
+            if self._current is not None:
+                self._current.items += count
+
+    def count(self, name: str, amount: int = 1) -> None:
+        """Bump a named event counter of the current phase, e.g. a fallback code path being taken."""
+        with self._lock:
+            if self._current is not None:
+                self._current.counters[name] += amount
+
+    def finish(self, success: bool) -> None:
+        self.success = success
+        self.finished_at = datetime.now(timezone.utc)
+
+    def report(self) -> Dict[str, Any]:
+        finished_at = self.finished_at or datetime.now(timezone.utc)
+        return {
+            'started_at': self.started_at.isoformat(),
+            'finished_at': finished_at.isoformat(),
+            'duration_seconds': (finished_at - self.started_at).total_seconds(),
+            'success': self.success,
+            'phases': {name: phase.as_dict() for name, phase in self.phases.items()},
+        }
+
+    def write_json(self, path: str) -> None:
+        _write_atomic(path, json.dumps(self.report(), indent=2) + '\n')
+
+    def prometheus_text(self) -> str:
+        report = self.report()
+        lines: List[str] = []
+
+        def metric(name: str, help_text: str, samples: List[tuple]) -> None:
+            lines.append(f"# HELP epa_scraper_{name} {help_text}")
+            lines.append(f"# TYPE epa_scraper_{name} gauge")
+            for labels, value in samples:
+                label_text = ','.join(f'{k}="{_escape_label(v)}"' for k, v in labels.items())
+                value_text = str(value) if isinstance(value, int) else repr(round(float(value), 6))
+                lines.append(f"epa_scraper_{name}{{{label_text}}} {value_text}" if label_text
+                             else f"epa_scraper_{name} {value_text}")
+
+        phases = report['phases']
+        metric('run_success', 'Whether the last run completed all phases (1) or stopped early (0).',
+               [({}, 1 if report['success'] else 0)])
+        metric('run_finished_timestamp_seconds', 'Unix time the last run finished.',
+               [({}, datetime.fromisoformat(report['finished_at']).timestamp())])
+        metric('run_duration_seconds', 'Wall time of the last run.', [({}, report['duration_seconds'])])
+        metric('phase_duration_seconds', 'Wall time spent in each phase.',
+               [({'phase': name}, p['wall_seconds']) for name, p in phases.items()])
+        metric('phase_requests', 'HTTP requests made in each phase, including retries.',
+               [({'phase': name}, p['requests']) for name, p in phases.items()])
+        metric('phase_request_errors', 'HTTP attempts that failed or returned an error status.',
+               [({'phase': name}, p['errors']) for name, p in phases.items()])
+        metric('phase_bytes', 'Response bytes downloaded in each phase.',
+               [({'phase': name}, p['bytes']) for name, p in phases.items()])
+        metric('phase_network_seconds', 'Summed request latency in each phase (can exceed wall time with concurrency).',
+               [({'phase': name}, p['network_seconds']) for name, p in phases.items()])
+        metric('phase_db_seconds', 'Time spent executing SQLite statements and commits in each phase.',
+               [({'phase': name}, p['db_seconds']) for name, p in phases.items()])
+        metric('phase_rows', 'Rows written in each phase by operation.',
+               [({'phase': name, 'op': op}, count) for name, p in phases.items() for op, count in p['rows'].items()])
+        metric('phase_items_per_second', 'Profiles or compliance records processed per second in each phase.',
+               [({'phase': name}, p['items_per_second']) for name, p in phases.items()])
+        metric('phase_events', 'Named events counted in each phase, such as fallback code paths.',
+               [({'phase': name, 'event': event}, count)
+                for name, p in phases.items() for event, count in p['counters'].items()])
+        metric('endpoint_requests', 'HTTP requests per endpoint in each phase.',
+               [({'phase': name, 'endpoint': endpoint}, e['requests'])
+                for name, p in phases.items() for endpoint, e in p['endpoints'].items()])
+        metric('endpoint_latency_seconds', 'Request latency percentiles per endpoint in each phase.',
+               [({'phase': name, 'endpoint': endpoint, 'quantile': q}, e[key])
+                for name, p in phases.items() for endpoint, e in p['endpoints'].items()
+                for q, key in (('0.5', 'p50'), ('0.95', 'p95'), ('0.99', 'p99'), ('1', 'max'))])
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path: str) -> None:
+        """Write a textfile-collector file; node_exporter only reads *.prom files."""
+        _write_atomic(path, self.prometheus_text())
+
+
+def _escape_label(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _write_atomic(path: str, text: str) -> None:
+    """Write via a temporary file and rename, so collectors never read a half-written file."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
@@ -4,13 +4,18 @@
 import urllib3
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+import argparse
 import json
+import re
 import signal
 import sqlite3
 import sys
-from contextlib import contextmanager
-from datetime import datetime, timezone
-from typing import Dict, Any, List, Set, ContextManager, Optional, Tuple, Union
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing, contextmanager
+from functools import lru_cache, partial
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, Iterator, List, Set, ContextManager, Optional, Tuple, Union
 import requests
 import time
 from tqdm import tqdm
@@ -20,28 +25,138 @@ import csv
 import os
 import logging
 from rss_generator import RSSGenerator
-from urllib.parse import urlparse, parse_qs
-
-# Mapping from document_type to URL segment for constructing LEAP URLs
-TYPE_SEGMENT_MAP = {
-    "Monitoring Returns": "return",
-    "Annual Environmental Report": "return",
-    "Requests for Approval and Site Reports": "return",
-    "Site Updates/Notifications": "return",
-    "Site Closure and Surrender": "return",
-    "Site Visit": "sitevisit",
-    "Non Compliance": "non-compliance",
-    "Incident": "incident",
-    "Complaint": "complaint",
-    "Compliance Investigation": "investigation",
-    "EPA Initiated Correspondence": "epa-correspondence",
+from throttle import TokenBucket
+from async_fetch import AsyncFetchEngine
+from leap_client import LeapClient
+from response_cache import DEFAULT_CACHE_PATH, DEFAULT_MAX_BYTES, DEFAULT_TTL_SECONDS, ResponseCache
+from profile_scheduler import DEFAULT_MAX_STALENESS_DAYS, ProfileScheduler
+from run_metrics import RunMetrics, TimedConnection
+from json_stream import iter_json_list_items
+from db_writer import DBWriter, DroppedWritesError
+import db
+import json_codec
+import migrations
+from blob_codec import BlobCodec
+from document_fields import DOCUMENT_FIELDS_VERSION, document_fields
+from payload_extractors import extract_payload_fields
+from profile_cache import ProfileCache, compute_leap_url
+
+# Global request budget used when Phase 2/3 run concurrently and no explicit cap is given
+DEFAULT_MAX_REQUESTS_PER_SECOND = 10.0
+
+# Incremental Phase 2: re-fetch this many days before each profile's watermark, and
+# re-read a profile's full compliance history at least this often
+DEFAULT_OVERLAP_DAYS = 7
+DEFAULT_FULL_SWEEP_DAYS = 30
+
+# Concurrent page fetches within one profile's compliance list
+DEFAULT_PAGE_WORKERS = 4
+
+# LEAP API root; override with --base-url or LEAP_BASE_URL (e.g. to point at leap_simulator.py)
+DEFAULT_BASE_URL = "https://data.epa.ie/leap/api/v1"
+
+# Read size for the streamed LicenceProfile list
+PROFILE_STREAM_CHUNK_BYTES = 64 * 1024
+
+# Resumable runs: commit progress after this many Phase 2 profiles / Phase 3 compliance records
+PHASE2_CHECKPOINT_EVERY = 25
+PHASE3_CHECKPOINT_EVERY = 200
+
+# Phase 1 syncs these LicenceProfile fields; a difference in any of them rewrites the profile's row
+PROFILE_SYNC_COLUMNS = ['name', 'profilenumber', 'activelicencetype', 'activelicenceregno',
+                        'county', 'town', 'organisationname', 'url']
+PROFILE_STAGING_BATCH_SIZE = 500
+
+COMPLIANCE_RECORD_COLUMNS = ['compliancerecord_id', 'licenceprofileid', 'type', 'title', 'status', 'date',
+                             'last_updated', 'last_checked', 'metadata_json']
+COMPLIANCE_DOCUMENT_COLUMNS = ['document_date', 'document_url', 'compliance_id', 'document_id', 'document_type',
+                               'title', 'leap_url', 'last_updated', 'last_checked', 'metadata_json',
+                               'subject', 'description', 'status', 'fields_version']
+
+# Typed write operations for Phase 2/3 and checkpoints, each run with executemany (see EPAScraper._write)
+WRITE_SQL = {
+    # New compliance records; ones already stored only get last_checked refreshed
+    'record_upsert': f"""
+        INSERT INTO compliance_records ({', '.join(COMPLIANCE_RECORD_COLUMNS)})
+        VALUES ({', '.join('?' * len(COMPLIANCE_RECORD_COLUMNS))})
+        ON CONFLICT(compliancerecord_id) DO UPDATE SET last_checked = excluded.last_checked
+    """,
+    'record_touch': "UPDATE compliance_records SET last_checked = ? WHERE compliancerecord_id = ?",
+    'record_bump': "UPDATE compliance_records SET last_updated = ? WHERE compliancerecord_id = ?",
+    'profile_touch': "UPDATE licence_profiles SET last_checked = ? WHERE licenceprofileid = ?",
+    'profile_full_sweep': "UPDATE licence_profiles SET last_full_sweep = ? WHERE licenceprofileid = ?",
+    'profile_bump': "UPDATE licence_profiles SET last_updated = ? WHERE licenceprofileid = ?",
+    # last_updated only moves when the document's content actually changed
+    'document_upsert': f"""
+        INSERT INTO compliance_documents ({', '.join(COMPLIANCE_DOCUMENT_COLUMNS)})
+        VALUES ({', '.join('?' * len(COMPLIANCE_DOCUMENT_COLUMNS))})
+        ON CONFLICT(document_url) DO UPDATE SET
+            last_checked = excluded.last_checked,
+            leap_url = excluded.leap_url,
+            title = excluded.title,
+            document_date = excluded.document_date,
+            document_type = excluded.document_type,
+            metadata_json = excluded.metadata_json,
+            subject = excluded.subject,
+            description = excluded.description,
+            status = excluded.status,
+            fields_version = excluded.fields_version,
+            last_updated = CASE
+                WHEN IFNULL(compliance_documents.title, '') != IFNULL(excluded.title, '') OR
+                     IFNULL(compliance_documents.document_date, '') != IFNULL(excluded.document_date, '') OR
+                     IFNULL(compliance_documents.document_type, '') != IFNULL(excluded.document_type, '') OR
+                     IFNULL(compliance_documents.metadata_json, '') != IFNULL(excluded.metadata_json, '')
+                THEN excluded.last_updated
+                ELSE compliance_documents.last_updated
+            END
+    """,
+    'document_touch': "UPDATE compliance_documents SET last_checked = ? WHERE document_url = ?",
+    'run_profile_done': "INSERT OR IGNORE INTO run_profiles_done (run_id, licenceprofileid) VALUES (?, ?)",
+    'run_pending_add': "INSERT OR IGNORE INTO run_pending_documents (run_id, compliance_id) VALUES (?, ?)",
+    'run_pending_remove': "DELETE FROM run_pending_documents WHERE run_id = ? AND compliance_id = ?",
+    'run_heartbeat': "UPDATE scraper_runs SET updated_at = ? WHERE run_id = ?",
 }
 
+# Fixed date shapes the LEAP API returns, e.g. 2025-04-07, 2025-04-07T00:00:00,
+# 2025-04-07T09:30:00.123, 2025-04-07 09:30:00+01:00, 2025-04-07T09:30:00Z
+_ISO_DATE_RE = re.compile(
+    r'(\d{4})-(\d{2})-(\d{2})'
+    r'(?:[T ](\d{2}):(\d{2})(?::(\d{2})(?:[.,](\d{1,6})\d*)?)?(Z|[+-]\d{2}(?::?\d{2})?)?)?'
+)
+
+# Distinct date strings remembered by the date parsers; payloads repeat the same few dates a lot
+DATE_CACHE_SIZE = 32768
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def _parse_iso_fast(date_str: str) -> Optional[datetime]:
+    """Parse the fixed ISO shapes above without dateutil; None for anything else.
+       Naive values are taken as UTC, explicit offsets are kept."""
+    match = _ISO_DATE_RE.fullmatch(date_str)
+    if not match:
+        return None
+    year, month, day, hour, minute, second, fraction, tz = match.groups()
+    try:
+        tzinfo = timezone.utc
+        if tz and tz != 'Z':
+            digits = tz[1:].replace(':', '')
+            offset = timedelta(hours=int(digits[:2]), minutes=int(digits[2:] or 0))
+            tzinfo = timezone(-offset if tz[0] == '-' else offset)
+        return datetime(int(year), int(month), int(day), int(hour or 0), int(minute or 0), int(second or 0),
+                        int((fraction or '0').ljust(6, '0')), tzinfo=tzinfo)
+    except ValueError:
+        # Out-of-range fields (e.g. 24:00:00) are left to the general parsers
+        return None
+
 
 # Helper to parse API date strings safely
 def parse_api_date(date_str: Optional[str]) -> Optional[datetime]:
     if not date_str:
         return None
+    if isinstance(date_str, str):
+        dt = _parse_iso_fast(date_str)
+        if dt is not None:
+            return dt
     try:
         # Assuming API dates are naive, make them timezone-aware UTC
         # Or treat stored dates as UTC. Let's assume API gives UTC equivalent.
@@ -59,6 +174,14 @@ def parse_date_string(date_str):
     """Attempts to parse a date string into a datetime object."""
     if not date_str or not isinstance(date_str, str):
         return None
+    # Fast path for the usual LEAP shapes; dateutil only for anything unusual
+    dt = _parse_iso_fast(date_str)
+    if dt is not None:
+        return dt.astimezone(timezone.utc)
+    return _parse_date_string_dateutil(date_str)
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def _parse_date_string_dateutil(date_str: str) -> Optional[datetime]:
     try:
         # Use isoparse for standard ISO 8601 formats, fallback to general parse
         dt = parser.isoparse(date_str)
@@ -108,7 +231,7 @@ def find_newest_date_in_api_response(api_data: dict) -> Optional[str]:
         inner_dict_to_process = inner_metadata
     elif isinstance(inner_metadata, str):
         try:
-            parsed_inner = json.loads(inner_metadata)
+            parsed_inner = json_codec.loads(inner_metadata)
             if isinstance(parsed_inner, dict):
                 inner_dict_to_process = parsed_inner
         except json.JSONDecodeError:
@@ -241,10 +364,43 @@ class EPAScraper:
         }
     }
 
-    def __init__(self):
-        self.base_url = "https://data.epa.ie/leap/api/v1"
+    def __init__(self, workers: int = 1, max_requests_per_second: Optional[float] = None,
+                 document_concurrency: int = 1, http_cache: Optional[ResponseCache] = None,
+                 incremental: bool = False, overlap_days: int = DEFAULT_OVERLAP_DAYS,
+                 full_sweep_days: int = DEFAULT_FULL_SWEEP_DAYS, schedule: bool = False,
+                 max_staleness_days: int = DEFAULT_MAX_STALENESS_DAYS, page_workers: int = DEFAULT_PAGE_WORKERS,
+                 base_url: Optional[str] = None, metrics: Optional[RunMetrics] = None,
+                 writer_thread: bool = False):
+        self.base_url = (base_url or os.environ.get('LEAP_BASE_URL') or DEFAULT_BASE_URL).rstrip('/')
         self.db_path = "epa_ireland.db"
-        self.conn = sqlite3.connect(self.db_path)
+        # Phase 2 worker pool size; 1 keeps the original serial behaviour
+        self.workers = max(1, workers)
+        # Incremental Phase 2 settings (see _incremental_from_date)
+        self.incremental = incremental
+        self.overlap_days = overlap_days
+        self.full_sweep_days = full_sweep_days
+        # Hot/cold polling: poll busy profiles every run, rotate quiet ones through daily slices
+        self.schedule = schedule
+        self.max_staleness_days = max_staleness_days
+        # Pages of one compliance list fetched at once once the first page reveals the total count
+        self.page_workers = max(1, page_workers)
+        # Phase 3 in-flight document lookups; 1 keeps the original serial behaviour
+        self.document_concurrency = max(1, document_concurrency)
+        # Any parallel fetching (the default page prefetch included) gets a global request cap
+        if max_requests_per_second is None and max(self.workers, self.page_workers, self.document_concurrency) > 1:
+            max_requests_per_second = DEFAULT_MAX_REQUESTS_PER_SECOND
+        # Shared across all threads so concurrency never exceeds the global request budget
+        self.rate_limiter = TokenBucket(max_requests_per_second) if max_requests_per_second else None
+        # Per-phase request, latency and DB statistics (see run_metrics.py)
+        self.metrics = metrics or RunMetrics()
+        # Phase 3 documents per endpoint whose date needed the generic scan (see payload_extractors.py)
+        self.date_scan_fallbacks: Counter = Counter()
+        # One pooled, retrying client shared by every fetch path and worker thread
+        self.client = LeapClient(self.base_url, rate_limiter=self.rate_limiter,
+                                 pool_size=max(10, self.workers * self.page_workers, self.document_concurrency),
+                                 cache=http_cache, on_request=self.metrics.on_request)
+        # TimedConnection tracks time spent in SQLite and rows written for the metrics report
+        self.conn = db.connect(self.db_path, 'ingest', factory=TimedConnection)
         self.cursor = self.conn.cursor()
         # Store a date stamp for the current run for CSV naming
         self.run_date_stamp = datetime.now(timezone.utc).strftime("%Y-%m-%d")
@@ -252,6 +408,41 @@ class EPAScraper:
         self._create_tables()
         self.logger = logging.getLogger(__name__)
         self.run_start_time_utc = None # Added for tracking run start time
+        # Row in scraper_runs that checkpoints are written against (set by run())
+        self.run_id = None
+        # Profile attributes for Phase 3 leap_url building, loaded on first use
+        self.profile_cache = ProfileCache(self.conn)
+        # metadata_json payloads are stored compressed with the database's trained dictionary
+        self.blob_codec = BlobCodec(self.conn)
+        # Optional background writer: Phase 2/3 writes are group-committed on their own
+        # thread and connection while this one keeps fetching; reads stay on self.conn
+        self.writer = None
+        if writer_thread:
+            self.writer = DBWriter(self.db_path, connect=partial(db.connect, profile='ingest', factory=TimedConnection))
+
+    def _write(self, ops: List[Tuple[str, List[Tuple]]]):
+        """Apply [(WRITE_SQL kind, rows)] atomically.
+
+        With the writer thread this only queues the unit; otherwise it is committed here.
+        """
+        unit = [(WRITE_SQL[kind], rows) for kind, rows in ops if rows]
+        if not unit:
+            return
+        if self.writer is not None:
+            self.writer.submit(unit)
+            return
+        with transaction(self.conn) as cursor:
+            for sql, rows in unit:
+                cursor.executemany(sql, rows)
+
+    def _flush_writes(self):
+        """Wait for queued writes to commit, before reading them back or writing on self.conn."""
+        if self.writer is not None:
+            self.writer.flush()
+
+    def _db_connections(self) -> List[sqlite3.Connection]:
+        """Connections whose DB time and row counts belong in the phase metrics."""
+        return [self.conn] + ([self.writer.conn] if self.writer is not None else [])
 
     # ---- CSV Logging Helper ----
     def _log_to_csv(self, record_type: str, record_data: Dict[str, Any]):
@@ -323,103 +514,150 @@ class EPAScraper:
 
     # ---- End CSV Logging ----
 
+    def _be_nice_to_api(self):
+        """Fixed politeness delay, used only when no global rate limit is configured."""
+        if not self.rate_limiter:
+            time.sleep(0.1)
+
 
     def _create_tables(self):
-        """Create database tables if they don't already exist."""
+        """Bring the database schema up to date (see migrations.py); no DDL runs when it is current."""
+        for step in migrations.migrate(self.conn):
+            print(f"Applied schema migration {step}")
+
+    # ---- Run Checkpoints ----
+    def _start_run(self, resume: bool = False) -> int:
+        """Create a scraper_runs row, or pick up the latest unfinished one when resuming.
+           Returns the phase the run should start from."""
+        now_iso = datetime.now(timezone.utc).isoformat()
         with transaction(self.conn) as cursor:
-            # Licence Profiles Table
-            cursor.execute("""
-            CREATE TABLE IF NOT EXISTS licence_profiles (
-                licenceprofileid TEXT PRIMARY KEY,
-                name TEXT,
-                profilenumber TEXT,
-                activelicencetype TEXT,
-                activelicenceregno TEXT,
-                county TEXT,
-                town TEXT,
-                organisationname TEXT,
-                url TEXT,
-                last_updated TEXT,
-                last_checked TEXT
-            )
-            """)
+            row = None
+            if resume:
+                cursor.execute("""
+                    SELECT run_id, started_at, phase FROM scraper_runs
+                    WHERE status = 'running' ORDER BY run_id DESC LIMIT 1
+                """)
+                row = cursor.fetchone()
+            # Anything else still marked running was interrupted and will not be resumed now
+            cursor.execute("UPDATE scraper_runs SET status = 'abandoned', updated_at = ? WHERE status = 'running' AND run_id != ?",
+                           (now_iso, row[0] if row else -1))
+            if row:
+                self.run_id, started_at, phase = row
+                self.run_start_time_utc = datetime.fromisoformat(started_at)
+                cursor.execute("UPDATE scraper_runs SET updated_at = ? WHERE run_id = ?", (now_iso, self.run_id))
+            else:
+                cursor.execute("INSERT INTO scraper_runs (started_at, updated_at, phase, status) VALUES (?, ?, 1, 'running')",
+                               (self.run_start_time_utc.isoformat(), now_iso))
+                self.run_id, phase = cursor.lastrowid, 1
+            # Finished-profile checkpoints of runs that will never be resumed are just clutter
+            cursor.execute("DELETE FROM run_profiles_done WHERE run_id != ?", (self.run_id,))
+            # Their pending document checks are not: Phase 2 already committed those records and moved
+            # the profiles' last_checked on, so no later run would pick them up again. Take them over.
+            cursor.execute("UPDATE OR IGNORE run_pending_documents SET run_id = ? WHERE run_id != ?",
+                           (self.run_id, self.run_id))
+            cursor.execute("DELETE FROM run_pending_documents WHERE run_id != ?", (self.run_id,))
+        if row:
+            print(f"Resuming run {self.run_id} (started {started_at}) at Phase {phase}.")
+        elif resume:
+            print("No interrupted run to resume; starting a new run.")
+        return phase
+
+    def _set_run_phase(self, phase: int):
+        self._flush_writes()
+        with transaction(self.conn) as cursor:
+            cursor.execute("UPDATE scraper_runs SET phase = ?, updated_at = ? WHERE run_id = ?",
+                           (phase, datetime.now(timezone.utc).isoformat(), self.run_id))
 
-            # Compliance Records Table
-            cursor.execute("""
-            CREATE TABLE IF NOT EXISTS compliance_records (
-                compliancerecord_id TEXT PRIMARY KEY,
-                licenceprofileid TEXT,
-                type TEXT,
-                title TEXT, 
-                status TEXT,
-                date TEXT,
-                last_updated TEXT,
-                last_checked TEXT,
-                metadata_json TEXT,
-                FOREIGN KEY (licenceprofileid) REFERENCES licence_profiles (licenceprofileid)
-            )
-            """)
-            
-            # Compliance Documents Table
-            cursor.execute("""
-            CREATE TABLE IF NOT EXISTS compliance_documents (
-                document_date TEXT,
-                document_url TEXT PRIMARY KEY,
-                compliance_id TEXT,
-                document_id TEXT,
-                document_type TEXT,
-                title TEXT,
-                leap_url TEXT,
-                last_updated TEXT,
-                last_checked TEXT,
-                metadata_json TEXT,
-                exported BOOLEAN DEFAULT 0,
-                export_date TEXT,
-                FOREIGN KEY (compliance_id) REFERENCES compliance_records (compliancerecord_id)
-            )
-            """)
-            # Ensure leap_url column exists for pre-existing databases
-            cursor.execute("PRAGMA table_info(compliance_documents)")
-            existing_cols = {row[1] for row in cursor.fetchall()}
-            if 'leap_url' not in existing_cols:
-                cursor.execute("ALTER TABLE compliance_documents ADD COLUMN leap_url TEXT")
-        print("Database tables ensured.")
+    def _finish_run(self):
+        """Mark the run complete and drop its checkpoint rows."""
+        self._flush_writes()
+        with transaction(self.conn) as cursor:
+            cursor.execute("UPDATE scraper_runs SET status = 'complete', updated_at = ? WHERE run_id = ?",
+                           (datetime.now(timezone.utc).isoformat(), self.run_id))
+            cursor.execute("DELETE FROM run_profiles_done WHERE run_id = ?", (self.run_id,))
+            cursor.execute("DELETE FROM run_pending_documents WHERE run_id = ?", (self.run_id,))
+
+    def _load_run_progress(self) -> Tuple[Set[str], Set[str]]:
+        """Profiles already finished by this run and compliance IDs still waiting for Phase 3."""
+        if self.run_id is None:
+            return set(), set()
+        done = {row[0] for row in self.conn.execute(
+            "SELECT licenceprofileid FROM run_profiles_done WHERE run_id = ?", (self.run_id,))}
+        pending = {row[0] for row in self.conn.execute(
+            "SELECT compliance_id FROM run_pending_documents WHERE run_id = ?", (self.run_id,))}
+        return done, pending
+
+    def _checkpoint_phase2(self, done_profiles: List[Tuple[str, bool, bool]], pending_ids: Set[str],
+                           records_to_touch: Set[str], records_to_store: List[Tuple] = ()):
+        """Commit Phase 2 progress in one transaction.
+
+        done_profiles holds (profile_id, was_full_sweep, had_new_records) for profiles
+        finished since the last checkpoint. Their watermarks are written together with
+        the compliance records stored for them (records_to_store, as compliance_records
+        rows), so a crash never leaves a profile marked checked without its records (or
+        the other way round).
+        """
+        now_iso = datetime.now(timezone.utc).isoformat()
+        ops = [
+            ('record_upsert', list(records_to_store)),
+            ('profile_touch', [(now_iso, pid) for pid, _, _ in done_profiles]),
+            # Record completed full-history sweeps so incremental runs know when the next one is due
+            ('profile_full_sweep', [(now_iso, pid) for pid, full_sweep, _ in done_profiles if full_sweep]),
+            ('profile_bump', [(now_iso, pid) for pid, _, had_new in done_profiles if had_new]),
+            ('record_touch', [(now_iso, rec_id) for rec_id in records_to_touch]),
+        ]
+        if self.run_id is not None:
+            ops += [
+                ('run_profile_done', [(self.run_id, pid) for pid, _, _ in done_profiles]),
+                ('run_pending_add', [(self.run_id, cid) for cid in pending_ids]),
+                ('run_heartbeat', [(now_iso, self.run_id)]),
+            ]
+        self._write(ops)
+
+    def _checkpoint_phase3(self, handled_ids: List[str], ops: List[Tuple[str, List[Tuple]]] = ()):
+        """Drop compliance IDs whose documents have been written from the run's pending list.
+
+        ops are the document writes for those IDs, committed in the same unit.
+        """
+        ops = list(ops)
+        if self.run_id is not None and handled_ids:
+            ops += [
+                ('run_pending_remove', [(self.run_id, cid) for cid in handled_ids]),
+                ('run_heartbeat', [(datetime.now(timezone.utc).isoformat(), self.run_id)]),
+            ]
+        self._write(ops)
+    # ---- End Run Checkpoints ----
 
     
         
 
-    def fetch_licence_profiles(self) -> List[Dict[str, Any]]:
-        """Fetch all licence profiles from the EPA API."""
+    def iter_licence_profiles(self) -> Iterator[Dict[str, Any]]:
+        """Stream licence profiles from the EPA API one at a time.
+
+        The list response is parsed incrementally as it downloads, so memory stays flat
+        however many profiles there are and Phase 1 can write while the rest arrives.
+        """
         url = f"{self.base_url}/LicenceProfile/list/"
-        all_profiles = []
-        
+        count = 0
         try:
-            # Disable SSL verification to handle certificate issues
-            response = requests.get(url, timeout=15, verify=False)
-            response.raise_for_status()
-            data = response.json()
-
-            if not isinstance(data, dict):
-                print(f"Warning: Unexpected API response format for {url}")
-                return []
-
-            # Print response info
-            print(f"\nResponse data type: {type(data)}")
-            print(f"Keys in response: {list(data.keys())}")
-            print(f"Total profiles: {len(data.get('list', []))}")
-            
-            if data.get('list'):
-                print(f"Sample profile: {json.dumps(data['list'][0], indent=2)}")
-                all_profiles = data['list']
-            
+            response = self.client.get(url, stream=True)
+            with closing(response):
+                for profile in iter_json_list_items(response.iter_content(chunk_size=PROFILE_STREAM_CHUNK_BYTES)):
+                    if not isinstance(profile, dict):
+                        print(f"Warning: Unexpected item in licence profile list from {url}: {profile!r}")
+                        continue
+                    count += 1
+                    yield profile
         except requests.exceptions.Timeout:
-            print(f"Timeout error fetching licence profiles from {url}")
-            return []
-        except Exception as e:
-            print(f"Error fetching licence profiles from {url}: {e}")
-            return []
-        
-        return all_profiles
+            print(f"Timeout error fetching licence profiles from {url} after {count} profiles")
+        except (requests.exceptions.RequestException, ValueError) as e:
+            # ValueError covers malformed or truncated JSON; profiles already yielded are kept
+            print(f"Error fetching licence profiles from {url} after {count} profiles: {e}")
+        print(f"\nTotal profiles: {count}")
+
+    def fetch_licence_profiles(self) -> List[Dict[str, Any]]:
+        """Fetch all licence profiles from the EPA API as a list."""
+        return list(self.iter_licence_profiles())
 
     def fetch_compliance_data(self, licence_profile_id: str, from_date: str = None, to_date: str = None) -> List[Dict[str, Any]]:
         """Fetch compliance data for a specific licence profile, ensuring uniqueness."""
@@ -438,51 +676,70 @@ class EPAScraper:
         if to_date:
             params['date_to'] = to_date
         
+        per_page = params['per_page']
+
+        def fetch_page(page: int) -> Any:
+            response = self.client.get(url, params=dict(params, page=page))
+            self._be_nice_to_api()
+            return json_codec.response_json(response)
+
+        def add_page_records(data: Any, page: int) -> Optional[int]:
+            """Merge one page into unique_records; returns the page's raw record count, or None if malformed."""
+            if not isinstance(data, dict):
+                # If response is not a dict, assume error or unexpected format
+                print(f"Warning: Unexpected response format for {licence_profile_id}, page {page}. Stopping.")
+                return None
+
+            records = data.get('list', [])
+            for record in records:
+                # Validate that records are for the requested profile
+                if record.get('profile_id') != licence_profile_id:
+                    # Keep the warning, as this indicates unexpected API behavior
+                    print(f"Warning: Got record {record.get('compliancerecord_id')} for profile {record.get('profile_id')} while requesting {licence_profile_id}")
+                    continue
+                # Add to the dictionary, automatically handling duplicates
+                record_id = record.get('compliancerecord_id')
+                if record_id:
+                    unique_records[record_id] = record
+            return len(records)
+
         try:
+            first_page = fetch_page(1)
+            page_size = add_page_records(first_page, 1)
+            if not page_size:
+                return list(unique_records.values())
+
+            # Use the API's total count to plan the remaining pages and fetch them in parallel
+            next_page = 2
+            total_count = first_page.get('count')
+            if isinstance(total_count, int) and total_count > page_size:
+                last_page = -(-total_count // per_page)
+                if last_page >= 2:
+                    planned_pages = list(range(2, last_page + 1))
+                    with ThreadPoolExecutor(max_workers=min(self.page_workers, len(planned_pages))) as executor:
+                        # map() preserves page order, so duplicates resolve exactly as in the serial loop
+                        page_sizes = [add_page_records(data, page) for page, data
+                                      in zip(planned_pages, executor.map(fetch_page, planned_pages))]
+                    # Only keep paging if the count looks too low, i.e. the last planned page was full
+                    if page_sizes[-1] is None or page_sizes[-1] < per_page:
+                        return list(unique_records.values())
+                    next_page = last_page + 1
+            elif isinstance(total_count, int) and page_size < per_page:
+                # A short first page that covers the reported count is the whole result
+                return list(unique_records.values())
+
+            # Fallback when count is missing or wrong: page until the API returns an empty list
             while True:
-                # Disable SSL verification to handle certificate issues
-                response = requests.get(url, params=params, timeout=15, verify=False)
-                response.raise_for_status()
-                data = response.json()
-                
-                if not isinstance(data, dict):
-                    # If response is not a dict, assume error or unexpected format
-                    print(f"Warning: Unexpected response format for {licence_profile_id}, page {params['page']}. Stopping.")
-                    break
-                    
-                records = data.get('list', [])
+                page_size = add_page_records(fetch_page(next_page), next_page)
                 # Reliably break the loop ONLY if the API returns an empty list for the current page.
-                if not records:
+                if not page_size:
                     break
-                
-                # Validate that records are for the requested profile
-                filtered_records = []
-                for record in records:
-                    if record.get('profile_id') == licence_profile_id:
-                        filtered_records.append(record)
-                    else:
-                        # Keep the warning, as this indicates unexpected API behavior
-                        print(f"Warning: Got record {record.get('compliancerecord_id')} for profile {record.get('profile_id')} while requesting {licence_profile_id}")
-                        
-                # Add filtered records to the dictionary, automatically handling duplicates
-                for record in filtered_records:
-                    record_id = record.get('compliancerecord_id')
-                    if record_id:
-                        unique_records[record_id] = record
-                
-                # No longer need to check total_count or current_page here
-                # Remove the old break condition: 
-                # total_count = data.get('count', 0)
-                # current_page = params['page']
-                # if len(all_records) >= total_count:
-                #    break
-                    
-                params['page'] = params['page'] + 1 # Simplified increment
-                time.sleep(0.1)  # Be nice to the API
-            
+                next_page += 1
+
         except requests.exceptions.Timeout:
+            # Retries are exhausted; report failure so the profile is not marked as checked
             print(f"Timeout error fetching compliance data for licence {licence_profile_id} from {url}")
-            return []
+            return None
         except requests.exceptions.RequestException as e:
             print(f"Error fetching compliance data for licence {licence_profile_id} from {url}: {e}")
             return None
@@ -490,8 +747,11 @@ class EPAScraper:
         # Return the unique records as a list
         return list(unique_records.values())
 
-    def fetch_document_metadata(self, record_id: str, record_type: str) -> List[Dict[str, Any]]:
-        """Fetch metadata for a specific record type."""
+    def fetch_document_metadata(self, record_id: str, record_type: str, paced: bool = True) -> List[Dict[str, Any]]:
+        """Fetch metadata for a specific record type.
+
+        Pass paced=False when the caller already took a rate-limiter token for this
+        request (e.g. the async Phase 3 engine); retries still take their own."""
         documents = []
         
         # If we don't know how to handle this record type, return empty list
@@ -505,10 +765,8 @@ class EPAScraper:
         # Fetch document metadata from the API
         url = f"{self.base_url}/{endpoint}?{param}={record_id}"
         try:
-            # Disable SSL verification to handle certificate issues
-            response = requests.get(url, timeout=15, verify=False)
-            response.raise_for_status()
-            data = response.json()
+            response = self.client.get(url, paced=paced)
+            data = json_codec.response_json(response)
             
             # Create document metadata record
             doc = {
@@ -519,11 +777,12 @@ class EPAScraper:
                 'description': data.get('description', ''),
                 'submission_date': data.get('date', ''),
                 'status': data.get('status', ''),
-                'metadata': json.dumps(data)  # Store full response as JSON
+                'metadata': json_codec.dumps(data)  # Store full response as JSON
             }
             documents.append(doc)
                 
-            time.sleep(0.1)  # Be nice to the API
+            if paced:
+                self._be_nice_to_api()
                 
         except requests.exceptions.Timeout:
             print(f"Timeout error fetching {record_type} metadata for compliance ID {record_id} from {url}")
@@ -595,20 +854,33 @@ class EPAScraper:
             print(f"Profile data: {profile}")
             return False
 
+    def _compliance_record_row(self, licence_profile_id: str, record: Dict[str, Any], now: str) -> Tuple:
+        """Column values for a compliance_records row, in COMPLIANCE_RECORD_COLUMNS order."""
+        record_type = record.get('type')
+        if record_type not in self.type_to_endpoint:
+            print(f"\nWARNING: Unknown record type encountered: {record_type} for {record.get('compliancerecord_id')}")
+            # Basic info is still stored for unknown types
+        return (
+            record.get('compliancerecord_id'),
+            licence_profile_id,
+            record_type,
+            record.get('title'),
+            record.get('status'),
+            record.get('date'),
+            now, # last_updated
+            now, # last_checked
+            self.blob_codec.encode(json_codec.dumps(record)) # Store full record as (compressed) JSON
+        )
+
     def store_compliance_record(self, licence_profile_id: str, record: Dict[str, Any]) -> bool:
         """Store a compliance record in the database.
-        Returns True if a new record was created, False if it already existed."""
+        Returns True if a new record was created, False if it already existed.
+
+        Phase 2 batches its writes through _checkpoint_phase2 instead."""
         compliance_id = record.get('compliancerecord_id')
         if not compliance_id:
             return False
             
-        record_type = record.get('type')
-        if record_type not in self.type_to_endpoint:
-            print(f"\nWARNING: Unknown record type encountered: {record_type} for {compliance_id}")
-            # Decide whether to skip or attempt to store anyway
-            # return False # Option: Skip unknown types
-            pass # Option: Attempt to store basic info anyway
-            
         now = datetime.now(timezone.utc).isoformat() # Use timezone aware now
         
         # Check if record exists
@@ -619,26 +891,8 @@ class EPAScraper:
         result = self.cursor.fetchone()
         
         if not result:
-            # New record: Prepare data tuple for fixed schema
-            data_tuple = (
-                compliance_id,
-                licence_profile_id,
-                record.get('type'),
-                record.get('title'),
-                record.get('status'),
-                record.get('date'),
-                now, # last_updated
-                now, # last_checked
-                json.dumps(record) # Store full record as JSON
-            )
-            
             try:
-                self.cursor.execute("""
-                    INSERT INTO compliance_records (
-                        compliancerecord_id, licenceprofileid, type, title, 
-                        status, date, last_updated, last_checked, metadata_json
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, data_tuple)
+                self._write([('record_upsert', [self._compliance_record_row(licence_profile_id, record, now)])])
                 # Log the new record
                 self._log_to_csv("compliance_record", record)
                 return True
@@ -649,93 +903,146 @@ class EPAScraper:
         else:
             # Existing record: Update last_checked
             # Optionally, could update metadata_json if content comparison shows change
-            self.cursor.execute(
-                "UPDATE compliance_records SET last_checked = ? WHERE compliancerecord_id = ?",
-                (now, compliance_id)
-            )
+            self._write([('record_touch', [(now, compliance_id)])])
             return False
 
     def process_licence_profiles(self):
-        """Phase 1: Process all licence profiles."""
+        """Phase 1: Sync licence profiles from the API with a set-based diff.
+
+        The streamed list is staged in a temp table, then one INSERT adds new profiles
+        and one UPDATE rewrites the attributes of profiles whose API values changed.
+        Returns the number of new plus changed profiles.
+        """
         print("\nPhase 1: Processing licence profiles...")
-        profiles = self.fetch_licence_profiles()
-        new_profiles = 0
         now = datetime.now(timezone.utc).isoformat()
-        batch_size = 100
-        current_batch = []
+        columns = ', '.join(PROFILE_SYNC_COLUMNS)
+        staged = 0
 
-        for profile in tqdm(profiles, desc="Fetching licence profiles"):
-            try:
-                profile_id = profile.get('licenceprofileid')
-                if not profile_id:
-                    continue
+        with transaction(self.conn) as cursor:
+            cursor.execute("DROP TABLE IF EXISTS temp.licence_profiles_staging")
+            cursor.execute(f"CREATE TEMP TABLE licence_profiles_staging (licenceprofileid TEXT PRIMARY KEY, {columns})")
+
+        # Profiles are staged in batches while the list is still downloading; a profile
+        # listed twice keeps its last occurrence
+        insert_staged = (f"INSERT OR REPLACE INTO licence_profiles_staging (licenceprofileid, {columns}) "
+                         f"VALUES ({', '.join('?' * (len(PROFILE_SYNC_COLUMNS) + 1))})")
+        batch = []
+        for profile in tqdm(self.iter_licence_profiles(), desc="Fetching licence profiles"):
+            self.metrics.add_items(1)
+            profile_id = profile.get('licenceprofileid') if isinstance(profile, dict) else None
+            if not profile_id:
+                continue
+            batch.append((profile_id,) + tuple(profile.get(col) for col in PROFILE_SYNC_COLUMNS))
+            if len(batch) >= PROFILE_STAGING_BATCH_SIZE:
+                with transaction(self.conn) as cursor:
+                    cursor.executemany(insert_staged, batch)
+                staged += len(batch)
+                batch = []
+        if batch:
+            with transaction(self.conn) as cursor:
+                cursor.executemany(insert_staged, batch)
+            staged += len(batch)
 
-                # Check if profile exists and needs update
-                self.cursor.execute(
-                    "SELECT last_updated FROM licence_profiles WHERE licenceprofileid = ?",
-                    (profile_id,)
+        changed_predicate = ' OR '.join(f"s.{col} IS NOT licence_profiles.{col}" for col in PROFILE_SYNC_COLUMNS)
+        with transaction(self.conn) as cursor:
+            # Existing profiles keep last_checked (Phase 2's incremental watermark) and
+            # last_updated (bumped only by new records/documents, which drives scheduling)
+            cursor.execute(f"""
+                UPDATE licence_profiles
+                SET ({columns}) = (
+                    SELECT {columns} FROM licence_profiles_staging s
+                    WHERE s.licenceprofileid = licence_profiles.licenceprofileid
                 )
-                result = self.cursor.fetchone()
-                
-                if not result:
-                    # New profile
-                    profile['last_checked'] = now
-                    profile['last_updated'] = now
-                    current_batch.append(profile)
-                    new_profiles += 1
-                else:
-                    # Update last_checked in current transaction
-                    current_batch.append({
-                        'licenceprofileid': profile_id,
-                        'last_checked': now,
-                        'update_only': True
-                    })
-
-                # Process batch with transaction protection
-                if len(current_batch) >= batch_size:
-                    with transaction(self.conn) as cursor:
-                        for item in current_batch:
-                            if item.get('update_only'):
-                                cursor.execute(
-                                    "UPDATE licence_profiles SET last_checked = ? WHERE licenceprofileid = ?",
-                                    (item['last_checked'], item['licenceprofileid'])
-                                )
-                            else:
-                                placeholders = ', '.join(['?' for _ in item])
-                                columns = ', '.join(item.keys())
-                                cursor.execute(
-                                    f"INSERT INTO licence_profiles ({columns}) VALUES ({placeholders})",
-                                    list(item.values())
-                                )
-                    current_batch = []
+                WHERE EXISTS (
+                    SELECT 1 FROM licence_profiles_staging s
+                    WHERE s.licenceprofileid = licence_profiles.licenceprofileid AND ({changed_predicate})
+                )
+            """)
+            changed_profiles = max(cursor.rowcount, 0)
+            cursor.execute(f"""
+                INSERT INTO licence_profiles (licenceprofileid, {columns}, last_checked, last_updated)
+                SELECT s.licenceprofileid, {', '.join('s.' + col for col in PROFILE_SYNC_COLUMNS)}, ?, ?
+                FROM licence_profiles_staging s
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM licence_profiles lp WHERE lp.licenceprofileid = s.licenceprofileid
+                )
+            """, (now, now))
+            new_profiles = max(cursor.rowcount, 0)
+            cursor.execute("DROP TABLE temp.licence_profiles_staging")
 
-            except Exception as e:
-                print(f"Error processing profile {profile.get('profilenumber', '')}: {str(e)}")
-                continue
+        print(f"Licence profiles: {staged} from API, {new_profiles} new, {changed_profiles} with changed details.")
+        return new_profiles + changed_profiles
 
-        # Process any remaining items
-        if current_batch:
-            with transaction(self.conn) as cursor:
-                for item in current_batch:
-                    if item.get('update_only'):
-                        cursor.execute(
-                            "UPDATE licence_profiles SET last_checked = ? WHERE licenceprofileid = ?",
-                            (item['last_checked'], item['licenceprofileid'])
-                        )
-                    else:
-                        placeholders = ', '.join(['?' for _ in item])
-                        columns = ', '.join(item.keys())
-                        cursor.execute(
-                            f"INSERT INTO licence_profiles ({columns}) VALUES ({placeholders})",
-                            list(item.values())
-                        )
-
-        return new_profiles
-
-    def fetch_compliance_records_for_profile(self, profile_id: str) -> Optional[List[Dict[str, Any]]]:
-        """Fetch compliance records for a specific licence profile."""
+    def fetch_compliance_records_for_profile(self, profile_id: str, from_date: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+        """Fetch compliance records for a specific licence profile, optionally only those dated from_date onwards."""
         # This simply wraps the existing fetch_compliance_data for clarity
-        return self.fetch_compliance_data(profile_id)
+        return self.fetch_compliance_data(profile_id, from_date=from_date)
+
+    def _incremental_from_date(self, last_checked_str: Optional[str], last_full_sweep_str: Optional[str],
+                               now: datetime) -> Optional[str]:
+        """Return the date_from watermark for an incremental fetch, or None when a full sweep is due.
+
+        The watermark is the profile's last Phase 2 check minus a safety overlap. Every
+        profile still gets a full-history sweep at least every full_sweep_days, which
+        catches records the EPA back-dates to before the watermark.
+        """
+        if not self.incremental:
+            return None
+        last_full_sweep = parse_api_date(last_full_sweep_str)
+        if not last_full_sweep or now - last_full_sweep >= timedelta(days=self.full_sweep_days):
+            return None
+        last_checked = parse_api_date(last_checked_str)
+        if not last_checked:
+            return None
+        return (last_checked - timedelta(days=self.overlap_days)).date().isoformat()
+
+    def _iter_profile_compliance_records(self, profiles_to_check: List[Tuple[str, Optional[str], Optional[str]]]) -> Iterator[Tuple[str, Optional[str], Optional[List[Dict[str, Any]]], Optional[Exception]]]:
+        """Yield (profile_id, last_checked, records, error) for each (profile_id, last_checked, from_date), in input order.
+
+        With more than one worker the fetches run on a bounded thread pool, but results
+        are still handed back in the same order as the serial loop. All set bookkeeping
+        and database writes therefore stay on the calling thread and match a serial run.
+        """
+        progress = tqdm(total=len(profiles_to_check), desc="Fetching compliance records")
+        try:
+            if self.workers <= 1:
+                for profile_id, last_checked, from_date in profiles_to_check:
+                    try:
+                        records, error = self.fetch_compliance_records_for_profile(profile_id, from_date), None
+                    except Exception as e:
+                        records, error = None, e
+                    progress.update(1)
+                    yield profile_id, last_checked, records, error
+                return
+
+            # Keep a small window of fetches in flight ahead of the consumer
+            max_in_flight = self.workers * 2
+            pending = deque()
+            profiles_iter = iter(profiles_to_check)
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="phase2") as executor:
+                try:
+                    for profile_id, last_checked, from_date in profiles_iter:
+                        pending.append((profile_id, last_checked, executor.submit(self.fetch_compliance_records_for_profile, profile_id, from_date)))
+                        if len(pending) >= max_in_flight:
+                            break
+                    while pending:
+                        profile_id, last_checked, future = pending.popleft()
+                        try:
+                            records, error = future.result(), None
+                        except Exception as e:
+                            records, error = None, e
+                        next_profile = next(profiles_iter, None)
+                        if next_profile is not None:
+                            next_id, next_last_checked, next_from_date = next_profile
+                            pending.append((next_id, next_last_checked, executor.submit(self.fetch_compliance_records_for_profile, next_id, next_from_date)))
+                        progress.update(1)
+                        yield profile_id, last_checked, records, error
+                finally:
+                    # Stop queued fetches promptly on interrupt or early exit
+                    for _, _, future in pending:
+                        future.cancel()
+        finally:
+            progress.close()
 
     def process_compliance_records(self) -> Set[str]:
         """Fetch compliance records for each profile, store new/recent ones, 
@@ -743,15 +1050,48 @@ class EPAScraper:
         print("\nPhase 2: Processing compliance records...")
         
         profiles_to_check = []
+        full_sweep_profiles = set()
+        phase_start = datetime.now(timezone.utc)
         with transaction(self.conn) as local_cursor_init:
-            local_cursor_init.execute("SELECT licenceprofileid, last_checked FROM licence_profiles")
-            profiles_to_check = local_cursor_init.fetchall()
+            local_cursor_init.execute("SELECT licenceprofileid, last_checked, last_full_sweep, last_updated FROM licence_profiles")
+            profile_rows = local_cursor_init.fetchall()
+
+        if self.schedule:
+            scheduler = ProfileScheduler(self.conn, max_staleness_days=self.max_staleness_days)
+            to_poll, reasons = scheduler.select(((row[0], row[1], row[3]) for row in profile_rows), phase_start)
+            print(f"Scheduler: polling {len(to_poll)} of {len(profile_rows)} profiles "
+                  f"({reasons['hot']} hot, {reasons['cold_slice']} cold in today's slice, "
+                  f"{reasons['stale']} past {self.max_staleness_days}-day staleness, "
+                  f"{reasons['never_checked']} never checked); skipping {reasons['skipped']}.")
+            profile_rows = [row for row in profile_rows if row[0] in to_poll]
+
+        # Resumed run: skip profiles this run already finished and keep their pending document checks
+        done_profiles, pending_doc_ids = self._load_run_progress()
+        if done_profiles:
+            print(f"Resuming Phase 2: {len(done_profiles)} profiles already done, "
+                  f"{len(pending_doc_ids)} compliance records pending document checks.")
+            profile_rows = [row for row in profile_rows if row[0] not in done_profiles]
+
+        for profile_id, last_checked, last_full_sweep, _ in profile_rows:
+            from_date = self._incremental_from_date(last_checked, last_full_sweep, phase_start)
+            if from_date is None:
+                full_sweep_profiles.add(profile_id)
+            profiles_to_check.append((profile_id, last_checked, from_date))
+
+        if self.incremental:
+            print(f"Incremental mode: {len(profiles_to_check) - len(full_sweep_profiles)} profiles from their watermark "
+                  f"(-{self.overlap_days} days overlap), {len(full_sweep_profiles)} full-history sweeps.")
 
         all_record_ids_seen_in_api = set()
-        compliance_ids_needing_doc_check = set()
+        compliance_ids_needing_doc_check = set(pending_doc_ids)
         profiles_with_new_records = set()
         existing_records_to_update_checked = set()
         profiles_successfully_processed_in_phase2 = set()
+        # Progress since the last checkpoint: (profile_id, was_full_sweep, had_new_records) and new doc-check IDs
+        checkpoint_profiles = []
+        checkpoint_doc_ids = set()
+        # compliance_records rows (new records, and known ones due a document check) awaiting the next checkpoint
+        checkpoint_records = []
 
         existing_record_ids_in_db = set()
         with transaction(self.conn) as local_cursor_init:
@@ -759,14 +1099,20 @@ class EPAScraper:
             for row in local_cursor_init.fetchall():
                 existing_record_ids_in_db.add(row[0])
 
-        for profile_id, profile_last_checked_str in tqdm(profiles_to_check, desc="Fetching compliance records"):
+        if self.workers > 1:
+            limit_desc = f"{self.rate_limiter.rate:g} requests/s" if self.rate_limiter else "no rate limit"
+            print(f"Fetching with {self.workers} workers ({limit_desc}).")
+
+        for profile_id, profile_last_checked_str, records_from_api, fetch_error in self._iter_profile_compliance_records(profiles_to_check):
+            self.metrics.add_items(1)
             profile_last_checked_dt = parse_api_date(profile_last_checked_str)
             if not profile_last_checked_dt:
                 profile_last_checked_dt = datetime.fromtimestamp(0, timezone.utc)
 
             try:
-                records_from_api = self.fetch_compliance_records_for_profile(profile_id)
-                
+                if fetch_error is not None:
+                    raise fetch_error
+
                 if records_from_api is None:
                     print(f"\nSkipping profile {profile_id} due to fetch error for its records.")
                     # Do not add to profiles_successfully_processed_in_phase2 as we couldn't check its records
@@ -775,6 +1121,8 @@ class EPAScraper:
                 # If records_from_api is an empty list, it's valid (no records for this profile).
                 # The profile was still successfully checked.
 
+                now_iso = datetime.now(timezone.utc).isoformat()
+                record_rows = []
                 for record in records_from_api: # Loop handles empty list correctly
                     record_id = record.get('compliancerecord_id')
                     if not record_id:
@@ -792,16 +1140,30 @@ class EPAScraper:
                          process_this_record_for_docs = True
                          
                     if process_this_record_for_docs:
-                        was_newly_inserted = self.store_compliance_record(profile_id, record)
-                        if was_newly_inserted:
+                        # Written by the next checkpoint's upsert; the ID set says whether it is new
+                        record_rows.append(self._compliance_record_row(profile_id, record, now_iso))
+                        if not is_currently_in_db:
+                            self._log_to_csv("compliance_record", record)
                             profiles_with_new_records.add(profile_id)
                             existing_record_ids_in_db.add(record_id)
                         compliance_ids_needing_doc_check.add(record_id)
+                        checkpoint_doc_ids.add(record_id)
                     elif is_currently_in_db:
                          existing_records_to_update_checked.add(record_id)
                 
                 # If we reached here, the profile's records (even if none) were processed without API error for this profile
+                checkpoint_records.extend(record_rows)
                 profiles_successfully_processed_in_phase2.add(profile_id)
+                checkpoint_profiles.append((profile_id, profile_id in full_sweep_profiles,
+                                            profile_id in profiles_with_new_records))
+
+                if len(checkpoint_profiles) >= PHASE2_CHECKPOINT_EVERY:
+                    self._checkpoint_phase2(checkpoint_profiles, checkpoint_doc_ids, existing_records_to_update_checked,
+                                            checkpoint_records)
+                    checkpoint_profiles.clear()
+                    checkpoint_doc_ids.clear()
+                    existing_records_to_update_checked.clear()
+                    checkpoint_records.clear()
 
             except Exception as e:
                 # This catches errors within the processing of a specific profile's records, 
@@ -813,44 +1175,21 @@ class EPAScraper:
                 # For now, we'll assume if an exception occurs here, we don't update its last_checked.
                 continue
         
-        # --- Post-Loop Updates --- 
-        now_iso = datetime.now(timezone.utc).isoformat()
-
-        # 1. Update last_checked for licence_profiles that were successfully processed in this phase
-        if profiles_successfully_processed_in_phase2:
-            print(f"\nUpdating last_checked for {len(profiles_successfully_processed_in_phase2)} licence profiles processed in Phase 2...")
-            profile_lc_update_tuples = [(now_iso, pid) for pid in profiles_successfully_processed_in_phase2]
-            try:
-                self.cursor.executemany(
-                    "UPDATE licence_profiles SET last_checked = ? WHERE licenceprofileid = ?",
-                    profile_lc_update_tuples
-                )
-            except sqlite3.Error as e:
-                print(f"\nError batch updating licence_profiles last_checked: {e}")
-
-        # 2. Batch update last_checked for existing compliance records seen but not needing doc checks
-        if existing_records_to_update_checked:
-            print(f"\nUpdating last_checked for {len(existing_records_to_update_checked)} existing compliance records seen...")
-            record_lc_update_tuples = [(now_iso, rec_id) for rec_id in existing_records_to_update_checked]
-            try:
-                self.cursor.executemany(
-                    "UPDATE compliance_records SET last_checked = ? WHERE compliancerecord_id = ?",
-                    record_lc_update_tuples
-                )
-            except sqlite3.Error as e:
-                print(f"\nError batch updating compliance_records last_checked: {e}")
-
-        # 3. Batch update last_updated for profiles that received genuinely new compliance records
-        if profiles_with_new_records:
-            print(f"\nUpdating last_updated for {len(profiles_with_new_records)} licence profiles due to new compliance records...")
-            profile_lu_update_tuples = [(now_iso, pid) for pid in profiles_with_new_records]
-            try:
-                self.cursor.executemany(
-                    "UPDATE licence_profiles SET last_updated = ? WHERE licenceprofileid = ?",
-                    profile_lu_update_tuples
-                )
-            except sqlite3.Error as e:
-                print(f"\nError batch updating licence_profiles last_updated: {e}")
+        # --- Post-Loop Updates ---
+        # Watermarks, record last_checked touches and last_updated bumps for profiles with new
+        # records are written by each checkpoint; this one covers whatever is left.
+        try:
+            self._checkpoint_phase2(checkpoint_profiles, checkpoint_doc_ids, existing_records_to_update_checked,
+                                    checkpoint_records)
+            # Phase 3 reads the records back
+            self._flush_writes()
+        except DroppedWritesError:
+            # Checkpoints were lost, so the run must stay resumable rather than carry on
+            raise
+        except sqlite3.Error as e:
+            print(f"\nError writing final Phase 2 checkpoint: {e}")
+        print(f"\nUpdated last_checked for {len(profiles_successfully_processed_in_phase2)} licence profiles processed in Phase 2 "
+              f"({len(profiles_with_new_records)} with new compliance records).")
 
         # Summary for Phase 2
         print(f"\nPhase 2 Summary: Saw {len(all_record_ids_seen_in_api)} unique compliance records via API.")
@@ -872,12 +1211,16 @@ class EPAScraper:
             print("No compliance records were processed in Phase 2 to check documents for.")
             return 0
             
-        new_documents_count = 0
+        # Inserts written (or queued to the writer thread) and document batches that failed to write
+        queued_new_count = 0
+        failed_batches = 0
         now = datetime.now(timezone.utc).isoformat()
         docs_to_insert = []
         docs_to_update_checked = set()
         compliance_records_with_new_docs = set()
         licence_profiles_with_new_docs = set()
+        # Compliance IDs whose documents have been fetched since the last checkpoint
+        handled_compliance_ids = []
 
         # Step 1: Get all existing document URLs from the database
         print("Fetching existing document URLs...")
@@ -898,177 +1241,161 @@ class EPAScraper:
         compliance_record_details = {row[0]: (row[1], row[2]) for row in self.cursor.fetchall()}
         print(f"Found details for {len(compliance_record_details)} records.")
 
-        # Step 3: Iterate through processed compliance records and fetch/process their documents
-        for compliance_id in tqdm(processed_compliance_record_ids, desc="Fetching & Processing Documents"):
+        # Step 3: Fetch documents for each processed compliance record and classify them as new/existing
+        compliance_ids_to_fetch = []
+        for compliance_id in processed_compliance_record_ids:
             if compliance_id not in compliance_record_details:
                 print(f"Warning: Compliance ID {compliance_id} processed in Phase 2 but not found in DB for Phase 3? Skipping.")
                 continue
-                
+            compliance_ids_to_fetch.append(compliance_id)
+
+        def handle_documents(compliance_id: str, documents_from_api: List[Dict[str, Any]]):
             record_type, licence_profile_id = compliance_record_details[compliance_id]
-            
-            try:
-                documents_from_api = self.fetch_document_metadata(compliance_id, record_type)
-                
-                for doc in documents_from_api:
-                    doc_url = doc.get('document_url')
-                    if not doc_url:
-                        continue # Skip documents without a URL
-                        
-                    if doc_url not in existing_doc_urls:
-                        # NEW document
-                        doc_data_for_db = {}
-
-                        # --- Populate fields for DB columns --- 
-                        doc_data_for_db['document_date'] = find_newest_date_in_api_response(doc) # Use find_newest_date_in_api_response to get the most relevant date from the doc payload
-                        doc_data_for_db['document_url'] = doc_url
-                        doc_data_for_db['compliance_id'] = compliance_id
-                        doc_data_for_db['document_id'] = doc.get('document_id') # From original API doc
-                        doc_data_for_db['document_type'] = doc.get('document_type', record_type) # Use from doc if available, else fallback to parent record_type
-                        doc_data_for_db['title'] = doc.get('title')  # From original API doc
-
-                    # Build leap_url using licence profilenumber and document details
-                    profilenumber = None
-                    if licence_profile_id:
-                        try:
-                            self.cursor.execute("SELECT profilenumber FROM licence_profiles WHERE licenceprofileid = ?", (licence_profile_id,))
-                            row_lp = self.cursor.fetchone()
-                            profilenumber = row_lp[0] if row_lp else None
-                        except sqlite3.Error:
-                            profilenumber = None
-                    seg = TYPE_SEGMENT_MAP.get(doc_data_for_db['document_type'], 'return')
-                    # Extract GUID from document_url
-                    parsed = urlparse(doc_url.rstrip('/'))
-                    if parsed.query:
-                        qs = parse_qs(parsed.query)
-                        guid = next(iter(qs.values()), [''])[0]
-                    else:
-                        guid = parsed.path.rstrip('/').split('/')[-1] if parsed.path else ''
-
-                    if guid and profilenumber:
-                        doc_data_for_db['leap_url'] = f"https://leap.epa.ie/licence-profile/{profilenumber}/compliance/{seg}/{guid}"
-                    else:
-                        doc_data_for_db['leap_url'] = None
-
-                    # --- Finalise and queue insert ---
-                    doc_data_for_db['last_checked'] = now
-                    doc_data_for_db['last_updated'] = now  # Set initial last_updated for new doc
-
-                    # Store the *entire original* API 'doc' object as JSON in metadata_json
-                    doc_data_for_db['metadata_json'] = json.dumps(doc)
-
-                    # Log the structured document data intended for DB
-                    self._log_to_csv("compliance_document", doc_data_for_db)
-
-                    docs_to_insert.append(doc_data_for_db)  # Add the structured data to insert list
-
-                    # Mark relevant parent records for update
-                    compliance_records_with_new_docs.add(compliance_id)
-                    if licence_profile_id:  # Ensure licence_profile_id is available
-                        licence_profiles_with_new_docs.add(licence_profile_id)
-
-                    # Add to existing_urls immediately to prevent duplicates within this batch run
-                    existing_doc_urls.add(doc_url)
-                    if doc_url in existing_doc_urls:
-                        # EXISTING document - mark for last_checked update
-                        docs_to_update_checked.add(doc_url)
-
-            except requests.exceptions.RequestException as e:
-                print(f"\nError fetching document metadata for {compliance_id}: {e}")
-            except Exception as outer_e:
-                print(f"\nUnexpected error processing documents for {compliance_id}: {outer_e}")
-
-        # Step 4: Batch insert new documents
-        if docs_to_insert:
-            print(f"\nInserting {len(docs_to_insert)} new documents...")
-            
-            # Dynamically get columns from the first dict (assuming all dicts have same keys)
-            if docs_to_insert:
-                ordered_columns = [
-                    'document_date', 'document_url', 'compliance_id', 'document_id',
-                    'document_type', 'title', 'leap_url',
-                    'last_updated', 'last_checked', 'metadata_json'
-                ]
-                column_names = ', '.join(ordered_columns)
-                placeholders = ', '.join(['?' for _ in ordered_columns])
-                insert_sql = f"INSERT INTO compliance_documents ({column_names}) VALUES ({placeholders})"
-                
-                print(f"DEBUG: Attempting to execute SQL: {insert_sql}") # ADDED FOR DEBUGGING
+            endpoint = self.type_to_endpoint.get(record_type, {}).get('endpoint')
+            handled_compliance_ids.append(compliance_id)
+            self.metrics.add_items(1)
+            for doc in documents_from_api:
+                doc_url = doc.get('document_url')
+                if not doc_url:
+                    continue # Skip documents without a URL
+
+                if doc_url in existing_doc_urls:
+                    # EXISTING document - mark for last_checked update
+                    docs_to_update_checked.add(doc_url)
+                    continue
 
-                try:
-                    insert_tuples = []
-                    for d_db_data in docs_to_insert: # d_db_data is one of the doc_data_for_db dicts
-                        insert_tuples.append(tuple(d_db_data.get(k) for k in ordered_columns))
-
-                    # SQL statement for batch insert with conflict handling
-                    # Ensure column names here exactly match the `ordered_columns` order and table schema
-                    sql = f"""
-                        INSERT INTO compliance_documents (
-                            document_date, document_url, compliance_id, document_id,
-                            document_type, title, leap_url, last_updated, last_checked, metadata_json
-                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                        ON CONFLICT(document_url) DO UPDATE SET
-                            last_checked = excluded.last_checked,
-                            leap_url = excluded.leap_url,
-                            title = excluded.title, 
-                            document_date = excluded.document_date, 
-                            document_type = excluded.document_type,
-                            metadata_json = excluded.metadata_json,
-                            last_updated = CASE
-                                WHEN IFNULL(compliance_documents.title, '') != IFNULL(excluded.title, '') OR
-                                     IFNULL(compliance_documents.document_date, '') != IFNULL(excluded.document_date, '') OR
-                                     IFNULL(compliance_documents.document_type, '') != IFNULL(excluded.document_type, '') OR
-                                     IFNULL(compliance_documents.metadata_json, '') != IFNULL(excluded.metadata_json, '')
-                                THEN excluded.last_updated
-                                ELSE compliance_documents.last_updated
-                            END;
-                    """
-                    print(f"DEBUG: Attempting to execute SQL with ON CONFLICT: {sql}") # CORRECTED DEBUG
-                    with transaction(self.conn) as cursor:
-                        cursor.executemany(sql, insert_tuples)
-                    # new_documents_count is incremented based on how many were ACTUALLY new vs updated due to conflict
-                    # For simplicity, we can count based on SELECT changes() after executemany, or estimate based on len(insert_tuples)
-                    # The current logic for new_documents_count relies on earlier checks and might need refinement
-                    # if precise count of *newly inserted* vs *updated on conflict* is critical here.
-                    # For now, let's assume most in docs_to_insert are new if they passed the initial URL check.
-                    new_documents_count += len(insert_tuples) # This counts all attempted inserts/updates via this path
-                except sqlite3.Error as e:
-                    print(f"\nError during batch insert of documents: {e}")
-                    # Log problematic tuples or data for debugging
-                    if insert_tuples:
-                        print(f"Sample data for failed batch: {insert_tuples[0]}")
-
-            # Step 5: Batch update last_checked for existing documents
-            # Remove duplicates before updating
-            unique_docs_to_update = list(set(docs_to_update_checked))
-            if unique_docs_to_update:
-                print(f"\nUpdating last_checked for {len(unique_docs_to_update)} existing documents...")
-                update_sql = "UPDATE compliance_documents SET last_checked = ? WHERE document_url = ?"
-                update_data = [(now, url) for url in unique_docs_to_update]
-                with transaction(self.conn) as cursor:
-                    try:
-                        cursor.executemany(update_sql, update_data)
-                    except sqlite3.Error as e:
-                        print(f"\nError during batch update of last_checked: {e}")
+                # NEW document
+                doc_data_for_db = {}
 
-        # Step 6: Update last_updated on parent records if new documents were added
-        if new_documents_count > 0:
-            # Update parent compliance records
+                # --- Populate fields for DB columns --- 
+                fields = extract_payload_fields(endpoint, doc)
+                typed_date = parse_date_string(fields.date)
+                if typed_date is not None:
+                    doc_data_for_db['document_date'] = typed_date.isoformat()
+                else:
+                    # Unknown payload shape: scan every date-like field, and count it so the change gets noticed
+                    doc_data_for_db['document_date'] = find_newest_date_in_api_response(doc)
+                    self.date_scan_fallbacks[endpoint] += 1
+                    self.metrics.count('document_date_fallback')
+                doc_data_for_db['document_url'] = doc_url
+                doc_data_for_db['compliance_id'] = compliance_id
+                doc_data_for_db['document_id'] = doc.get('document_id') # From original API doc
+                doc_data_for_db['document_type'] = doc.get('document_type', record_type) # Use from doc if available, else fallback to parent record_type
+                doc_data_for_db['title'] = fields.title  # From original API doc
+
+                # Build leap_url using licence profilenumber and document details
+                doc_data_for_db['leap_url'] = compute_leap_url(
+                    self.profile_cache.profilenumber(licence_profile_id), doc_data_for_db['document_type'], doc_url)
+
+                # --- Finalise and queue insert ---
+                doc_data_for_db['last_checked'] = now
+                doc_data_for_db['last_updated'] = now  # Set initial last_updated for new doc
+
+                # Store the *entire original* API 'doc' object as JSON in metadata_json
+                doc_data_for_db['metadata_json'] = self.blob_codec.encode(json_codec.dumps(doc))
+
+                # Fields readers need from the payload, so they never have to decode metadata_json
+                doc_data_for_db.update(document_fields(fields)._asdict())
+                doc_data_for_db['fields_version'] = DOCUMENT_FIELDS_VERSION
+
+                # Log the structured document data intended for DB
+                self._log_to_csv("compliance_document", doc_data_for_db)
+
+                docs_to_insert.append(doc_data_for_db)  # Add the structured data to insert list
+
+                # Mark relevant parent records for update
+                compliance_records_with_new_docs.add(compliance_id)
+                if licence_profile_id:  # Ensure licence_profile_id is available
+                    licence_profiles_with_new_docs.add(licence_profile_id)
+
+                # Add to existing_urls immediately to prevent duplicates within this batch run
+                existing_doc_urls.add(doc_url)
+
+            if len(handled_compliance_ids) >= PHASE3_CHECKPOINT_EVERY:
+                flush_documents()
+
+        def flush_documents():
+            """Write queued documents and parent updates, then checkpoint the compliance IDs handled so far."""
+            nonlocal queued_new_count, failed_batches
+
+            # Steps 4-6: new documents, last_checked for existing ones and last_updated on the
+            # parents of new documents, written as one unit together with the checkpoint
+            insert_tuples = [tuple(d_db_data.get(k) for k in COMPLIANCE_DOCUMENT_COLUMNS) for d_db_data in docs_to_insert]
+            if insert_tuples:
+                print(f"\nInserting {len(insert_tuples)} new documents...")
+            if docs_to_update_checked:
+                print(f"\nUpdating last_checked for {len(docs_to_update_checked)} existing documents...")
             if compliance_records_with_new_docs:
-                print(f"\nUpdating last_updated for {len(compliance_records_with_new_docs)} compliance records due to new documents...")
-                comp_placeholders = ','.join('?' for _ in compliance_records_with_new_docs)
-                comp_update_sql = f"UPDATE compliance_records SET last_updated = ? WHERE compliancerecord_id IN ({comp_placeholders})"
-                comp_update_params = [now] + list(compliance_records_with_new_docs)
-                with transaction(self.conn) as cursor:
-                    cursor.execute(comp_update_sql, comp_update_params)
-            
-            # Update parent licence profiles
-            if licence_profiles_with_new_docs:
-                print(f"\nUpdating last_updated for {len(licence_profiles_with_new_docs)} licence profiles due to new documents...")
-                prof_placeholders = ','.join('?' for _ in licence_profiles_with_new_docs)
-                prof_update_sql = f"UPDATE licence_profiles SET last_updated = ? WHERE licenceprofileid IN ({prof_placeholders})"
-                prof_update_params = [now] + list(licence_profiles_with_new_docs)
-                with transaction(self.conn) as cursor:
-                    cursor.execute(prof_update_sql, prof_update_params)
+                print(f"\nUpdating last_updated for {len(compliance_records_with_new_docs)} compliance records "
+                      f"and {len(licence_profiles_with_new_docs)} licence profiles due to new documents...")
+            ops = [
+                ('document_upsert', insert_tuples),
+                ('document_touch', [(now, url) for url in docs_to_update_checked]),
+                ('record_bump', [(now, cid) for cid in compliance_records_with_new_docs]),
+                ('profile_bump', [(now, pid) for pid in licence_profiles_with_new_docs]),
+            ]
+            try:
+                self._checkpoint_phase3(handled_compliance_ids, ops)
+                # Counts every queued insert, including any that turned into updates on conflict
+                queued_new_count += len(insert_tuples)
+            except sqlite3.Error as e:
+                failed_batches += 1
+                print(f"\nError writing documents: {e}")
+                if insert_tuples:
+                    print(f"Sample data for failed batch: {insert_tuples[0]}")
+
+            docs_to_insert.clear()
+            docs_to_update_checked.clear()
+            compliance_records_with_new_docs.clear()
+            licence_profiles_with_new_docs.clear()
+            handled_compliance_ids.clear()
+
+        if self.document_concurrency > 1:
+            # Overlap many lookups at once; results stream back into handle_documents on this thread
+            limit_desc = f"{self.rate_limiter.rate:g} requests/s" if self.rate_limiter else "no rate limit"
+            print(f"Fetching documents with {self.document_concurrency} requests in flight ({limit_desc}).")
+            progress = tqdm(total=len(compliance_ids_to_fetch), desc="Fetching & Processing Documents")
+
+            def on_result(compliance_id, documents_from_api, error):
+                progress.update(1)
+                if error is not None:
+                    print(f"\nError fetching document metadata for {compliance_id}: {error}")
+                    return
+                try:
+                    handle_documents(compliance_id, documents_from_api)
+                except Exception as outer_e:
+                    print(f"\nUnexpected error processing documents for {compliance_id}: {outer_e}")
+
+            engine = AsyncFetchEngine(self.document_concurrency, self.rate_limiter)
+            jobs = (
+                (compliance_id, partial(self.fetch_document_metadata, compliance_id,
+                                        compliance_record_details[compliance_id][0], paced=False))
+                for compliance_id in compliance_ids_to_fetch
+            )
+            try:
+                engine.run(jobs, on_result)
+            finally:
+                progress.close()
+        else:
+            for compliance_id in tqdm(compliance_ids_to_fetch, desc="Fetching & Processing Documents"):
+                record_type, _ = compliance_record_details[compliance_id]
+                try:
+                    documents_from_api = self.fetch_document_metadata(compliance_id, record_type)
+                    handle_documents(compliance_id, documents_from_api)
+                except requests.exceptions.RequestException as e:
+                    print(f"\nError fetching document metadata for {compliance_id}: {e}")
+                except Exception as outer_e:
+                    print(f"\nUnexpected error processing documents for {compliance_id}: {outer_e}")
+
+        # Final flush of anything queued since the last checkpoint. A batch that was rolled back
+        # (here or on the writer thread) still has its compliance IDs pending, so fail the phase
+        # and leave the run for --resume instead of marking it complete.
+        flush_documents()
+        self._flush_writes()
+        if failed_batches:
+            raise DroppedWritesError(f"{failed_batches} document batch(es) could not be written; rerun with --resume")
+        # Only now are the queued inserts known to be committed
+        new_documents_count = queued_new_count
 
         print(f"\nPhase 3 completed. Added {new_documents_count} new documents.")
         return new_documents_count
@@ -1085,20 +1412,17 @@ class EPAScraper:
             self.logger.warning("_get_truly_recent_document_details called before run_start_time_utc was set.")
             return 0, []
 
-        start_time_str = self.run_start_time_utc.strftime('%Y-%m-%d %H:%M:%S')
-        
         # Only include documents that were actually added in this run (last_updated = last_checked)
         # and have a document_date within the specified recency window
         query = """
             SELECT document_url 
             FROM compliance_documents
-            WHERE last_updated = last_checked  -- Only documents added in this run
-            AND last_updated >= ?              -- That were added since the run started
-            AND document_date IS NOT NULL
-            AND date(document_date) >= date('now', '-' || CAST(? AS TEXT) || ' months')
+            WHERE last_updated_ts >= ?         -- Added since the run started (indexed range)
+            AND last_updated = last_checked    -- Only documents added in this run
+            AND document_date_ts >= CAST(strftime('%s', date('now', '-' || CAST(? AS TEXT) || ' months')) AS INTEGER)
         """ 
         try:
-            self.cursor.execute(query, (start_time_str, recency_months))
+            self.cursor.execute(query, (db.epoch_seconds(self.run_start_time_utc), recency_months))
             result_urls = [row[0] for row in self.cursor.fetchall()] 
             self.logger.info(f"Found {len(result_urls)} truly recent documents added in this run with document_date in the last {recency_months} months")
             return len(result_urls), result_urls
@@ -1219,34 +1543,50 @@ class EPAScraper:
             raise
 
 
-    def run(self):
-        """Main execution method to scrape and store all data in phases."""
+    def run(self, resume: bool = False):
+        """Main execution method to scrape and store all data in phases.
+           With resume=True, carries on from the checkpoints of the last interrupted run."""
         self.run_start_time_utc = datetime.now(timezone.utc) # Set run start time
         self.logger.info(f"Starting EPA Ireland data scraper at {self.run_start_time_utc.strftime('%Y-%m-%d %H:%M:%S UTC')}...")
+        start_phase = self._start_run(resume)
         
         # Phase 1: Process licence profiles
-        try:
-            new_profiles_count = self.process_licence_profiles()
-            self.logger.info(f"Phase 1 complete: Processed {new_profiles_count} new/updated licence profiles.")
-        except Exception as e:
-            self.logger.critical(f"CRITICAL ERROR in Phase 1 (Licence Profiles), stopping: {e}", exc_info=True)
-            return None  # Stop execution if phase 1 fails critically
+        new_profiles_count = 0
+        if start_phase <= 1:
+            try:
+                with self.metrics.phase('phase1', self._db_connections()):
+                    new_profiles_count = self.process_licence_profiles()
+                # Pick up profiles Phase 1 added or renamed
+                self.profile_cache.refresh()
+                self.logger.info(f"Phase 1 complete: Processed {new_profiles_count} new/updated licence profiles.")
+            except Exception as e:
+                self.logger.critical(f"CRITICAL ERROR in Phase 1 (Licence Profiles), stopping: {e}", exc_info=True)
+                return None  # Stop execution if phase 1 fails critically
 
         # Phase 2: Process compliance records
-        try:
-            processed_compliance_record_ids = self.process_compliance_records()
-            self.logger.info(f"Phase 2 complete: Processed {len(processed_compliance_record_ids)} compliance records.")
-        except Exception as e:
-            self.logger.critical(f"CRITICAL ERROR in Phase 2 (Compliance Records), stopping: {e}", exc_info=True)
-            return None  # Stop execution if phase 2 fails critically
+        if start_phase <= 2:
+            self._set_run_phase(2)
+            try:
+                with self.metrics.phase('phase2', self._db_connections()):
+                    processed_compliance_record_ids = self.process_compliance_records()
+                self.logger.info(f"Phase 2 complete: Processed {len(processed_compliance_record_ids)} compliance records.")
+            except Exception as e:
+                self.logger.critical(f"CRITICAL ERROR in Phase 2 (Compliance Records), stopping: {e}", exc_info=True)
+                return None  # Stop execution if phase 2 fails critically
+        else:
+            # Phase 2 already finished in the interrupted run; only its undone document checks remain
+            _, processed_compliance_record_ids = self._load_run_progress()
 
         # Phase 3: Process compliance documents
+        self._set_run_phase(3)
         try:
-            new_docs_count = self.process_compliance_documents(processed_compliance_record_ids)
+            with self.metrics.phase('phase3', self._db_connections()):
+                new_docs_count = self.process_compliance_documents(processed_compliance_record_ids)
             self.logger.info(f"Phase 3 complete: Processed {new_docs_count} new/updated documents.")
         except Exception as e:
             self.logger.critical(f"CRITICAL ERROR in Phase 3 (Compliance Documents), stopping: {e}", exc_info=True)
             return None  # Stop execution if phase 3 fails critically
+        self._finish_run()
         
         # Get count and URLs of 'truly recent' documents for summary and CSV
         # Using default 3 months recency. This can be made configurable if needed.
@@ -1285,7 +1625,8 @@ class EPAScraper:
         
         # Generate RSS feeds for truly recent documents
         self.logger.info("\nGenerating RSS feeds...")
-        self._generate_rss_feeds(truly_recent_doc_urls if truly_recent_doc_urls else [])
+        with self.metrics.phase('rss'):
+            self._generate_rss_feeds(truly_recent_doc_urls if truly_recent_doc_urls else [])
         self.logger.info("RSS feed generation complete.")
         
         # Final status
@@ -1294,6 +1635,22 @@ class EPAScraper:
         print(f"End time:   {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')}")
         print(f"New/updated documents: {new_docs_count}")
         print(f"Documents exported to CSV: {truly_recent_doc_count}")
+        client_stats = self.client.stats
+        print(f"API requests: {client_stats['requests']} ({client_stats['retries']} retries, "
+              f"{client_stats['failures']} failed attempts, {client_stats['circuit_rejections']} circuit rejections)")
+        for endpoint, latency in sorted(self.client.latency_summary().items()):
+            print(f"  {endpoint}: {latency['count']} requests, p50 {latency['p50'] * 1000:.0f} ms, "
+                  f"p95 {latency['p95'] * 1000:.0f} ms, max {latency['max'] * 1000:.0f} ms")
+        if self.client.cache is not None:
+            print(f"HTTP cache: {self.client.cache.summary()}")
+        if self.date_scan_fallbacks:
+            print("Document dates found by generic scan (no typed extractor matched): " +
+                  ", ".join(f"{endpoint}: {count}" for endpoint, count in sorted(self.date_scan_fallbacks.items(), key=str)))
+        for name, phase in self.metrics.phases.items():
+            print(f"  {name}: {phase.wall_seconds:.1f}s wall, {phase.network_seconds:.1f}s network, "
+                  f"{phase.db_seconds:.1f}s DB, {phase.items} items "
+                  f"({phase.items / phase.wall_seconds if phase.wall_seconds else 0:.1f}/s)")
+        self.metrics.finish(success=True)
         if csv_file_path:
             print(f"CSV file: {os.path.abspath(csv_file_path)}")
         
@@ -1301,6 +1658,14 @@ class EPAScraper:
         return csv_file_path
 
     def close(self):
+        self.client.close()
+        if self.writer is not None:
+            try:
+                self.writer.close()
+            except sqlite3.Error as e:
+                # The run has already failed on the same error at its last flush
+                self.logger.error(f"DB writer: {e}")
+            self.writer = None
         if self.conn:
             self.conn.close()
             self.logger.info("Database connection closed.")
@@ -1316,10 +1681,65 @@ if __name__ == '__main__':
                             logging.StreamHandler()
                         ])
 
-    scraper = EPAScraper()
+    arg_parser = argparse.ArgumentParser(description='Scrape EPA Ireland LEAP data into the local SQLite database.')
+    arg_parser.add_argument('--workers', type=int, default=1,
+                            help='Concurrent compliance-list fetches in Phase 2 (default: %(default)s, serial)')
+    arg_parser.add_argument('--max-rps', type=float, default=None,
+                            help=f'Global cap on API requests per second across all workers '
+                                 f'(default: {DEFAULT_MAX_REQUESTS_PER_SECOND:g} when any fetching runs concurrently, including the default --page-workers; otherwise a fixed 0.1 s delay)')
+    arg_parser.add_argument('--doc-concurrency', type=int, default=1,
+                            help='Document metadata requests kept in flight in Phase 3 (default: %(default)s, serial)')
+    arg_parser.add_argument('--http-cache', nargs='?', const=DEFAULT_CACHE_PATH, default=None, metavar='PATH',
+                            help=f'Cache API responses on disk and revalidate them with conditional GETs (default path: {DEFAULT_CACHE_PATH})')
+    arg_parser.add_argument('--http-cache-ttl', type=float, default=DEFAULT_TTL_SECONDS / 3600, metavar='HOURS',
+                            help='How long responses without ETag/Last-Modified are reused (default: %(default)g hours)')
+    arg_parser.add_argument('--http-cache-max-mb', type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024), metavar='MB',
+                            help='Size cap for the response cache; least recently used entries are evicted (default: %(default)s MB)')
+    arg_parser.add_argument('--incremental', action='store_true',
+                            help="Only fetch compliance records dated after each profile's last check (minus --overlap-days)")
+    arg_parser.add_argument('--overlap-days', type=int, default=DEFAULT_OVERLAP_DAYS,
+                            help='Safety overlap subtracted from each watermark in incremental mode (default: %(default)s)')
+    arg_parser.add_argument('--full-sweep-days', type=int, default=DEFAULT_FULL_SWEEP_DAYS,
+                            help='Re-read each profile\'s full history at least this often in incremental mode (default: %(default)s)')
+    arg_parser.add_argument('--schedule', action='store_true',
+                            help='Poll busy profiles every run and rotate quiet ones through daily slices')
+    arg_parser.add_argument('--max-staleness-days', type=int, default=DEFAULT_MAX_STALENESS_DAYS,
+                            help='With --schedule, the longest any profile goes unchecked (default: %(default)s)')
+    arg_parser.add_argument('--page-workers', type=int, default=DEFAULT_PAGE_WORKERS,
+                            help='Concurrent page fetches for profiles with multi-page compliance lists (default: %(default)s)')
+    arg_parser.add_argument('--base-url', default=None,
+                            help=f'LEAP API root (default: $LEAP_BASE_URL or {DEFAULT_BASE_URL})')
+    arg_parser.add_argument('--metrics-json', metavar='PATH',
+                            help='Write a per-phase JSON run report (requests, latency, bytes, rows, DB/network time)')
+    arg_parser.add_argument('--metrics-prom', metavar='PATH',
+                            help='Write the same metrics as a Prometheus textfile-collector file (e.g. /var/lib/node_exporter/epa_scraper.prom)')
+    arg_parser.add_argument('--resume', action='store_true',
+                            help='Continue the last interrupted run from its checkpoint instead of starting again at Phase 1')
+    arg_parser.add_argument('--writer-thread', action='store_true',
+                            help='Write Phase 2/3 results from a background thread with group commit, overlapping DB writes with fetching')
+    args = arg_parser.parse_args()
+
+    http_cache = None
+    if args.http_cache:
+        http_cache = ResponseCache(args.http_cache, ttl_seconds=args.http_cache_ttl * 3600,
+                                   max_bytes=args.http_cache_max_mb * 1024 * 1024)
+
+    scraper = EPAScraper(workers=args.workers, max_requests_per_second=args.max_rps,
+                         document_concurrency=args.doc_concurrency, http_cache=http_cache,
+                         incremental=args.incremental, overlap_days=args.overlap_days,
+                         full_sweep_days=args.full_sweep_days, schedule=args.schedule,
+                         max_staleness_days=args.max_staleness_days, page_workers=args.page_workers,
+                         base_url=args.base_url, writer_thread=args.writer_thread)
     try:
-        scraper.run()
+        scraper.run(resume=args.resume)
     except Exception as e:
         logging.critical(f"Unhandled exception in scraper: {e}", exc_info=True)
     finally:
         scraper.close()
+        # Written even for failed runs, which report run_success 0
+        if scraper.metrics.finished_at is None:
+            scraper.metrics.finish(success=False)
+        if args.metrics_json:
+            scraper.metrics.write_json(args.metrics_json)
+        if args.metrics_prom:
+            scraper.metrics.write_prometheus(args.metrics_prom)
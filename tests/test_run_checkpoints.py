@@ -0,0 +1,73 @@
+"""Run checkpoints: work an interrupted run committed must not be lost by the next run."""
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scraper  # noqa: E402
+from leap_simulator import LeapSimulator, SyntheticLeapData  # noqa: E402
+
+
+def scrape(base_url, resume=False):
+    s = scraper.EPAScraper(base_url=base_url)
+    try:
+        s.run(resume=resume)
+    finally:
+        s.close()
+
+
+def document_compliance_ids():
+    conn = sqlite3.connect('epa_ireland.db')
+    try:
+        return {row[0] for row in conn.execute("SELECT compliance_id FROM compliance_documents")}
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def simulator():
+    data = SyntheticLeapData(profiles=6, records_per_profile=5, seed=3)
+    with LeapSimulator(data) as sim:
+        yield sim
+
+
+def test_run_without_resume_takes_over_pending_document_checks(simulator, tmp_path, monkeypatch):
+    (tmp_path / 'clean').mkdir()
+    (tmp_path / 'crashed').mkdir()
+
+    monkeypatch.chdir(tmp_path / 'clean')
+    scrape(simulator.base_url)
+    expected = document_compliance_ids()
+    assert expected
+
+    # Kill Phase 3 part-way through, after Phase 2 has committed every record
+    monkeypatch.chdir(tmp_path / 'crashed')
+    fetch = scraper.EPAScraper.fetch_document_metadata
+    calls = []
+
+    def crash_on_eleventh(self, *args, **kwargs):
+        calls.append(args[0])
+        if len(calls) == 11:
+            raise KeyboardInterrupt
+        return fetch(self, *args, **kwargs)
+
+    monkeypatch.setattr(scraper.EPAScraper, 'fetch_document_metadata', crash_on_eleventh)
+    with pytest.raises(KeyboardInterrupt):
+        scrape(simulator.base_url)
+    monkeypatch.setattr(scraper.EPAScraper, 'fetch_document_metadata', fetch)
+    assert len(document_compliance_ids()) < len(expected)
+
+    # The nightly cron run does not pass --resume
+    scrape(simulator.base_url)
+    assert document_compliance_ids() == expected
+
+    conn = sqlite3.connect('epa_ireland.db')
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM run_pending_documents").fetchone()[0] == 0
+        assert [row[0] for row in conn.execute("SELECT status FROM scraper_runs ORDER BY run_id")] == \
+            ['abandoned', 'complete']
+    finally:
+        conn.close()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""Request throttling shared by the scraper's concurrent fetch paths."""
+import asyncio
+import threading
+import time
+
+
+class TokenBucket:
+    """Thread-safe token bucket capping callers at ``rate`` requests per second.
+
+    Up to ``burst`` requests may go out back-to-back before callers are paced.
+    Tokens are reserved under the lock and the wait happens outside it, so many
+    worker threads can share one bucket without serialising on the sleep.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.capacity = float(max(1, burst))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Take one token and return how many seconds the caller must wait for it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self) -> None:
+        """Block the calling thread until a request slot is available."""
+        delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self) -> None:
+        """Wait for a request slot without blocking the event loop."""
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
@@ -4,10 +4,10 @@
 For each entry in the `compliance_documents` table with:
   • document_type = 'Complaint'
   • (title IS NULL OR title = '')
-this script parses the `metadata_json` column and attempts to extract the
-`subject` string (nested inside the `metadata` field for modern rows or at the
-root level for some older rows). If found, it writes the subject back into the
-`title` column.
+this script writes the document's `subject` column (extracted from the
+payload when the document was stored) into the `title` column. Rows stored
+before that column existed are backfilled first (see
+backfill_document_fields.py), so `metadata_json` is only decoded once per row.
 
 Usage:
     python3 update_complaint_titles.py [--db epa_ireland.db]
@@ -17,47 +17,26 @@ You may wish to run `VACUUM` afterwards to compact the DB.
 from __future__ import annotations
 
 import argparse
-import json
 import sqlite3
 from pathlib import Path
-from typing import Optional
 
-DEFAULT_DB_PATH = Path(__file__).with_name("epa_ireland.db")
-
-def extract_subject(meta_raw: str) -> Optional[str]:
-    """Attempt to extract the subject string from the `metadata_json` blob."""
-    if not meta_raw:
-        return None
-    try:
-        outer = json.loads(meta_raw)
-    except json.JSONDecodeError:
-        return None
+import db
+import migrations
+from backfill_document_fields import backfill
 
-    subject: Optional[str] = None
-
-    if isinstance(outer, dict):
-        # Current schema: nested JSON string under `metadata`
-        inner_raw = outer.get("metadata")
-        if inner_raw:
-            try:
-                inner = json.loads(inner_raw)
-                if isinstance(inner, dict):
-                    subject = inner.get("subject")
-            except json.JSONDecodeError:
-                pass
-        # Fallback to top-level subject if present
-        subject = subject or outer.get("subject")
-    return subject.strip() if subject else None
+DEFAULT_DB_PATH = Path(__file__).with_name("epa_ireland.db")
 
 def main(db_path: Path) -> None:
-    conn = sqlite3.connect(str(db_path))
+    conn = db.connect(str(db_path), 'ingest')
     conn.row_factory = sqlite3.Row
     cur = conn.cursor()
+    migrations.migrate(conn)
+    backfill(conn)
 
     # Select rows to fix
     cur.execute(
         """
-        SELECT document_url, title, metadata_json
+        SELECT document_url, subject
         FROM compliance_documents
         WHERE document_type = 'Complaint'
           AND (title IS NULL OR title = '')
@@ -68,7 +47,7 @@ def main(db_path: Path) -> None:
 
     updated = 0
     for row in rows:
-        subject = extract_subject(row["metadata_json"])
+        subject = row["subject"]
         if subject:
             cur.execute(
                 """